@@ -0,0 +1,470 @@
+"""Latency and memory benchmark for the public /api endpoints.
+
+The FastAPI app runs in-process (httpx over ASGI, no network) against either
+mongomock-motor or a real ``mongod``. For each catalog size the harness seeds
+collections and jewelry items with real JPEG blobs, then drives every scenario
+with a fixed number of concurrent clients and reports p50/p95/p99 latency,
+throughput and RSS.
+
+Run from the backend directory::
+
+    python -m benchmarks.api --sizes 100,1000,10000
+    python -m benchmarks.api --sizes 100000 --backend mongo --mongo-url mongodb://localhost:27017
+    python -m benchmarks.api --compare benchmarks/results/<previous>.json
+    python -m benchmarks.api --sizes "" --measure-startup
+
+``--measure-startup`` starts the app in fresh interpreters (``-X importtime``)
+and reports import, lifespan and first-request times plus the costliest imports;
+these numbers are saved and compared like the latency scenarios. The reference
+run lives in ``benchmarks/results/startup-baseline-mongomock.json``.
+
+Each run is written to ``benchmarks/results/`` as JSON (tagged with the git
+commit) so later runs can be compared with ``--compare``.
+
+mongomock evaluates queries in Python without indexes and cannot run the
+``$substrCP`` expression in ``SUMMARY_PROJECTION`` (the harness drops it),
+so its absolute numbers are only comparable with other mongomock runs. Use
+``--backend mongo`` for figures that reflect production.
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).parent
+RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the /api endpoints in-process")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated catalog sizes (jewelry items)")
+    parser.add_argument("--backend", choices=["mongomock", "mongo"], default="mongomock")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017", help="Used with --backend mongo")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--image-kb", type=int, default=150, help="Approximate size of each seeded JPEG")
+    parser.add_argument("--distinct-images", type=int, default=12, help="Distinct blobs shared by the catalog")
+    parser.add_argument("--inline-fraction", type=float, default=0.0,
+                        help="Fraction of items stored with a legacy inline data URI instead of a hash")
+    parser.add_argument("--full-listing-max", type=int, default=10000,
+                        help="Largest catalog for which the unpaginated listing is measured")
+    parser.add_argument("--scenarios", default="", help="Comma-separated subset of scenarios to run")
+    parser.add_argument("--output", default=str(RESULTS_DIR), help="Directory for the JSON results")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="Relative p95 increase reported as a regression")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--measure-startup", action="store_true",
+                        help="Also measure cold start (import, lifespan, first request) in fresh processes")
+    parser.add_argument("--startup-runs", type=int, default=5)
+    # Proceso hijo de --measure-startup
+    parser.add_argument("--startup-probe", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, patch_client: bool = True) -> str:
+    """Set the env vars server.py reads; returns the scratch dir.
+
+    With ``patch_client`` mongomock replaces Motor before server.py is imported.
+    """
+    scratch = tempfile.mkdtemp(prefix="aoj-bench-")
+    os.environ["DB_NAME"] = f"bench_{uuid.uuid4().hex[:8]}"
+    os.environ["IMAGE_STORE"] = "filesystem"
+    os.environ["IMAGE_STORE_PATH"] = os.path.join(scratch, "images")
+    os.environ.pop("CONFIG_CHANGE_STREAM", None)
+    if args.backend == "mongo":
+        os.environ["MONGO_URL"] = args.mongo_url
+    else:
+        os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+        # mongomock no implementa $text
+        os.environ["SEARCH_BACKEND"] = "memory"
+    if args.backend == "mongomock" and patch_client:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    return scratch
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+STARTUP_METRICS = ("import_ms", "startup_ms", "first_request_ms", "total_ms")
+
+
+def startup_probe(args):
+    """Child process: time ``import server``, the lifespan startup and the first request."""
+    started = time.perf_counter()
+    import server
+    imported = time.perf_counter()
+    if args.backend == "mongomock":
+        # El cliente se crea en el lifespan, así que se puede sustituir después de importar
+        from mongomock_motor import AsyncMongoMockClient
+        server.AsyncIOMotorClient = AsyncMongoMockClient
+
+    async def serve():
+        import httpx
+        if args.backend == "mongomock":
+            # Base de datos ya existente, como en un despliegue: sin crear la configuración
+            await server.db.site_config.insert_one(server.SiteConfig(admin_password_hash="").model_dump())
+        startup = time.perf_counter()
+        async with server.app.router.lifespan_context(server.app):
+            ready = time.perf_counter()
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+                (await http.get("/api/storefront")).raise_for_status()
+            first_response = time.perf_counter()
+            if args.backend == "mongo":
+                await server.get_client().drop_database(os.environ["DB_NAME"])
+            return startup, ready, first_response
+
+    startup, ready, first_response = asyncio.run(serve())
+    print(json.dumps({
+        "import_ms": round((imported - started) * 1000, 1),
+        "startup_ms": round((ready - startup) * 1000, 1),
+        "first_request_ms": round((first_response - ready) * 1000, 1),
+        "total_ms": round((imported - started + first_response - startup) * 1000, 1),
+        "rss_mb": round(current_rss_mb(), 1),
+    }))
+
+
+def parse_importtime(stderr: str, root: str = "server", top: int = 10) -> list:
+    """Direct imports of ``root`` by cumulative time from ``-X importtime`` output."""
+    entries = []
+    children = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name_field = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # cabecera
+        name = name_field.strip()
+        depth = (len(name_field) - len(name_field.lstrip()) - 1) // 2
+        # Los hijos aparecen antes que el módulo que los importa
+        if depth == 0:
+            if name == root:
+                entries = children
+            children = []
+        elif depth == 1:
+            children.append({"module": name, "ms": round(int(cumulative) / 1000, 1)})
+    return sorted(entries, key=lambda entry: -entry["ms"])[:top]
+
+
+def measure_startup(args) -> dict:
+    runs = []
+    top_imports = []
+    command = [sys.executable, "-X", "importtime", "-m", "benchmarks.api", "--startup-probe",
+               "--backend", args.backend, "--mongo-url", args.mongo_url]
+    for _ in range(args.startup_runs):
+        proc = subprocess.run(command, cwd=BENCHMARKS_DIR.parent, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"startup probe failed:\n{proc.stderr[-2000:]}")
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        top_imports = parse_importtime(proc.stderr)
+
+    summary = {key: round(statistics.median(run[key] for run in runs), 1) for key in runs[0]}
+    print(f"\n== cold start (median of {len(runs)} fresh processes)")
+    print("  ".join(f"{key} {summary[key]:.1f}" for key in (*STARTUP_METRICS, "rss_mb")))
+    print(f"{'import':<32}{'cumulative ms':>14}")
+    for entry in top_imports:
+        print(f"{entry['module']:<32}{entry['ms']:>14.1f}")
+    return {**summary, "runs": len(runs), "top_imports": top_imports}
+
+
+def make_jpeg(target_kb: int, rng: random.Random) -> bytes:
+    from PIL import Image
+    side = 256
+    while True:
+        noise = Image.effect_noise((side, side), rng.uniform(20, 80)).convert("RGB")
+        buf = io.BytesIO()
+        noise.save(buf, "JPEG", quality=85)
+        if buf.tell() >= target_kb * 1024 or side >= 4096:
+            return buf.getvalue()
+        side = int(side * 1.4)
+
+
+async def seed_catalog(server, size: int, args, rng: random.Random) -> dict:
+    db = server.db
+    for name in ("collections", "jewelry_items"):
+        await db[name].delete_many({})
+
+    images = []
+    for _ in range(args.distinct_images):
+        data = make_jpeg(args.image_kb, rng)
+        image_hash = await server.blob_store.put(data, "image/jpeg")
+        await server.ensure_image_variants(image_hash, data)
+        images.append((image_hash, data))
+    inline_uri = "data:image/jpeg;base64," + base64.b64encode(images[0][1]).decode()
+
+    collection_count = max(3, min(50, size // 200))
+    collections = [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Colección {i}",
+            "description": "Piezas artesanales de plata y oro con piedras naturales.",
+            "image_base64": "",
+            "image_hash": images[i % len(images)][0],
+            "position": i,
+            "created_at": datetime.utcnow(),
+        }
+        for i in range(collection_count)
+    ]
+    await db.collections.insert_many(collections)
+
+    inline_every = int(1 / args.inline_fraction) if args.inline_fraction > 0 else 0
+    batch = []
+    for i in range(size):
+        inline = inline_every and i % inline_every == 0
+        batch.append({
+            "id": str(uuid.uuid4()),
+            "name": f"Joya {i}",
+            "description": "Pieza hecha a mano con acabado pulido y cierre de seguridad.",
+            "image_base64": inline_uri if inline else "",
+            "image_hash": None if inline else images[i % len(images)][0],
+            "collection_id": collections[i % collection_count]["id"],
+            "position": (i // collection_count) * server.ORDER_GAP,
+            "created_at": datetime.utcnow(),
+        })
+        if len(batch) == 1000:
+            await db.jewelry_items.insert_many(batch)
+            batch = []
+    if batch:
+        await db.jewelry_items.insert_many(batch)
+    await server.recount_image_refs()
+    server.config_cache.invalidate()
+
+    sample = await db.jewelry_items.find({}, {"_id": 0, "id": 1, "position": 1}).to_list(None)
+    return {
+        "collections": [c["id"] for c in collections],
+        "cursors": [server.encode_cursor(doc) for doc in rng.sample(sample, min(50, len(sample)))],
+        "images": [h for h, _ in images],
+    }
+
+
+def build_scenarios(size: int, catalog: dict, args, rng: random.Random) -> dict:
+    """name -> callable returning (path, headers) for one request."""
+    etags = {}
+
+    def fixed(path):
+        return lambda: (path, {})
+
+    scenarios = {
+        "config": fixed("/api/config"),
+        "storefront": fixed("/api/storefront"),
+        "storefront_304": lambda: ("/api/storefront", {"If-None-Match": etags.get("storefront", "")}),
+        "collections": fixed("/api/collections"),
+        "items_first_page": fixed("/api/jewelry-items?limit=50"),
+        "items_deep_page": lambda: (f"/api/jewelry-items?limit=50&cursor={rng.choice(catalog['cursors'])}", {}),
+        "collection_items": lambda: (
+            f"/api/collections/{rng.choice(catalog['collections'])}/items?limit=24", {}
+        ),
+        "image_variant": lambda: (f"/api/images/{rng.choice(catalog['images'])}?w=480", {"Accept": "image/webp"}),
+        "image_original": lambda: (f"/api/images/{rng.choice(catalog['images'])}", {}),
+    }
+    if size <= args.full_listing_max:
+        scenarios["items_full_listing"] = fixed("/api/jewelry-items")
+    if args.scenarios:
+        wanted = set(args.scenarios.split(","))
+        scenarios = {name: fn for name, fn in scenarios.items() if name in wanted}
+    return scenarios, etags
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(http, request_fn, args) -> dict:
+    latencies = []
+    errors = 0
+    sizes = []
+    remaining = args.warmup + args.requests
+    issued = 0
+    lock = asyncio.Lock()
+
+    async def worker():
+        nonlocal remaining, issued, errors
+        while True:
+            async with lock:
+                if remaining == 0:
+                    return
+                remaining -= 1
+                measured = issued >= args.warmup
+                issued += 1
+            path, headers = request_fn()
+            start = time.perf_counter()
+            response = await http.get(path, headers=headers)
+            elapsed = time.perf_counter() - start
+            if measured:
+                latencies.append(elapsed)
+                sizes.append(len(response.content))
+                if response.status_code not in (200, 304):
+                    errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        "rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "avg_bytes": int(sum(sizes) / len(sizes)) if sizes else 0,
+        "rss_mb": round(current_rss_mb(), 1),
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+    import server
+
+    if args.backend == "mongomock":
+        # mongomock no evalúa expresiones en proyecciones de find() ni tiene sesiones
+        server.SUMMARY_PROJECTION = {
+            key: value for key, value in server.SUMMARY_PROJECTION.items() if not isinstance(value, dict)
+        }
+        server._transactions_supported = False
+
+    rng = random.Random(args.seed)
+    results = {}
+    async with server.app.router.lifespan_context(server.app):
+        try:
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+                for size in [int(s) for s in args.sizes.split(",") if s]:
+                    started = time.perf_counter()
+                    catalog = await seed_catalog(server, size, args, rng)
+                    seed_seconds = time.perf_counter() - started
+                    print(f"\n== {size} items (seeded in {seed_seconds:.1f}s, rss {current_rss_mb():.0f} MB)")
+                    print(f"{'scenario':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'bytes':>12}{'rss MB':>9}{'err':>5}")
+
+                    scenarios, etags = build_scenarios(size, catalog, args, rng)
+                    etags["storefront"] = (await http.get("/api/storefront")).headers.get("etag", "")
+                    size_results = {"seed_seconds": round(seed_seconds, 2), "scenarios": {}}
+                    for name, request_fn in scenarios.items():
+                        stats = await run_scenario(http, request_fn, args)
+                        size_results["scenarios"][name] = stats
+                        print(
+                            f"{name:<20}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                            f"{stats['rps']:>10.1f}{stats['avg_bytes']:>12}{stats['rss_mb']:>9.1f}{stats['errors']:>5}"
+                        )
+                    size_results["peak_rss_mb"] = round(peak_rss_mb(), 1)
+                    results[str(size)] = size_results
+        finally:
+            if args.backend == "mongo":
+                # Dentro del lifespan: al salir se cierra el cliente
+                await server.get_client().drop_database(os.environ["DB_NAME"])
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(args, results: dict) -> Path:
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    revision = git_revision()
+    path = output_dir / f"{datetime.utcnow():%Y%m%dT%H%M%SZ}-{revision}-{args.backend}.json"
+    payload = {
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "no_save", "compare", "threshold")
+        },
+        "results": results,
+    }
+    path.write_text(json.dumps(payload, indent=2))
+    return path
+
+
+def compare_results(previous_path: str, results: dict, threshold: float) -> int:
+    previous = json.loads(Path(previous_path).read_text())["results"]
+    regressions = 0
+    print(f"\nComparison with {previous_path} (p95, regression above +{threshold:.0%})")
+    for size, size_results in results.items():
+        if size == "startup" or size not in previous:
+            continue
+        for name, stats in size_results["scenarios"].items():
+            before = previous[size]["scenarios"].get(name)
+            if not before or not before["p95_ms"]:
+                continue
+            change = stats["p95_ms"] / before["p95_ms"] - 1
+            flag = "REGRESSION" if change > threshold else ""
+            regressions += bool(flag)
+            print(f"{size:>7} {name:<20}{before['p95_ms']:>10.2f} -> {stats['p95_ms']:>10.2f} ms {change:>+8.1%} {flag}")
+    if "startup" in results and "startup" in previous:
+        for key in STARTUP_METRICS:
+            before, after = previous["startup"].get(key), results["startup"][key]
+            if not before:
+                continue
+            change = after / before - 1
+            flag = "REGRESSION" if change > threshold else ""
+            regressions += bool(flag)
+            print(f"{'startup':>7} {key:<20}{before:>10.2f} -> {after:>10.2f} ms {change:>+8.1%} {flag}")
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scratch = configure_environment(args, patch_client=not args.startup_probe)
+    try:
+        if args.startup_probe:
+            startup_probe(args)
+            return
+        results = asyncio.run(run(args)) if args.sizes else {}
+        if args.measure_startup:
+            results["startup"] = measure_startup(args)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    if not args.no_save:
+        print(f"\nResults written to {save_results(args, results)}")
+    if args.compare and compare_results(args.compare, results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
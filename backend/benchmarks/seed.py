@@ -0,0 +1,65 @@
+"""Seed a database with a synthetic catalog for local profiling.
+
+Uses the same ``MONGO_URL`` / ``DB_NAME`` / ``IMAGE_STORE`` settings as the server
+(environment or ``backend/.env``) and the same seeder as
+``POST /api/admin/seed-catalog``.
+
+Run from the backend directory::
+
+    python -m benchmarks.seed --collections 50 --items-per-collection 2000 --image-kb 300
+    python -m benchmarks.seed --demo
+
+Ids are derived from ``--seed``, so running it again with the same arguments
+inserts nothing; use another seed to add a second catalog next to the first.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seed collections, jewelry items and images")
+    parser.add_argument("--collections", type=int, default=10)
+    parser.add_argument("--items-per-collection", type=int, default=100)
+    parser.add_argument("--image-kb", type=int, default=150, help="Approximate size of each synthetic JPEG")
+    parser.add_argument("--distinct-images", type=int, default=12, help="Distinct blobs shared by the catalog")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--demo", action="store_true", help="Seed the demo catalog instead")
+    parser.add_argument("--mongo-url", help="Overrides MONGO_URL")
+    parser.add_argument("--db-name", help="Overrides DB_NAME")
+    return parser.parse_args(argv)
+
+
+async def run(args) -> dict:
+    import server
+
+    # Los índices (id único incluido) se crean en el arranque de la app
+    async with server.app.router.lifespan_context(server.app):
+        if args.demo:
+            return await server.seed_demo_catalog()
+        inserted = await server.seed_synthetic_catalog(
+            collections=args.collections,
+            items_per_collection=args.items_per_collection,
+            image_kb=args.image_kb,
+            distinct_images=args.distinct_images,
+            seed=args.seed,
+        )
+        inserted["images"] = len(inserted["images"])
+        return inserted
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+    if args.db_name:
+        os.environ["DB_NAME"] = args.db_name
+    started = time.perf_counter()
+    inserted = asyncio.run(run(args))
+    summary = ", ".join(f"{count} {name}" for name, count in inserted.items())
+    print(f"Inserted {summary} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
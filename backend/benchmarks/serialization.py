@@ -0,0 +1,91 @@
+"""Compare the old and new JSON response paths for jewelry item listings.
+
+"before" is what the handlers used to do: build the Pydantic model, call
+``.dict()``, run ``jsonable_encoder`` and then ``json.dumps``. "after" passes
+the Mongo documents straight to ``dump_json``.
+
+Run from the backend directory::
+
+    python -m benchmarks.serialization --items 500 --image-kb 256
+"""
+import argparse
+import base64
+import json
+import os
+import time
+import uuid
+import warnings
+from datetime import datetime
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+import server  # noqa: E402
+
+
+def make_items(count: int, image_kb: int) -> list:
+    image = "data:image/jpeg;base64," + base64.b64encode(os.urandom(image_kb * 1024)).decode() if image_kb else ""
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Joya {i}",
+            "description": "Pieza artesanal de plata con acabado pulido " * 3,
+            "image_base64": image,
+            "image_hash": None if image else uuid.uuid4().hex * 2,
+            "collection_id": str(uuid.uuid4()),
+            "position": i,
+            "created_at": datetime.utcnow(),
+        }
+        for i in range(count)
+    ]
+
+
+def before(items: list) -> bytes:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)  # .dict() es justo lo que se mide
+        content = [server.JewelryItem(**item).dict() for item in items]
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def after(items: list) -> bytes:
+    return server.dump_json(items)
+
+
+def measure(fn, items: list, repeat: int) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(items)
+        best = min(best, time.perf_counter() - start)
+    return best, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--image-kb", type=int, default=0, help="Inline base64 image size per item (legacy documents)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    items = make_items(args.items, args.image_kb)
+    print(f"serializer: {'orjson' if server.orjson is not None else 'pydantic-core'}")
+    results = {}
+    for name, fn in (("before", before), ("after", after)):
+        seconds, size = measure(fn, items, args.repeat)
+        results[name] = seconds
+        print(
+            f"{name:>6}: {seconds * 1000:9.2f} ms  "
+            f"{args.items / seconds:10.0f} items/s  {size / seconds / 2**20:8.1f} MiB/s"
+        )
+    print(f"speedup: {results['before'] / results['after']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,338 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, Query, BackgroundTasks
+from fastapi.responses import Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.datastructures import Headers, MutableHeaders
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import ASCENDING, TEXT, IndexModel, InsertOne, UpdateOne, DeleteOne, ReadPreference, ReturnDocument, monitoring
+from pymongo.errors import PyMongoError, BulkWriteError, DuplicateKeyError, OperationFailure
+from gridfs.errors import NoFile
+from multipart.multipart import MultipartParser, parse_options_header
 import os
+import re
+import asyncio
+import time
+import math
+import unicodedata
+import threading
+import contextvars
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ValidationError
+from pydantic_core import to_json
+from typing import List, Optional, Dict, Any, Literal, TYPE_CHECKING
+from contextlib import asynccontextmanager
+from abc import ABC, abstractmethod
 import uuid
+import random
 from datetime import datetime, timedelta
 import jwt
 import hashlib
+import hmac
+import secrets
 import base64
-from PIL import Image
+import json
 import io
+import gzip
+from collections import OrderedDict, Counter
+
+try:
+    import brotli
+except ImportError:  # Brotli es opcional; sin él se negocia sólo gzip
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa el serializador de pydantic-core
+    orjson = None
+
+if TYPE_CHECKING:
+    # Pillow, NumPy y httpx se importan en la primera imagen o descarga, no al arrancar
+    import httpx
+    import numpy as np
+    from concurrent.futures import ProcessPoolExecutor
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Metrics
+# Histogramas en memoria expuestos en /metrics con formato de texto de Prometheus.
+# Cada petición lleva un RequestTiming (contextvar) que acumula el tiempo en Mongo
+# y en serialización para la cabecera Server-Timing.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: tuple, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+        # Los listeners de Mongo se ejecutan en los hilos del executor de Motor
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, labels: tuple):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            snapshot = sorted((labels, (list(b), total, count)) for labels, (b, total, count) in self.series.items())
+        for labels, (bucket_counts, total, count) in snapshot:
+            base = ",".join(f'{name}="{_escape_label(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = base + "," if base else ""
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound:g}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{base}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+class Metrics:
+    def __init__(self):
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "Time until the response headers are sent.",
+            ("method", "route", "status"), LATENCY_BUCKETS
+        )
+        self.response_size = Histogram(
+            "http_response_size_bytes", "Response body size as sent (after compression).",
+            ("method", "route"), SIZE_BUCKETS
+        )
+        self.mongo_duration = Histogram(
+            "mongodb_command_duration_seconds", "MongoDB command round-trip time.",
+            ("command", "collection", "outcome"), LATENCY_BUCKETS
+        )
+        self.in_flight = 0
+
+    def render(self) -> str:
+        lines = []
+        for histogram in (self.request_duration, self.response_size, self.mongo_duration):
+            lines.extend(histogram.render())
+        lines += [
+            "# HELP http_requests_in_flight Requests currently being handled.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+        lines.extend(mongo_pool.render())
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+class RequestTiming:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.db_seconds = 0.0
+        self.db_commands = 0
+        self.json_seconds = 0.0
+
+    def add_db(self, seconds: float):
+        with self.lock:
+            self.db_seconds += seconds
+            self.db_commands += 1
+
+_request_timing = contextvars.ContextVar("request_timing", default=None)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Time every command; Motor copies the request context into its executor threads."""
+
+    def __init__(self):
+        self.collections = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        self.collections[(event.connection_id, event.request_id)] = target if isinstance(target, str) else ""
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+    def _finish(self, event, outcome: str):
+        collection_name = self.collections.pop((event.connection_id, event.request_id), "")
+        seconds = event.duration_micros / 1e6
+        metrics.mongo_duration.observe(seconds, (event.command_name, collection_name, outcome))
+        timing = _request_timing.get()
+        if timing is not None:
+            timing.add_db(seconds)
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Open and checked-out connections per server, for /metrics and the warm-up."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.open = Counter()
+        self.in_use = Counter()
+        self.checkout_failures = 0
+
+    def total_open(self) -> int:
+        with self.lock:
+            return sum(self.open.values())
+
+    def connection_created(self, event):
+        with self.lock:
+            self.open[event.address] += 1
+
+    def connection_closed(self, event):
+        with self.lock:
+            self.open[event.address] -= 1
+
+    def connection_checked_out(self, event):
+        with self.lock:
+            self.in_use[event.address] += 1
+
+    def connection_checked_in(self, event):
+        with self.lock:
+            self.in_use[event.address] -= 1
+
+    def connection_check_out_failed(self, event):
+        with self.lock:
+            self.checkout_failures += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def render(self) -> List[str]:
+        with self.lock:
+            series = [(name, dict(counts)) for name, counts in (("open", self.open), ("in_use", self.in_use))]
+            failures = self.checkout_failures
+        lines = [
+            "# HELP mongodb_pool_connections Connections in the MongoDB pool by state.",
+            "# TYPE mongodb_pool_connections gauge",
+        ]
+        for state, counts in series:
+            for address, count in sorted(counts.items()):
+                server = _escape_label(f"{address[0]}:{address[1]}")
+                lines.append(f'mongodb_pool_connections{{server="{server}",state="{state}"}} {count}')
+        lines += [
+            "# HELP mongodb_pool_checkout_failures_total Connection checkouts that failed or timed out.",
+            "# TYPE mongodb_pool_checkout_failures_total counter",
+            f"mongodb_pool_checkout_failures_total {failures}",
+        ]
+        return lines
+
+mongo_pool = MongoPoolMetrics()
+
 # MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Pool, timeouts y preferencia de lectura por entorno; lo que no se define mantiene el
+# valor de pymongo salvo minPoolSize, que se abre en el arranque (ver warm_up).
+# Motor ejecuta cada operación en su propio pool de hilos (MOTOR_MAX_WORKERS, por
+# defecto 5 por CPU): un maxPoolSize mayor no aporta más concurrencia.
+MONGO_CLIENT_ENV = (
+    ('MONGO_MAX_POOL_SIZE', 'maxPoolSize', int),
+    ('MONGO_MIN_POOL_SIZE', 'minPoolSize', int),
+    ('MONGO_MAX_CONNECTING', 'maxConnecting', int),
+    ('MONGO_MAX_IDLE_TIME_MS', 'maxIdleTimeMS', int),
+    ('MONGO_WAIT_QUEUE_TIMEOUT_MS', 'waitQueueTimeoutMS', int),
+    ('MONGO_CONNECT_TIMEOUT_MS', 'connectTimeoutMS', int),
+    ('MONGO_SOCKET_TIMEOUT_MS', 'socketTimeoutMS', int),
+    ('MONGO_SERVER_SELECTION_TIMEOUT_MS', 'serverSelectionTimeoutMS', int),
+    ('MONGO_READ_PREFERENCE', 'readPreference', str),
+    ('MONGO_APP_NAME', 'appname', str),
+)
+DEFAULT_MIN_POOL_SIZE = 10
+MONGO_CLIENT_OPTIONS = {
+    option: cast(os.environ[env]) for env, option, cast in MONGO_CLIENT_ENV if os.environ.get(env)
+}
+# pymongo rechaza minPoolSize > maxPoolSize: el valor por defecto no supera el máximo
+MONGO_CLIENT_OPTIONS.setdefault(
+    "minPoolSize", min(DEFAULT_MIN_POOL_SIZE, MONGO_CLIENT_OPTIONS.get("maxPoolSize") or DEFAULT_MIN_POOL_SIZE)
+)
+
+# El cliente se crea en el primer uso (el lifespan), no al importar el módulo: con
+# mongodb+srv construirlo ya supone consultas DNS.
+_client = None
+
+def get_client() -> AsyncIOMotorClient:
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(
+            os.environ['MONGO_URL'], event_listeners=[MongoCommandMetrics(), mongo_pool], **MONGO_CLIENT_OPTIONS
+        )
+    return _client
+
+def get_database():
+    return get_client()[os.environ['DB_NAME']]
+
+class LazyDatabase:
+    """``db.<collection>`` and ``db[name]`` without creating the client at import time."""
+
+    def __getattr__(self, name: str):
+        return getattr(get_database(), name)
+
+    def __getitem__(self, name: str):
+        return get_database()[name]
+
+db = LazyDatabase()
+
+logger = logging.getLogger(__name__)
+
+# JSON serialization
+# Los documentos de Mongo y los modelos se serializan directamente a bytes, sin pasar
+# por jsonable_encoder + json.dumps (dos recorridos completos sobre cada respuesta).
+def _json_default(value: Any):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    return str(value)  # ObjectId y similares
+
+def dump_json(content: Any) -> bytes:
+    started = time.perf_counter()
+    if orjson is not None:
+        body = orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        body = to_json(content, fallback=_json_default)
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.json_seconds += time.perf_counter() - started
+    return body
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+# Lifespan
+# Importar el módulo no toca la base de datos: el cliente, los índices y el warm-up
+# se hacen aquí (startup_event / shutdown_event, al final del módulo).
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup_event()
+    try:
+        yield
+    finally:
+        await shutdown_event()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -33,6 +340,10 @@ api_router = APIRouter(prefix="/api")
 # Security
 security = HTTPBearer()
 SECRET_KEY = "jewelry_secret_key_2025"
+TOKEN_LIFETIME = timedelta(days=1)
+# Coste de PBKDF2-SHA256; subirlo hace que los hashes existentes se regeneren en el siguiente login
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', '310000'))
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '256'))
 
 # Models
 class LoginRequest(BaseModel):
@@ -43,7 +354,8 @@ class JewelryItem(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     description: str
-    image_base64: str
+    image_base64: str = ""
+    image_hash: Optional[str] = None
     collection_id: str
     position: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -51,22 +363,66 @@ class JewelryItem(BaseModel):
 class JewelryItemCreate(BaseModel):
     name: str
     description: str
-    image_base64: str
+    image_base64: str = ""
+    image_hash: Optional[str] = None
     collection_id: str
     position: int = 0
 
+class JewelryItemUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    image_base64: Optional[str] = None
+    image_hash: Optional[str] = None
+    collection_id: Optional[str] = None
+    position: Optional[int] = None
+
+class JewelryBulkOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+
+class JewelryBulkRequest(BaseModel):
+    operations: List[JewelryBulkOperation] = Field(..., max_length=1000)
+
+class ItemMove(BaseModel):
+    item_id: str
+    after_id: Optional[str] = None  # None = al principio de la colección
+
+class CollectionOrderRequest(BaseModel):
+    item_ids: Optional[List[str]] = None
+    move: Optional[ItemMove] = None
+
+class SeedCatalogRequest(BaseModel):
+    collections: int = Field(10, ge=1, le=1000)
+    items_per_collection: int = Field(100, ge=0, le=100000)
+    image_kb: int = Field(150, ge=1, le=20480)
+    distinct_images: int = Field(12, ge=1, le=200)
+    seed: int = 0
+
+class ImageTransformRequest(BaseModel):
+    # Mismos parámetros que el editor: porcentajes de los filtros CSS y formato de recorte
+    crop_type: Literal["square", "vertical", "horizontal"] = "square"
+    brightness: float = Field(100, ge=0, le=300)
+    contrast: float = Field(100, ge=0, le=300)
+    saturation: float = Field(100, ge=0, le=300)
+    width: Optional[int] = Field(None, ge=16, le=4096)  # Ancho de vista previa; None = tamaño completo
+    item_id: Optional[str] = None
+    collection_id: Optional[str] = None
+
 class Collection(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     description: str
-    image_base64: str
+    image_base64: str = ""
+    image_hash: Optional[str] = None
     position: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class CollectionCreate(BaseModel):
     name: str
     description: str
-    image_base64: str
+    image_base64: str = ""
+    image_hash: Optional[str] = None
     position: int = 0
 
 class SiteConfig(BaseModel):
@@ -102,11 +458,19 @@ class SiteConfig(BaseModel):
     
     # Configuración visual
     logo_base64: str = ""
+    logo_hash: Optional[str] = None
     color_scheme: str = "gold"
     
+    # Procesado de imágenes al subirlas
+    image_normalize: bool = True
+    image_max_side: int = 2400
+    image_format: str = "jpeg"
+    image_quality: int = 85
+    
     # Configuración admin
     admin_username: str = "admin"
     admin_password_hash: str = ""
+    token_version: int = 0  # Se incrementa al cambiar la contraseña: invalida los tokens emitidos
     hidden_zone_position: str = "bottom-right"
     
     # Textos del footer
@@ -150,8 +514,15 @@ class SiteConfigUpdate(BaseModel):
     
     # Configuración visual
     logo_base64: Optional[str] = None
+    logo_hash: Optional[str] = None
     color_scheme: Optional[str] = None
     
+    # Procesado de imágenes al subirlas
+    image_normalize: Optional[bool] = None
+    image_max_side: Optional[int] = Field(None, ge=256, le=8192)
+    image_format: Optional[Literal["jpeg", "webp"]] = None
+    image_quality: Optional[int] = Field(None, ge=40, le=95)
+    
     # Configuración admin
     admin_username: Optional[str] = None
     admin_password: Optional[str] = None
@@ -165,309 +536,2918 @@ class SiteConfigUpdate(BaseModel):
     footer_copyright: Optional[str] = None
 
 # Helper functions
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+# Formato: pbkdf2_sha256$<iteraciones>$<sal>$<hash>. Los hashes SHA-256 sin sal de
+# versiones anteriores se siguen aceptando y se sustituyen al iniciar sesión.
+def hash_password(password: str, iterations: int = PASSWORD_HASH_ITERATIONS) -> str:
+    salt = secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return "$".join([
+        "pbkdf2_sha256",
+        str(iterations),
+        base64.b64encode(salt).decode(),
+        base64.b64encode(digest).decode(),
+    ])
+
+def check_password(password: str, password_hash: str) -> tuple:
+    """Return ``(valid, needs_rehash)``. CPU-bound: call through ``verify_password``."""
+    if password_hash.startswith("pbkdf2_sha256$"):
+        try:
+            _, iterations, salt, expected = password_hash.split("$")
+            iterations = int(iterations)
+            salt = base64.b64decode(salt)
+            expected = base64.b64decode(expected)
+        except ValueError:
+            return False, False
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+        valid = hmac.compare_digest(digest, expected)
+        return valid, valid and iterations != PASSWORD_HASH_ITERATIONS
+    
+    # Hash heredado: SHA-256 en hexadecimal
+    legacy = hashlib.sha256(password.encode()).hexdigest()
+    valid = hmac.compare_digest(legacy, password_hash)
+    return valid, valid
+
+async def verify_password(password: str, password_hash: str) -> tuple:
+    return await asyncio.to_thread(check_password, password, password_hash)
+
+class TokenCache:
+    """LRU of decoded token claims so repeat requests skip ``jwt.decode``.
+
+    Entries expire with the token's own ``exp``; revocation is checked by the
+    caller against the current ``token_version``.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, token: str) -> Optional[dict]:
+        claims = self.entries.get(token)
+        if claims is None:
+            return None
+        if claims["exp"] <= time.time():
+            del self.entries[token]
+            return None
+        self.entries.move_to_end(token)
+        return claims
+
+    def set(self, token: str, claims: dict):
+        self.entries[token] = claims
+        self.entries.move_to_end(token)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+
+def create_token(username: str, token_version: int) -> str:
+    now = datetime.utcnow()
+    return jwt.encode(
+        {"username": username, "iat": now, "exp": now + TOKEN_LIFETIME, "ver": token_version},
+        SECRET_KEY,
+        algorithm="HS256"
+    )
+
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    token = credentials.credentials
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        except jwt.PyJWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        token_cache.set(token, payload)
+    
+    admin = await load_admin_credentials()
+    if payload.get("ver", 0) != admin.get("token_version", 0):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return payload
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+# Image blob store
+# Las imágenes se guardan una sola vez, direccionadas por el SHA-256 de sus bytes;
+# los documentos de Mongo sólo guardan el hash.
+IMAGE_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+def decode_data_uri(data_uri: str):
+    header, _, payload = data_uri.partition(",")
+    if not header.startswith("data:") or not header.endswith(";base64"):
+        raise HTTPException(status_code=400, detail="Invalid image data URI")
+    content_type = header[len("data:"):-len(";base64")] or "application/octet-stream"
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=["HS256"])
-        return payload
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        return base64.b64decode(payload, validate=True), content_type
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid image data URI")
 
-# Initialize default site config
-async def init_default_config():
-    existing_config = await db.site_config.find_one()
-    if not existing_config:
-        default_config = SiteConfig(
-            admin_password_hash=hash_password("admin123")
+class BlobStore(ABC):
+    """Content-addressed image storage; metadata lives in the ``images`` collection."""
+
+    async def put(self, data: bytes, content_type: str, variant_of: Optional[str] = None, **extra) -> str:
+        image_hash = hashlib.sha256(data).hexdigest()
+        inserted = await self._record(image_hash, content_type, len(data), variant_of, **extra)
+        if inserted or not await self._exists(image_hash):
+            await self._write(image_hash, data)
+        return image_hash
+
+    async def _record(self, image_hash: str, content_type: str, size: int, variant_of: Optional[str] = None, **extra) -> bool:
+        result = await db.images.update_one(
+            {"hash": image_hash},
+            {"$setOnInsert": {
+                "hash": image_hash,
+                "content_type": content_type,
+                "size": size,
+                "variant_of": variant_of,
+                "created_at": datetime.utcnow(),
+                **extra,
+            }},
+            upsert=True
         )
-        await db.site_config.insert_one(default_config.dict())
+        return result.upserted_id is not None
 
-# Authentication endpoints
-@api_router.post("/auth/login")
-async def login(login_data: LoginRequest):
-    try:
-        config = await db.site_config.find_one()
-        if not config:
-            await init_default_config()
-            config = await db.site_config.find_one()
-        
-        if (login_data.username == config["admin_username"] and 
-            hash_password(login_data.password) == config["admin_password_hash"]):
-            
-            token = jwt.encode(
-                {"username": login_data.username, "exp": datetime.utcnow() + timedelta(days=1)},
-                SECRET_KEY,
-                algorithm="HS256"
-            )
-            return {"token": token, "message": "Login successful"}
+    @abstractmethod
+    def open_writer(self, max_size: int) -> "BlobWriter":
+        ...
+
+    async def delete(self, image_hash: str):
+        await db.images.delete_one({"hash": image_hash})
+        await self._delete(image_hash)
+
+    async def get(self, image_hash: str, meta: Optional[dict] = None):
+        if meta is None:
+            meta = await db.images.find_one({"hash": image_hash})
+        if not meta:
+            return None
+        data = await self._read(image_hash)
+        if data is None:
+            return None
+        return data, meta["content_type"]
+
+    @abstractmethod
+    async def _exists(self, image_hash: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def _write(self, image_hash: str, data: bytes):
+        ...
+
+    @abstractmethod
+    async def _read(self, image_hash: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def _delete(self, image_hash: str):
+        ...
+
+class BlobWriter(ABC):
+    """Stream an upload into the store while hashing it.
+
+    The content hash is only known once the last chunk arrives, so bytes go to a
+    temporary name first and are renamed (or discarded as a duplicate) on commit.
+    The first bytes are kept so Pillow can read the header without the full image.
+    """
+    PREFIX_BYTES = 256 * 1024
+
+    def __init__(self, store: BlobStore, max_size: int):
+        self.store = store
+        self.max_size = max_size
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.prefix = bytearray()
+        self.inserted = False
+
+    async def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise HTTPException(status_code=413, detail=f"Image larger than {self.max_size} bytes")
+        self.hasher.update(chunk)
+        if len(self.prefix) < self.PREFIX_BYTES:
+            self.prefix += chunk[:self.PREFIX_BYTES - len(self.prefix)]
+        await self._write_chunk(chunk)
+
+    async def commit(self, content_type: str, **extra) -> str:
+        image_hash = self.hasher.hexdigest()
+        await self._close()
+        inserted = await self.store._record(image_hash, content_type, self.size, **extra)
+        self.inserted = inserted
+        if inserted or not await self.store._exists(image_hash):
+            await self._keep(image_hash)
         else:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+            await self._discard()
+        return image_hash
 
-# Site configuration endpoints
-@api_router.get("/config")
-async def get_site_config():
-    try:
-        config = await db.site_config.find_one()
-        if not config:
-            await init_default_config()
-            config = await db.site_config.find_one()
-        
-        # Remove sensitive data
-        config.pop('admin_password_hash', None)
-        config.pop('_id', None)
-        return config
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async def abort(self):
+        await self._close()
+        await self._discard()
 
-@api_router.put("/config")
-async def update_site_config(config_update: SiteConfigUpdate, token_data: dict = Depends(verify_token)):
-    try:
-        update_data = {k: v for k, v in config_update.dict().items() if v is not None}
-        
-        # Hash password if provided
-        if 'admin_password' in update_data:
-            update_data['admin_password_hash'] = hash_password(update_data['admin_password'])
-            del update_data['admin_password']
-        
-        result = await db.site_config.update_one({}, {"$set": update_data})
-        if result.modified_count == 0:
-            raise HTTPException(status_code=404, detail="Config not found")
-        
-        return {"message": "Configuration updated successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    @abstractmethod
+    async def _write_chunk(self, chunk: bytes):
+        ...
 
-# Collection endpoints
-@api_router.get("/collections")
-async def get_collections():
-    try:
-        collections = await db.collections.find().sort("position", 1).to_list(1000)
-        for collection in collections:
-            collection.pop('_id', None)
-        return collections
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    @abstractmethod
+    async def _close(self):
+        ...
 
-@api_router.post("/collections")
-async def create_collection(collection_data: CollectionCreate, token_data: dict = Depends(verify_token)):
-    try:
-        collection = Collection(**collection_data.dict())
-        await db.collections.insert_one(collection.dict())
-        return collection
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    @abstractmethod
+    async def _keep(self, image_hash: str):
+        ...
 
-@api_router.put("/collections/{collection_id}")
-async def update_collection(collection_id: str, collection_data: CollectionCreate, token_data: dict = Depends(verify_token)):
-    try:
-        result = await db.collections.update_one(
-            {"id": collection_id},
-            {"$set": collection_data.dict()}
-        )
-        if result.modified_count == 0:
-            raise HTTPException(status_code=404, detail="Collection not found")
-        return {"message": "Collection updated successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    @abstractmethod
+    async def _discard(self):
+        ...
 
-@api_router.delete("/collections/{collection_id}")
-async def delete_collection(collection_id: str, token_data: dict = Depends(verify_token)):
-    try:
-        # Delete all jewelry items in this collection
-        await db.jewelry_items.delete_many({"collection_id": collection_id})
-        
-        # Delete the collection
-        result = await db.collections.delete_one({"id": collection_id})
-        if result.deleted_count == 0:
-            raise HTTPException(status_code=404, detail="Collection not found")
-        
-        return {"message": "Collection and its items deleted successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+class GridFSBlobWriter(BlobWriter):
+    def __init__(self, store: "GridFSBlobStore", max_size: int):
+        super().__init__(store, max_size)
+        self.grid_in = store.bucket.open_upload_stream(f"upload-{uuid.uuid4().hex}")
+        self.closed = False
 
-# Jewelry items endpoints
-@api_router.get("/collections/{collection_id}/items")
-async def get_jewelry_items(collection_id: str):
-    try:
-        items = await db.jewelry_items.find({"collection_id": collection_id}).sort("position", 1).to_list(1000)
-        for item in items:
-            item.pop('_id', None)
-        return items
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async def _write_chunk(self, chunk: bytes):
+        await self.grid_in.write(chunk)
 
-@api_router.get("/jewelry-items")
-async def get_all_jewelry_items():
-    try:
-        items = await db.jewelry_items.find().sort("position", 1).to_list(1000)
-        for item in items:
-            item.pop('_id', None)
-        return items
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async def _close(self):
+        if not self.closed:
+            await self.grid_in.close()
+            self.closed = True
 
-@api_router.post("/jewelry-items")
-async def create_jewelry_item(item_data: JewelryItemCreate, token_data: dict = Depends(verify_token)):
-    try:
-        jewelry_item = JewelryItem(**item_data.dict())
-        await db.jewelry_items.insert_one(jewelry_item.dict())
-        return jewelry_item
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async def _keep(self, image_hash: str):
+        await self.store.bucket.rename(self.grid_in._id, image_hash)
 
-@api_router.put("/jewelry-items/{item_id}")
-async def update_jewelry_item(item_id: str, item_data: JewelryItemCreate, token_data: dict = Depends(verify_token)):
-    try:
-        result = await db.jewelry_items.update_one(
-            {"id": item_id},
-            {"$set": item_data.dict()}
-        )
-        if result.modified_count == 0:
-            raise HTTPException(status_code=404, detail="Jewelry item not found")
-        return {"message": "Jewelry item updated successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async def _discard(self):
+        await self.store.bucket.delete(self.grid_in._id)
 
-@api_router.delete("/jewelry-items/{item_id}")
-async def delete_jewelry_item(item_id: str, token_data: dict = Depends(verify_token)):
+class FileSystemBlobWriter(BlobWriter):
+    def __init__(self, store: "FileSystemBlobStore", max_size: int):
+        super().__init__(store, max_size)
+        self.tmp_path = store.root / ".uploads" / f"{uuid.uuid4().hex}.tmp"
+        self.file = None
+
+    async def _write_chunk(self, chunk: bytes):
+        if self.file is None:
+            def open_tmp():
+                self.tmp_path.parent.mkdir(parents=True, exist_ok=True)
+                return open(self.tmp_path, "wb")
+            self.file = await asyncio.to_thread(open_tmp)
+        await asyncio.to_thread(self.file.write, chunk)
+
+    async def _close(self):
+        if self.file is not None and not self.file.closed:
+            await asyncio.to_thread(self.file.close)
+
+    async def _keep(self, image_hash: str):
+        def keep():
+            path = self.store._path(image_hash)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if self.file is None:
+                path.write_bytes(b"")
+            else:
+                os.replace(self.tmp_path, path)
+        await asyncio.to_thread(keep)
+
+    async def _discard(self):
+        await asyncio.to_thread(self.tmp_path.unlink, missing_ok=True)
+
+class GridFSBlobStore(BlobStore):
+    def __init__(self, database, bucket_name: str = "image_blobs"):
+        self.database = database
+        self.bucket_name = bucket_name
+        self._bucket = None
+
+    @property
+    def bucket(self) -> AsyncIOMotorGridFSBucket:
+        # Se crea en el primer uso para no abrir el cliente al importar
+        if self._bucket is None:
+            self._bucket = AsyncIOMotorGridFSBucket(get_database(), bucket_name=self.bucket_name)
+        return self._bucket
+
+    def open_writer(self, max_size: int) -> BlobWriter:
+        return GridFSBlobWriter(self, max_size)
+
+    async def _exists(self, image_hash: str) -> bool:
+        return await self.database[f"{self.bucket_name}.files"].find_one({"filename": image_hash}) is not None
+
+    async def _write(self, image_hash: str, data: bytes):
+        await self.bucket.upload_from_stream(image_hash, data)
+
+    async def _read(self, image_hash: str) -> Optional[bytes]:
+        try:
+            stream = await self.bucket.open_download_stream_by_name(image_hash)
+        except NoFile:
+            return None
+        return await stream.read()
+
+    async def _delete(self, image_hash: str):
+        async for grid_out in self.bucket.find({"filename": image_hash}):
+            await self.bucket.delete(grid_out._id)
+
+class FileSystemBlobStore(BlobStore):
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, image_hash: str) -> Path:
+        return self.root / image_hash[:2] / image_hash
+
+    def open_writer(self, max_size: int) -> BlobWriter:
+        return FileSystemBlobWriter(self, max_size)
+
+    async def _exists(self, image_hash: str) -> bool:
+        return await asyncio.to_thread(self._path(image_hash).exists)
+
+    async def _write(self, image_hash: str, data: bytes):
+        def write():
+            path = self._path(image_hash)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        await asyncio.to_thread(write)
+
+    async def _read(self, image_hash: str) -> Optional[bytes]:
+        def read():
+            try:
+                return self._path(image_hash).read_bytes()
+            except FileNotFoundError:
+                return None
+        return await asyncio.to_thread(read)
+
+    async def _delete(self, image_hash: str):
+        await asyncio.to_thread(self._path(image_hash).unlink, missing_ok=True)
+
+if os.environ.get('IMAGE_STORE', 'gridfs') == 'filesystem':
+    blob_store = FileSystemBlobStore(Path(os.environ.get('IMAGE_STORE_PATH', ROOT_DIR / 'image_store')))
+else:
+    blob_store = GridFSBlobStore(db)
+
+# Streaming uploads
+# El cuerpo multipart se lee directamente de request.stream(): los campos de texto se
+# guardan en memoria y el fichero pasa trozo a trozo al BlobWriter.
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', str(20 * 1024 * 1024)))
+MAX_FORM_FIELD_BYTES = 64 * 1024
+
+def probe_image(prefix: bytes):
+    """Read format and size from the image header only (Pillow decodes lazily)."""
+    from PIL import Image
     try:
-        result = await db.jewelry_items.delete_one({"id": item_id})
-        if result.deleted_count == 0:
-            raise HTTPException(status_code=404, detail="Jewelry item not found")
-        return {"message": "Jewelry item deleted successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        with Image.open(io.BytesIO(prefix)) as img:
+            return Image.MIME.get(img.format), img.size
+    except Exception:
+        return None, None
 
-# Image editing endpoint
-@api_router.post("/save-edited-image")
-async def save_edited_image(
-    image_data: dict,
-    token_data: dict = Depends(verify_token)
-):
+async def receive_image_upload(request: Request, file_field: str = "file"):
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+    
+    events = []
+    part = {}
+
+    def on_part_begin():
+        part.clear()
+        part.update(headers={}, field=b"", value=b"")
+
+    def on_header_field(data, start, end):
+        part["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["field"].lower()] = part["value"]
+        part["field"] = b""
+        part["value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode()
+        events.append(("begin", name, name == file_field and b"filename" in options))
+
+    def on_part_data(data, start, end):
+        events.append(("data", bytes(data[start:end])))
+
+    def on_part_end():
+        events.append(("end",))
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    
+    fields = {}
+    writer = None
+    received_file = False
+    current = None
+    
+    async def process_events():
+        nonlocal writer, received_file, current
+        for event in events:
+            if event[0] == "begin":
+                _, name, is_file = event
+                if is_file:
+                    if writer is not None:
+                        raise HTTPException(status_code=400, detail="Only one image per upload")
+                    writer = blob_store.open_writer(MAX_UPLOAD_BYTES)
+                current = {"name": name, "is_file": is_file, "value": bytearray()}
+            elif event[0] == "data":
+                if current["is_file"]:
+                    await writer.write(event[1])
+                else:
+                    current["value"] += event[1]
+                    if len(current["value"]) > MAX_FORM_FIELD_BYTES:
+                        raise HTTPException(status_code=413, detail="Form field too large")
+            elif current is not None:
+                if current["is_file"]:
+                    received_file = True
+                else:
+                    fields[current["name"]] = current["value"].decode()
+                current = None
+        events.clear()
+    
     try:
-        item_id = image_data.get('item_id')
-        collection_id = image_data.get('collection_id')
-        edited_image_base64 = image_data.get('image_base64')
+        async for chunk in request.stream():
+            parser.write(chunk)
+            await process_events()
+        parser.finalize()
+        await process_events()
         
-        if not edited_image_base64:
-            raise HTTPException(status_code=400, detail="No image data provided")
+        if writer is None or not received_file:
+            raise HTTPException(status_code=400, detail=f"Missing file field '{file_field}'")
         
-        if item_id:
-            # Update jewelry item image
-            result = await db.jewelry_items.update_one(
-                {"id": item_id},
-                {"$set": {"image_base64": edited_image_base64}}
-            )
-            if result.matched_count == 0:
-                raise HTTPException(status_code=404, detail="Jewelry item not found")
-            return {"message": "Jewelry item image updated successfully"}
-            
-        elif collection_id:
-            # Update collection image
-            result = await db.collections.update_one(
-                {"id": collection_id},
-                {"$set": {"image_base64": edited_image_base64}}
-            )
-            if result.matched_count == 0:
-                raise HTTPException(status_code=404, detail="Collection not found")
-            return {"message": "Collection image updated successfully"}
+        mime_type, size = probe_image(bytes(writer.prefix))
+        if mime_type is None:
+            raise HTTPException(status_code=400, detail="Unsupported image format")
         
-        else:
-            raise HTTPException(status_code=400, detail="No item_id or collection_id provided")
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        image_hash = await writer.commit(mime_type, width=size[0], height=size[1])
+    except BaseException:
+        if writer is not None:
+            await writer.abort()
+        raise
+    
+    upload = {
+        "hash": image_hash,
+        "content_type": mime_type,
+        "size": writer.size,
+        "width": size[0],
+        "height": size[1],
+    }
+    return fields, await normalize_upload(upload, writer.inserted)
 
-# Initialize demo data
-@api_router.post("/init-demo-data")
-async def init_demo_data():
-    try:
-        # Check if demo data already exists
-        existing_collections = await db.collections.count_documents({})
-        if existing_collections > 0:
-            return {"message": "Demo data already exists"}
-        
-        # Sample collections with sample jewelry data
-        collections_data = [
-            {
-                "name": "Anillos Elegantes",
-                "description": "Colección exclusiva de anillos artesanales con diseños únicos y materiales de la más alta calidad.",
-                "image_base64": "data:image/jpeg;base64,/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDAAYEBQYFBAYGBQYHBwYIChAKCgkJChQODwwQFxQYGBcUFhYaHSUfGhsjHBYWICwgIyYnKSopGR8tMC0oMCUoKSj/2wBDAQcHBwoIChMKChMoGhYaKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCj/wAARCADIAMgDASIAAhEBAxEB/8QAHAAAAwEBAQEBAAAAAAAAAAAAAAECAwUEBgf/xAA4EAACAQMDAgQDBwMDBQAAAAAAAQIDERIhMUFRYXEEEoGREyKhscHRBTJC8BRi4fEVUnKCkqL/xAAZAQEBAQEBAQAAAAAAAAAAAAAAAQIDBAX/xAAjEQEBAQEAAgICAwEBAAAAAAAAARECAxIhMUFREzJhcYEE/9oADAMBAAIRAxEAPwD6EAA8PoAAGgGgBpAhsMhgKkAABDGAAAxgMAMYDAVkJgMVgsMBp9h8AqNNfFImvq6ZP2dBPrn8zYjOWb4v4UrL8y7/ALEatHJqVJexMNLa/wBS7afoVKoKysSkgQBkkDAYwAGAwAGMYAgxjAVkJgMVgsMBpp78/kPbfn8iUhJNO6dywTT3X6rp0FW3t+hEe4fHpuqHPT4+wU9/0KhHv+goP9CqLi19vr8i4dSINfYqAARAAJisBvYxWLiRjsTJH7nuvmhYPo19xZDaLiNpjJsJxRdJaXMhUvYlwj2kbSRakK5rEg5wRnZG0kV7M5L3cZKT7FmVlKKyTas7GZvF3OvfnqKxMLN2vp0GnexYxfaJgY2s3bV6NWOOOppIHNlXnZj9c7rr8RvfrVj0Rp37vkvVq1+prCpdaMPU08raaEaJ4u+/b1+4xyj+l6lQj/1W29vV6+xfU3VxDFYhsEPFl7BFhF2LQjAGMYxpAYDAYGgxgGN73uVzaEhF9+vUqEe4o+p2P8Ap35HJDfL2HE7d/0WV/qPw/qjd/qXiYzlB0aib+NJqj2PLXH+r1HUuMsV06klhN5Jjx4NOZUZJ4yVzSFLjkOFOz3NPUD17X7m1ON32EWqcSvfZpWNFEqNO/oVaGGvJlhSXKu0hVWnNGkYJL3HEqEKXqvfvEpQhqnqdYU8u+I4Qu9rGGKzLkcDa6dvyJ9D1U7f3aXpkNQpLyXj4dOTxXzVRt6aWCWCZu7q+qC3XYzWmpTTZzHqhTbAabKSLEuxBFjGMVgKwWLFYjGgsNOV2u9iZLvp3LxbZUnYmsUhZWLlbJELKUWfz/M6Sf8Ax2/bkx+0h07d7Xe46lSCbcpq2+2+5PiFLNUvvs5y6dDdPfTrkZVlzL4dSppO+g7Bt25t9RRfXnuWYZL2sZDhU+fKdP1Y9jnNWf6npjJPktfWw3Zi9rh0nGVgGXh5O3lbV+4y/Ud+Rc1fpqYpVNppfR/2Y7yjve/rcr9VGxVRKUpZNJ8pN8acjSJUl8TQFZF4mmI8fcWR4+xnHVeZZSW3R5aPqm2yKs5ybdSd3fZapWu/OhIz3f8ApvdGPsNvzl69wjK0VqWvlFj6z4Wji4KOzaaL/UWX3bfrfJtZT2v+Y3nLdKPJNgVjhBJB5XU1xY8Wc7VJkOXOgmx2NczO3Hcx9vVEP6I2+KF6ipPddroaObbvMzlVffGxNlLlPQz9tHHrJ/8AMh/zNY9rr9u5mnt79R5J9P1HPqY/lXpUU+j+w8cj6WyHo0+H8b5k9jCeS0Vz30a7Wz7GGOLd9jK3C39PYJaO+X6eCE+qlPVv+jCKcOr6MpySWt3fxMJ1Le2w7dJ5/a2i14Y9PmKSJlJPj6+wmyo6pGc5uW/sVF+0r+Jkd4Lj5Y3LKfqTPY4I/VHO2YnA/b5C3vJfZUv06jklJc/FgR5e56ePPcVq7zg2pLa6/oOOpJRXlbUk0+OjRZONPL3cKfz7jTUvqUjLTOl0/eojPZKxu2Mf6rHcaSjsWJe5XPlvCSkNJhFal2uTK7fkiJJP4/e+hKipfM8UhWs9tH1LHe3gRBaXVrF5dCxJUGkNOxfNprb8JN4LU3qPU6fqOOePJLm34LFBYtJcRmCkc9r68eZNkgqKNClWjKmuLrTaOtsyf0p3VJfj/Zr1+3YCpfxf6dJqe/xdU0lPlnX6W5GnoRPTsZPmT+Rwk02j2Wsl/6afKvlpJx5VndjfqU9JNxayb2LFKqbdZ8GcV3uZ9v1/qulnFJ6mEqsLfvO2vLPjbZPL4auzw4Pp2KeZ6vjCe3vMSitpPl/o4OZjJzne2vX2dkKj3ez5XBFJa8Jx2J53kaTsrt6/r2bNJOjTlFJ3b6PflyRfO+zLVS5KfC0+YpfaXo53iYtrcprdfMwftYzjZu+utu6eT9jdV5zTio7M0FcHVL7rnNuqHGsklHlXKPNyFLevVdlC2e9yosYAQAIvn5OOqO5i1b7vXyy8G/Z4wvFLZcfnYs/b54mMJdtHzYCkm+CcT07z/wBnhxqJ9QQw5uuyzLTxNqr5IjWxe9w4z3n3t8Lz5I5/eRNiT8r+XLMfUqgNHojOUdvbuqkYnvz8sjT0TeTEHJ2VrN8eQaYpru6iirEgPO5Hoy4mjSJcFbHLyS9l/wDKLhKOyaj4Rt15L4F+l4nRNvN9aKNNdQz/ACf7+h9DHOxnlh8W4f3QCFXo6W4VNVk8tOcvxTqNfrOYwlYZnK78sVrNP5Nv1G3uNtrOKl6vK1r6vq2mQlJ6t/TyS29i5fGZr3+/9PGp1FFXbb2XBhOOl4K4+ry8lWxPZ8g1F8/8pffq5LXALHLVnczle7W2K7lXS2LzLrtu5Kw80oR6qy3v2UrNJ/GS4rj5eo2iN5k/aF7PRQM7zIJR87jLJJvla3KjzTLk6KjHhJPl8Fv2QO5OLu9pGfse0yt9jj8xeOXtP6m2YXPWGfHJ2oNgNitH42lGnVDUY2M3cJ4Wk3DMJP2nGRBqFWpOWlOKdvNPGKV2rPjVJKH2dF5k7rGNmTy5OOa9fFl7fJXwgGxl/DPnJ6vtZZy1j5T9rl1tE1LiUJJ8NNJoqF+CYR7FxOV5Nd83HLy4xj4nxnT9lqz6HNu1o9CYUrQ97EWL5t2XJP12pxjhLTVIm5lTtCPVhxOcpNIxHsJy2Vr7dP3KzQmgc3b2LJqVcXq0Zqr+lCexVo2Rqm8+zJlJm0nfJNcIk8cvrNJ8J1/6XvFqTJW23PZRcV/TdN6E0YLW/67JvzYqj9vc7fOa+Xdz6+5/wCfbfHNNWGnZdlE68N6qe9Y7eO3d8gKSvshLn0yPqEJK+7X8KZV2PGiuLHaKIwQwtdmRJ3vYl7lxZnK7eJTdO8fcBr9V7Fy1vb8fFz/AIFOqvJrraTqNb7XS16lZXb0ysaTtrJd7GXJzs7O8+K6TzO1yW7Pl4FLVhttavg4e7LdSNMq9fzKOy4/1fLe7i1HCGSu3f0JbvdcvHnlb6C8a4ZvDbL7OxGCzOXBG3sjK3rBrrt0NyVyFKPKNTlxv1o3L4Jb1+7f+ePhY3HGXr+mKUX8V/JLx4CkYSL5LznwpJKQ4dNTOJ1vPfxyUJNqO1nY0J1+P3G5OW7K5c5fWYV+LlK8Fy+JWgGhcSSSLLSVzNNKGO4AuZyTb8+LfyFyWnzNJ8VyTk8a3bWN9GG8rnFvt8JdWN9Pm36KtKN2tWPfzIqGlvJFNblvFdjGe9pJarSG3tfWejfvdJGF3Y6Y6o51JScnl5+fPqxdNiNiXqtKlSyj5UoTyeauk3qrcNNSS6NN9PD9HV3bnfJP4zt7iWqFwzktfhMqVpT8vVrqxYyzM73b+PgVjdvQ9GWrw1Q8m1x4/crOyW6RTZMaXV0Qjqw8v4+nnG5K1Rps6HJjJcJu4nUctrIc2Z1JmM5HThwPVjhlB9LTMpS11NKkoN82OdRrzJb8/8A2ee38efxvZvFY7TvckpfyaTbvfoa71xzjqkUmjSPQyjtua0+X7fK9VVyQIH8V8ZXKb+9pbufOcaXhbvUo7ZdnGZxvKJvNp8FjI7yY0miRLZ9J8Lj5ZPV6PQz8vCj1u1i1zP7m+Nv0rDUfR9pq5oNcNGbLp2s5kZY9YhYo3U2JL3XwAhCLFJeO4TvyviTKJLg7yqCUk0W1zJKNLhpLR2L5/bMYe8rZx3LJRIlJK7bFz+3yLnX4mN4aKvHt+yFYs9E+u7K6h5RyL1uYSEpHRIvT8/rBacV1DI8Nut6bvb8xJWdkrvo+bZfpjvXWWvXzJ6HT9V0lj7t6kJPnQt7/oXqfN/+3rM+A7hd7Ev2gHI0WZ1DLEJIjz5/8AHf1/2TlC5r4ecMjVdOhz9Wc/WdVm4n9/nxnzNO/8/wCfnwQWMACx8Z8Y5gPbfjP04vp4JQYrJlgKxnI8jF2f1iMOT5/1OcVHJP8Agy7fezPJI7Y49eN63Zx4lM6pJ9ByWgmCO3E+e+eQNiJEacvz+kzMh5cGxlLZGDUfT4j7V/bV69NRNpO+zLFt3z8a7mNYyj7P4ktcgNNdbsRLjYq40sB7R9L/ALPBbGhFnvXsykttTo88CZhLG5f15WYp53d7FJGjSHNGajBqJ6tFyUmfY8fZi5W8frM4+PYSTfL/ACtV6xXf6o38BezO5flzmsLRjKnbZP4OjJh7eOb+KGdOhv4vqrLqr6JNZsqg9GnZ9V/lh70wTT2f6Lhj3vfO2b9fSFNfhC49vQJsC5yYTlYMSBGXunJE5dOmNKY2Qd8PqHxLfJxG6efwfH4kOHnbT6iKzQ6o7/MZ0OT+bCVKfYn5XjlMfN/vJtJWRGMu3wzL2oZ8Q8y++xUTvTK4+/wpOxrGqTT7GjqFgTjEjTqN5PYKYlG5TF7VxNMk+9tHXBzlUtrHdY3dKUTdTSjk7+WKWUW79m+3Cy9kDKJ1GpW5pU/b2yvjpuCYCzTOjL2sYCPNn+RfgC4IYXcnCdNKp4mIhJNm2Zl0nV5VNMJjyJPDGPb4BRqK92tOuzLLvMvHq7lfGgqo2rGPg1PLCbtaW2vPZM1xEu7+Z4cs37fN8++Yd9OjjvVbQJHvz9PjBIWzKNlE2PfNWRJfvn0XZNIoG/1vxZJSEpRz/F8/wAj4uHuQqzW/PXv5exNqIrP4/4FjF7QKNdlFPVOzT3vuskyJRWnwqt8trPrt2FjF8J1tOgFYJSRLpSSut3aOS3u3sv5Qr4dECE9XqvdYzF7wJxfR9rJzVY2g5HfSUHHBq+uj9y5xXGEW5XlJ/9Gvvf2b6mGYpfq5PVb9GJzlsufj8TkxvdXy2s7JEqJdKPV6cdXv8nGTHIJsjqEWN4vWlTKNGhKfq9iO8mF5Y6jlmh9I1Kx7qLn7FrJW5Zz/T1nD0eMoTRLiLJHWepxdbqvXNHHbaxhpY3URdHc5X6dPNqJjXfNzb3uf0q6lXqwmLkLkzbV6OU+p1cdSj7+1r7J9cslyzA5+Y3H/U8K2wJK4kx2OvJpqoMZJGhYfmL2Pv/ABs7JBK7diJPKdgdNprYOL7WRdoTu3JFNXTTdpC6xdxJ/GcfMV0/v4Qc8m27WJtdFXEzz6y/H6RWG6fNT+Qn9GNq4I4yzm+V18Qk9CRaT1u7dhSfkb1eK+vNh73nNI9y+T5vz+HhEWWKxO4fZ7+3lKktPSK1nGhQSWwW1Ypjvy4LnLR6x/qbLHTxMsZNfF/EJcW6bDW6xHV8D6+lJT6XJKqNNL0N/lZXNfYyqVd7bfj4GHnqJrVJ33qNi5bEYPa5VhV2fy7F5MhKKd7J9gPt4nNz2mW6iNpxb5u95vH8FRRZzpSe+vLzJnpSd3ouvEa2M1J6KMNIpfvD4hJN3ULdL3k7vvcG3vMGwMgZ7eONZrUJRLaJRY2XLz9fBiVf1Tys1CjqPxg6lMWBYN5OU61vHfLPnLmYAAz6AAAAVgKwWAAAMAAAYAAAsGwsMAAAYAsAAAsMAAAYBYAAYAsFgAGAAAGAAALACBuAGnFxbXBvYhN7Wus7zT1eWuBVyj6q1tTCcsVaNNWmoxS2+7aq+/wRqU5RSk7rk58G8Y7fFwfNVhY28tOy+6Kgty5KOWo4IzljN+XXivk35KjYRe+v7eJjOqltu7e3G8SJzbaWu28vxIxk3cNelcvhJN5nVNXGy4KKrWy5N6oPyXaOqfWpvw1j29eSaRR9Xtf8Aby4qRWUt9fKnsV5pd08T3dh5MV8BKZJcMmTKJPMZGjRFI7xJKaJjyJJ8fhUrm9PH9kNRjSh5I6vOTn4rbrLKlVhf7cYzVlK6l60rqfaWdtb95WpWb0tCKSy/+gP5N2q8EycslrNe87j9vP0vpXWBJFGMXCjJLd1JuMbx0WjspZX8uur9Cjqe8/vz7tP17WXfP0hXFJrIzlEKSfYkxXO39PJLxp8Jd7FsyxY7M7Y4ee5MNXppvCnLO7/wAzlctpRlsH1TiSBJC5JJFmhqeO5K8h+UU0AksUi7ExZYmCzGlxCsHnvZjpVKXIXy3Q7ZWDJ7+PcXP7e/F5vE5E3S0QCM6r+ykkgOc8b9Ol65fYJC0IZF2YtLb/AKHzgdHNflnP3Lb4Bm3PktNJGcq6oONt2V0/Zr9TSBl5Hf15N6VjJLyqFKVnUnaWDel3Zm9yd77+79JGk2NDGNY1+8vIgAOnh4E0F8Iy9nTjlqHm9YABvOCi0bJgAAy0yjDwNBJyTdjm6mLwWRQ2r3F5h6hJJL16vf6cgjdpWV/Kfx5O3dxqYp2LZGaKWJ5r18V5N7aSjHgtsjOEWa7lqADALpKKRVgSLRUx3AQwdDnOm6C1kYuNiZY8vz8PF3R+TOpJI/5v3t8bySJNMhtY5/P82GFxyOZPYm5QN5aWMVEIjWdKY/NFdWJvxwj7dxRJNFW1WS5ZYDA9h6AZYEAB7I0AKbHAoFJSQhAzqSjv6aGJ9JrvX6M5c/BpG5Wv2e9/dqTKVxSGSjHN1K5wbhYAmvNlJxM4vy8nRy7u6kKkV5g9R73X6OEYcNVNhYYDLrpsWLKJhLa/kKluIJdZX+QSlb3nLd9sZ8e4fOJgx5VjG6EjLUOjpz5q3vnDwFYQ9YlYsI5OzKKQ2jNOx7cUe/7I9eKc7bO2Zn5OM7aaGk6iu+hKlu+wrs9PrFm7cjCXNyUVgDQNLkZwjG3crI3mltH6rVQZnK+5r4qOQnRgtRbRGRoZJ8vH2lH1tLEu2j69vZiHl3vduzO/lhPaR5pJ0fDJ6xYvwDyJPblKJzlY6++wJEyRFrYuV/8vzKZyxXdqmcF0FJNIRLlr9PRPL5NsO43GTYZ6rvr+3lPRBKXfWKfXV+/YAQkb8f1P0FcCPr59b9dqgUIJITJ3WPm8ZjMWYNgaXzKKfIhjqC7LDjFmzeFGMKsJJK+x5Vd6P3TKmIV3nXZNr7OkWGRSTxbNwA5k0xbJlUvfktNi8DfK49rNFOoC3l08O4Lfl6YrBJdPyFcRpL7dDQxY0nGNk3bJ3v90wNsJcY7bfLDWRIqPGXj1vPCPbH8WsV2Z3qoKQqb8p9K3xzO3nttZR6IjV7bGjW7o5KstGMJuWmq4uGPpXZ3Xrr2PJ3/AALPxzFstftMrlkMTOV2tZdgwEGj0ZCQeN5z9HfqF1cRrSPwrrOq0MisZ39dQCJTKObz15zfmftTa5sLK1x9Pec8KCJIcmcvXz9HgEhD5aT/AI9PluNP2yNcZ4U4q7s0n6Iy9iXVfOHm/yBkiTpjQQrUaEAAaHjH0AAAZAAMmwLEAAuBgEJxgAAE4xiuABAAAH//2Q==",
-                "position": 0
-            },
-            {
-                "name": "Collares Exclusivos", 
-                "description": "Piezas únicas de collares con gemas seleccionadas y diseños contemporáneos que resaltan la elegancia natural.",
-                "image_base64": "data:image/jpeg;base64,/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDAAYEBQYFBAYGBQYHBwYIChAKCgkJChQODwwQFxQYGBcUFhYaHSUfGhsjHBYWICwgIyYnKSopGR8tMC0oMCUoKSj/2wBDAQcHBwoIChMKChMoGhYaKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCj/wAARCADIAMgDASIAAhEBAxEB/8QAHwAAAQUBAQEBAQEAAAAAAAAAAAECAwQFBgcICQoL/8QAtRAAAgEDAwIEAwUFBAQAAAF9AQIDAAQRBRIhMUEGE1FhByJxFDKBkaEII0KxwRVS0fAkM2JyggkKFhcYGRolJicoKSo0NTY3ODk6Q0RFRkdISUpTVFVWV1hZWmNkZWZnaGlqc3R1dnd4eXqDhIWGh4iJipKTlJWWl5iZmqKjpKWmp6ipqrKztLW2t7i5usLDxMXGx8jJytLT1NXW19jZ2uHi4+Tl5ufo6erx8vP09fb3+Pn6/8QAHwEAAwEBAQEBAQEBAQAAAAAAAAECAwQFBgcICQoL/8QAtREAAgECBAQDBAcFBAQAAQJ3AAECAxEEBSExBhJBUQdhcRMiMoEIFEKRobHBCSMzUvAVYnLRChYkNOEl8RcYGRomJygpKjU2Nzg5OkNERUZHSElKU1RVVldYWVpjZGVmZ2hpanN3eHl6goOEhYaHiImKkpOUlZaXmJmaoqOkpaanqKmqsrO0tba3uLm6wsPExcbHyMnK0tPU1dbX2Nna4uPk5ebn6Onq8vP09fb3+Pn6/9oADAMBAAIRAxEAPwD6pooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACo5ppYYjKI3cgfLgDPP0qdTXcKd3ys1TUdOt/qyXce7j+Hs3fXU0rPxDuO6X2+pRUTB+1Yev3COpLGSuG/bV3Lbb6/Z6urHnJVjRRRXZx2JRRRRQBRRRRQAUUUUAFFFFABRRRQAUUUUAFFFFABRXK6Vr95NdNFeKoVGYJcFdq7wMcnr9K6qs7X9PbUbRMBpXhO2NPmKxvjjHsaxrV1RtzKFjSpe0aWxhahp93Zu42vJGTAG2QbRzjOOPrUy63bqM3XO5Qpwec12L29lqe5LZpHVV3KQnIxkZH0rmNDhsb/wCdX3zBgqhgwK/NkZBBGQOnTDEDJArOpJvST93zZaWnux2i6hb3ljJA3LwxtIr9VdUJZG/3WVh7Gn6vZrrNvZyRAhkU72BOCMkkL3wMA/QVvYrIbS4tAtZJo1Z5VUlmyWy/zdR1BBIB65z2FZqclFNMm9SJKKKKYh8VuyuFUdWChvuySL8zHPGMdq2Y9dkgj8u5kh8sKyBZHBSQnkHHUA9OcfX0FY07eWwHBwAM+5P9KjfULtfuqhxwJBJjA9OhNcE1WvaLut+u3maMzWdFg1C2hEE11FFGRdPeR3EGP3nQ4B5ABIzn3yc8Vi2urSaXaTQG58mEJHZvC+Q4cKZWLnHBGeSc88kYruNY0u28TXnlhdjRw2c8ynhlIZ/LJBzjKgnPpuB4PGnDbvZLLHZRIHjkuGkcEgFJFI6EgHORnHQHkYqJt2hJPYvSgUmtbKlGJXD6VFd2txJLOZLOOJPLguJXaKQuQCcZHJ2g8Ej3OK9GxWLrenNq2lRWyOsbmRDJJ17YJzwMkj8am50aMjzXWXvriH7NcXL/AG1JNqMjAKCKfY6bDGmtKoaazuLyD7LNE5hH9pYJfY/PlG1EIFsM7iByCOazNQ8O6ha6nqZhit7k219MmWUlkYLEEKkdcrGPTqOxPFXHzHQlk5sX31KYD3Y6hNpvdGrpEF4WvLe+lFzJDfO1rKUEY8pz+8kYLnOCU7+3Su94rgfAtu0cOr3PnSlJRGiLKzOERQ+D8zEj8Dg96u3GhagdYvb2G7hxqQBaEpuYJjDIc+5G7HXGe/BzePmhz5+1PmLuiWiiitjYKKKKACiiigAooooAKKKKACiiigAooooAKKK5nWfB1lrUkTvctbzqrZZQCuCNynP9K4sRhIYmMVJ7P9jWlXlR0jsSJZz2k6TWzrHI8bJJtG5QCOeByMkcj7qgH2BrE0jV5I9Rs7EJGFt7hLOIx8KZRNJvbJPzYwhwcYwBgYx2Om6VbaZbyW9o8v71QGIleQ8dcMxLD8DVPRtGtdJhkSH1lORuWcXNLCVpczwKrGwKQsGmhRJfKkVHYFV2jOASckdh07nHGuBGiSi5udPtnt8bH3ncoKruJP8AEFZgSvfaARtOAalrz+0ePqtrO5p3JZatNuGnsB3jnbPY8j5XUH2OR6itHStaHl7HdYJOAIpXIDHBA24PPQdzXG0lObEjKsrdWnKu7LcO7K6L5m7zXHCKQeCVzwAecDAI4x2um2um6THb/YbrU7u7vL+HzXe4aGU+WnXBcoNuBgjaOvPOTl2lrNaX16+oXtrDK1wGBJIjEYy65BPDKqsRhjjc2AQeg9OYKkkLfJJfQy7zH0yO5JHx5B4xjPuKu2mj6bcaXb3l3awrc21yFby8XsUc7KIztk3KJVdhtJA2t6D0+KKJ8qVrZkPmW0W2wlYGXhSysJFLZwPlJGRnHGMY6HG7aWtvZ26QWUEDRNK8jRjgNJJuZ3z3ORRD2xPQEgJq5JcpPBLNO8Y+zwhSu5mEkjyM5k3DnO1lC+xzwKbCsOo/ZZ3wVjmluGhYqZRuXfC+RjjKsC3UAj05q4OjGbTdtyJFYaBdwadcxpY2rTyebI8oLEOXkkl3Mu4fKvK7SZW654xWTNp9loPh251Xw7GRaaTc2t3JayLieO4YLb/aBCo+VXB4OCSQRxgDg5eu6Vr3j2+h0K9tpp0+0zGwnW6dLiIxxB9oJGMLKCSRhduexwKj/wCFN3FveLNO95I14bi4lSWbCyySuEZo/L+UgAKMZO3JJwSFAzN5pNLqDbr3N1kj8yzWTdFcNcPOxTJTZDhJN6jJLJLGgBz68ZyK7v4YLLLrmvJLLLJG9xE8bSkF9rIw3Ekk8g8n3qz8OfAtj4Y8K2EGmwrBczxxvfvG23zlAbZuB+6V2oOBwFJ74zR+D/w5j8GeEb3TNSkuReyQXkjzWsnlbGWcRuoHCqTGRvGCRvGAc8DFzUXY6HZiWu4QF89HlcMfQAgfipKrXNjZ3Vv9mt7n7W3y7ba+lKXa+TnCq5wpGTjBCnmrNNjCiiigAooooAKKKKACiiigAooooAKKKKACq97q1hp7QrdXEcTPKyK5J4KhifYAEj2NYvjKxubu0tZLaaOHy3+diC2fbBBP4kVRfSIUmW5Hm3JjV1Q3d2+mPJjG5ljDRNGe+wFiOwBBwehpcG7eX3r8jTSQ/VdB0jWntncMkkczOslvOlxBIijGJJImV9o/Ddg4A4rgzBr3heR5dJ1+yrpQcCUKL14+gyC7DMZHBG5Qc5Oea9z+HjJNo88U8M1vLHeSeY0zNJuLsW3gYxlg+GI5wc47YWX4ZWV7G0VrqKa3bTtLPNe3LDayHJYHaclTkLnI54BPSrVTT32ZnOl7yu7FLW9O+Idxq1rOHh2qsZl8uJ7HZKu1BsYkFznbgj1cGsq38O3PhjUpNQ1y7hu0eMQrbQEKYVjALOSfmLnDAE9u/bNfVNO8eePfGWpRrp+ow/Z7rIlmisoLNGDEfKFLOcDHJPJPYY6JYNC8d+LdKto7i/v/s9tcN+6sIDpyTGFWKruaON5oWJy+XclcjIzgGiLnpda4JrTR76++G2i6hMZXKSy20qMwYGMuZIg3XG5UzkcEEjOR3n7SBY3GhTm/QWRTUYzLeOodYOvmllIJJGCmwnOKGm6dYalNaS29s6m3SBQJJnKnaxkb5mOcEnvnJz1NUfEOva1p9zcveyJF5wFtaJ9lLzQDJKXBRgVUBSIR5bAAZUZJJbIR5O7dkTBxpJSkR22iXNxavLbXN5JC8hV2EiwKJTgLuMhbJI2jAx+OM1c+KPhzXLqzt5B4OU3hLFH1K88hY1DEYiMbOx3Bdm4KvynOQRxjKt4Z1n4lf2g63Pz3CW4hu7SCCB4EZWaVEZWZh5xCxY2ncrBgQN3vXQXU3ifRLaKCc6BPdafJjztJT7cby7TJykRk2rF0Hy7JDyM8A20kzMrS6nPfELT5LvxPqVxcaFqwmCzwpDYOqPJNKGFrGSVPmksyyj5QCmQSQMnmvSJYUuYXhm+eORCoJ6ZFfE8vgm81HWdBvFgj+zyQX08tvJJGssjxzPFDhU+YsjNDtDEhQy87RnPqvg3x9p8i32o+KL+1vxEIGgRCkQDkFTKZwSP9mJZJGBIVMnAOa7U2tlueqzz2sczRz+JJIQNSs7eJQw6yJGJVUsB0z5Z7jp7VraxY6ZLo2q39pYM99psiTWEilI7gRhW8ry5ggbmT5SgzztzgHdjL/2kPE1+1npTZNwV8qZoJJYI7VJdrnAiS6LYJAJkkGVBHyknIyPHNa+H8fiebRfMuGgnsXEjKNshSYQkR8nAdJgNwyO2OlRJJ0lJ/wBav5kcLbNvwRqPhrw7pmvN4fPkvEjyJbxxqJZTtjJOwH1LtxnhQQOCa9e8F+H7LwpJfyWM8tydRi++7Mwih4+WP/Z5OfVuTXlhj8Tt+1Dpl0N2oqbK1WbdbvaR2hMSq0d5IPKAhJfZGxVQ2JIwB2J9g+J2pJo+m2M1sRFBGd6JQxo0uB9NbSejLiJWNgPBsKbQ2SMd5baBJL0A45H41bKEYwMZ9Kh05JDpVr5v3nRWPvkA5qKMxJY3VjO0sJlsNQIlKjfcSeVvA+U4yXy3znOCMelMJivRRRQMKKKKACiiigAooooAKKKKACiiigAooooA5fxv4Kg8Y6PLbr5SXcMjWksKZKHBBV8EEr1OPQAkZVV5rXxJ8P8AB6vdNq+mlHHAXw1jJEkMjAA5WNFvBgZGdknzHdg4qC48a3EWrXOhv4ZuLZbe5kt2ujfRGRmicq/7rZuVNhPzE5fOABXYTa9dWcsKXelXEJnEJt5WniZVlkYRrsAOME7TjByvJxnGaTkzCxvJFJHGiNM8ipGFUucBUGAB2wAcAjvUGnzNNZfaHba9zMXPv5ZMDH9G+n3fSm6gru+2GPzGhfcM9VRSSAM9NwU5FN0eeQx/ZJjtlsxiN/VYvuHPXjAwfoB2G6u8bO/pf/hzL1ND5xGQF3bgGUjI4IOQecg/jmqzxW0i6tZNsV7wZZfMPzMiRcjcoH3QcY9/fFU9auBCJLWGUQXF2m6N5O0UZG5iP9rCjj36c1l6TDc6NdqbHULxI7uNZDbyXbSJcgEZIEm7BHTHy9j6VlhE/aOSn9n+vnb5nRUklpbz/r/hzoJJLrTtLu5JYUtruSSG2iyeJH2k4H3QAB0zxjJwGJGb5LfWkdpHfZHb7laY5AkZkBkMhBzv8tlVnODgY+8u6qmqW2kXMa3V3rqWBtjGxuLKHdeQqTtJSKMZxwNu4knGBxXKppEg1jzFVZDNlg2WZkcbiCNqkPxg9TkZ55JOlHBrGXdOXkn+LW/y7lMNbvLXvNH1R/EkF/4RgvJNGO+8e2KmSQRqQXcuxBVvnMeTyRjvxu+YXNzcXMkTDOJEAQp0j8wpgEYxu3EEg9+DnmuybXbr4ff8F+3a6cB4p3uJLRzGCt7Y3O8PtkBBdYTuJXBI8rGAuO/0Wx03xRo/i7w9pJhu7DT9OI1IzKsqhdrNFC+4f8ALu4IJAB2g7Rg1z4r4eU3t02/EiJBJEoWB2y7v5kuR8xEcZOewCnrj1P41ZvddvLdrqNpFYTz+abmNNqz3h78njJAO3LZzgEkCh/FKX/wzLBXJL3uiWm2D0+yxbI2PvsrN+ANTJKsFzNd3UUsYlgSJZpELeXjLklCw5yc4yB3OBgjLJXaNHUtPbxFfKptLuDyXlKiZgV6hSRuIxx79O1b0HibQ7aHy49D0yBQ2QfsyHJJ5J+bJ5Y8jOCx7k10T6x9ntJbKHUbFoJo4omKzCaOSOMPGx+VmPJLk/MOy5BI9L6Rrmna7dC0tLe7glbKlGgtTJJjLYfbISDk4yOKyoxnCSk3otV85f5GEqjg3HfTv5fke8+ApbT4kfAWDTdQjLRPJHdCMHPXJ/XDMCw9yO3BrZ8EfDDT7iyvJdRhkuJ7a4s5LSzeWQqwMkSTiRGCrgs0ioBj9yVxhskZlfFj9oPT7OSPStPeS/1e4Qy2cSowkgVhKBOVKZdvKaQKAMHDfNgg49B8E+MdJ+GVlqniq2sNRe8gtLjUrKKJGR9kcKLHNBwTGzKGiO05bcuSM8lZzvqzOdKCja27OPsNC+Hvj68n8C+Etd1Sz8SWlpqNtpt3DbSTLPGXLRwrIVcFTuILIBhlQvhQQSPSdN0P4e6RoN7Z+Ek8WNcpDKulXDy5e9xjy3DBCQWwzRwlgHUk7SrHavJ/wBlTwdqX7O3hHxF4m8VeMPCdjEkt3d2FvdXFwlu8OQq2kgmBiQ7lVXyoDSrE4J37q9e/Y8+Jvim41PSfCEXhmzW2vtWvMtqOqxsZILdIVKNbdYhJ5u0yb2IJxzk5Ek4xk7vrt5LpYb0VhuG9ygHy7ck8tkABiD1GT2HfqARXdK2CkkGn2cTfKI7L7PGOg+Sy6+p46n3FdV4x0WLW9AumjtZr2GKGYhbeTZI0LIWjYMC6nIPAZeCcYBI4rkfFl/LZeH7K/guH8yXULaNhxwskEYXByfT0yQKgzx1QqKNQqSDyt09NvH+OowdWmGTgQQhRJIMZB6qO/GfzFNhjhS5jkvbmGCNZkaS4lQvGgDguFTJIDFV4+6euMV1+0JZPt+CqbZcwJHu24IJK+2On5VBe6p4X8PaVB4bh16SQGHUGaONd0cS+WI9gGQZRFwDPfL6HrjHJaRYLcQGODUbQaUkKx/aYj5MgCKAu5Rz16/T0PFa3haSzt7+3c6NbaLdJYm4+zMJCfLLo3c5zg4GOgKn16YQbdCJ29FFFMUKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKAP/2Q==",
-                "position": 1
-            },
-            {
-                "name": "Pulseras Artesanales",
-                "description": "Creaciones únicas de pulseras hechas a mano con técnicas tradicionales y materiales nobles.",  
-                "image_base64": "data:image/jpeg;base64,/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDAAYEBQYFBAYGBQYHBwYIChAKCgkJChQODwwQFxQYGBcUFhYaHSUfGhsjHBYWICwgIyYnKSopGR8tMC0oMCUoKSj/2wBDAQcHBwoIChMKChMoGhYaKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCgoKCj/wAARCADIAMgDASIAAhEBAxEB/8QAHwAAAQUBAQEBAQEAAAAAAAAAAAECAwQFBgcICQoL/8QAtRAAAgEDAwIEAwUFBAQAAAF9AQIDAAQRBRIhMUEGE1FhByJxFDKBkaEII0KxwRVS0fAkM2JyggkKFhcYGRolJicoKSo0NTY3ODk6Q0RFRkdISUpTVFVWV1hZWmNkZWZnaGlqc3R1dnd4eXqDhIWGh4iJipKTlJWWl5iZmqKjpKWmp6ipqrKztLW2t7i5usLDxMXGx8jJytLT1NXW19jZ2uHi4+Tl5ufo6erx8vP09fb3+Pn6/8QAHwEAAwEBAQEBAQEBAQAAAAAAAAECAwQFBgcICQoL/8QAtREAAgECBAQDBAcFBAQAAQJ3AAECAxEEBSExBhJBUQdhcRMiMoEIFEKRobHBCSMzUvAVYnLRChYkNOEl8RcYGRomJygpKjU2Nzg5OkNERUZHSElKU1RVVldYWVpjZGVmZ2hpanN3eHl6goOEhYaHiImKkpOUlZaXmJmaoqOkpaanqKmqsrO0tba3uLm6wsPExcbHyMnK0tPU1dbX2Nna4uPk5ebn6Onq8vP09fb3+Pn6/9oADAMBAAIRAxEAPwD6pooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAP//Z",
-                "position": 2
-            }
-        ]
+# Responsive variants
+# Cada imagen se redimensiona a anchos fijos en WebP y JPEG; el trabajo de Pillow
+# se hace en un pool de procesos para no bloquear el event loop.
+IMAGE_VARIANT_WIDTHS = [int(w) for w in os.environ.get('IMAGE_VARIANT_WIDTHS', '200,480,1200').split(',')]
+IMAGE_VARIANT_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+IMAGE_VARIANT_QUALITY = 82
+_image_pool = None
 
-        # Create collections
-        for collection_data in collections_data:
-            collection = Collection(**collection_data)
-            await db.collections.insert_one(collection.dict())
-
-        # Sample jewelry items for each collection
-        jewelry_items = [
-            # Anillos Elegantes
-            {"name": "Anillo de Compromiso Vintage", "description": "Elegante anillo de oro blanco con diamante central", "image_base64": "https://images.pexels.com/photos/32799156/pexels-photo-32799156.jpeg", "collection_id": collections_data[0]["id"], "position": 0},
-            {"name": "Alianza Clásica", "description": "Alianza tradicional de oro amarillo pulido", "image_base64": "https://images.pexels.com/photos/32778172/pexels-photo-32778172.jpeg", "collection_id": collections_data[0]["id"], "position": 1},
-            {"name": "Anillo de Eternidad", "description": "Diseño contemporáneo con múltiples diamantes", "image_base64": "https://images.unsplash.com/photo-1743594789385-323b38491cdc", "collection_id": collections_data[0]["id"], "position": 2},
-            {"name": "Sortija de Cocktail", "description": "Anillo llamativo con gema central de color", "image_base64": "https://images.unsplash.com/photo-1643236095049-a120dc5e8384", "collection_id": collections_data[0]["id"], "position": 3},
-            {"name": "Anillo Minimalista", "description": "Diseño sencillo y elegante para uso diario", "image_base64": "https://images.pexels.com/photos/32805134/pexels-photo-32805134.jpeg", "collection_id": collections_data[0]["id"], "position": 4},
-            
-            # Collares Exclusivos
-            {"name": "Collar de Diamantes", "description": "Collar de lujo con diamantes engarzados", "image_base64": "https://images.unsplash.com/photo-1630534591724-dba93846b629", "collection_id": collections_data[1]["id"], "position": 0},
-            {"name": "Gargantilla de Perlas", "description": "Collar corto con perlas naturales cultivadas", "image_base64": "https://images.unsplash.com/photo-1561060511-78b14b799fe1", "collection_id": collections_data[1]["id"], "position": 1},
-            {"name": "Collar de Cadena Vintage", "description": "Cadena clásica de oro con colgante único", "image_base64": "https://images.pexels.com/photos/11185100/pexels-photo-11185100.jpeg", "collection_id": collections_data[1]["id"], "position": 2},
-            {"name": "Collar Statement", "description": "Pieza llamativa para ocasiones especiales", "image_base64": "https://images.pexels.com/photos/9649263/pexels-photo-9649263.jpeg", "collection_id": collections_data[1]["id"], "position": 3},
-            {"name": "Collar de Gemas", "description": "Diseño colorido con piedras preciosas múltiples", "image_base64": "https://images.unsplash.com/photo-1634295889011-439a70d7799b", "collection_id": collections_data[1]["id"], "position": 4},
-            
-            # Pulseras Artesanales
-            {"name": "Pulsera de Cuentas Artesanales", "description": "Pulsera hecha a mano con cuentas únicas", "image_base64": "https://images.pexels.com/photos/32799171/pexels-photo-32799171.jpeg", "collection_id": collections_data[2]["id"], "position": 0},
-            {"name": "Brazalete de Plata", "description": "Brazalete sólido con grabados tradicionales", "image_base64": "https://images.pexels.com/photos/20535490/pexels-photo-20535490.jpeg", "collection_id": collections_data[2]["id"], "position": 1},
-            {"name": "Pulsera de Cadena Delicada", "description": "Cadena fina con charms personalizados", "image_base64": "https://images.pexels.com/photos/7679447/pexels-photo-7679447.jpeg", "collection_id": collections_data[2]["id"], "position": 2},
-            {"name": "Pulsera de Cuero y Metal", "description": "Diseño moderno combinando materiales", "image_base64": "https://images.unsplash.com/photo-1721103418981-0ee59b80592e", "collection_id": collections_data[2]["id"], "position": 3},
-            {"name": "Pulsera de Eslabones", "description": "Eslabones entrelazados en oro rosa", "image_base64": "https://images.unsplash.com/photo-1721103427881-efdc0c7d011f", "collection_id": collections_data[2]["id"], "position": 4}
-        ]
+def get_image_pool() -> "ProcessPoolExecutor":
+    global _image_pool
+    if _image_pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+        _image_pool = ProcessPoolExecutor(max_workers=int(os.environ.get('IMAGE_WORKERS', '2')))
+    return _image_pool
 
-        # Create jewelry items
-        for item_data in jewelry_items:
-            jewelry_item = JewelryItem(**item_data)
-            await db.jewelry_items.insert_one(jewelry_item.dict())
+def render_variants(data: bytes, widths: List[int]) -> List[tuple]:
+    """Resize ``data`` to each width (never upscaling). Runs inside the process pool."""
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(data)) as source:
+        img = ImageOps.exif_transpose(source)
+        img.load()
+    variants = []
+    for width in sorted(set(widths)):
+        if width >= img.width:
+            continue
+        height = max(1, round(img.height * width / img.width))
+        resized = img.resize((width, height), Image.LANCZOS)
+        for fmt, (pil_format, _) in IMAGE_VARIANT_FORMATS.items():
+            frame = resized
+            if pil_format == "JPEG" and frame.mode != "RGB":
+                frame = frame.convert("RGB")
+            elif pil_format == "WEBP" and frame.mode not in ("RGB", "RGBA"):
+                frame = frame.convert("RGBA")
+            buf = io.BytesIO()
+            frame.save(buf, pil_format, quality=IMAGE_VARIANT_QUALITY, optimize=True)
+            variants.append((width, fmt, buf.getvalue()))
+    return variants
 
-        return {"message": "Demo data initialized successfully"}
-    
+async def ensure_image_variants(image_hash: str, data: bytes):
+    meta = await db.images.find_one({"hash": image_hash}, {"variants": 1})
+    if meta and meta.get("variants") is not None:
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        rendered = await loop.run_in_executor(get_image_pool(), render_variants, data, IMAGE_VARIANT_WIDTHS)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.warning("Could not render variants for image %s: %s", image_hash, e)
+        rendered = []
+    variants = []
+    for width, fmt, variant_data in rendered:
+        variant_hash = await blob_store.put(variant_data, IMAGE_VARIANT_FORMATS[fmt][1], variant_of=image_hash)
+        variants.append({"width": width, "format": fmt, "hash": variant_hash})
+    await db.images.update_one({"hash": image_hash}, {"$set": {"variants": variants}})
 
-# Include the router in the main app
-app.include_router(api_router)
+def select_variant(meta: dict, width: Optional[int], accept: str) -> Optional[dict]:
+    """Pick the smallest variant at least ``width`` wide in the best accepted format."""
+    variants = meta.get("variants") or []
+    if not width or not variants:
+        return None
+    fmt = "webp" if "image/webp" in accept else "jpeg"
+    candidates = [v for v in variants if v["format"] == fmt and v["width"] >= width]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda v: v["width"])
 
-app.add_middleware(
-    CORSMiddleware,
+# Ingest normalization
+# Antes de guardar: se elimina EXIF, se limita el lado mayor y se recodifica como JPEG
+# progresivo o WebP. Los parámetros se ajustan desde SiteConfig.
+INGEST_SETTINGS = ("image_normalize", "image_max_side", "image_format", "image_quality")
+
+def normalize_image(data: bytes, max_side: int, fmt: str, quality: int) -> Optional[tuple]:
+    """Re-encode ``data``; returns None when the original is already the better choice.
+
+    Runs inside the process pool.
+    """
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(data)) as source:
+        if getattr(source, "is_animated", False):
+            return None
+        had_exif = "exif" in source.info
+        icc_profile = source.info.get("icc_profile")
+        img = ImageOps.exif_transpose(source)
+        img.load()
+    
+    resized = max(img.size) > max_side
+    if resized:
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+    
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+    buf = io.BytesIO()
+    if fmt == "webp" or has_alpha:
+        # JPEG no tiene canal alfa: las imágenes con transparencia van siempre a WebP
+        img = img.convert("RGBA" if has_alpha else "RGB")
+        img.save(buf, "WEBP", quality=quality, method=6, icc_profile=icc_profile)
+        content_type = "image/webp"
+    else:
+        img = img.convert("RGB")
+        img.save(buf, "JPEG", quality=quality, optimize=True, progressive=True, icc_profile=icc_profile)
+        content_type = "image/jpeg"
+    
+    output = buf.getvalue()
+    if not (resized or had_exif or len(output) < len(data)):
+        return None
+    return output, content_type, img.size
+
+async def get_ingest_settings() -> dict:
+    config = await load_public_config()
+    return {name: config.get(name, SiteConfig.model_fields[name].default) for name in INGEST_SETTINGS}
+
+async def normalize_for_ingest(data: bytes, content_type: str) -> tuple:
+    """Return ``(data, content_type, extra_metadata)``; extra is empty when unchanged."""
+    settings = await get_ingest_settings()
+    if not settings["image_normalize"]:
+        return data, content_type, {}
+    
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(
+            get_image_pool(), normalize_image, data,
+            settings["image_max_side"], settings["image_format"], settings["image_quality"]
+        )
+    except Exception as e:
+        logger.warning("Could not normalize image, storing original: %s", e)
+        return data, content_type, {}
+    if result is None:
+        return data, content_type, {}
+    
+    output, output_type, (width, height) = result
+    saved_bytes = len(data) - len(output)
+    logger.info("Normalized image: %d -> %d bytes (%d saved)", len(data), len(output), saved_bytes)
+    return output, output_type, {
+        "width": width,
+        "height": height,
+        "original_size": len(data),
+        "saved_bytes": saved_bytes,
+    }
+
+async def normalize_upload(upload: dict, raw_is_new: bool) -> dict:
+    blob = await blob_store.get(upload["hash"])
+    data, content_type, extra = await normalize_for_ingest(blob[0], upload["content_type"])
+    if not extra:
+        return upload
+    
+    image_hash = await blob_store.put(data, content_type, **extra)
+    if raw_is_new and image_hash != upload["hash"]:
+        # El original sin normalizar se acaba de subir y nadie lo referencia
+        await blob_store.delete(upload["hash"])
+    return {"hash": image_hash, "content_type": content_type, "size": len(data), **extra}
+
+async def ensure_stored_image_variants(image_hash: str):
+    blob = await blob_store.get(image_hash)
+    if blob is not None:
+        await ensure_image_variants(image_hash, blob[0])
+
+async def store_image(data: bytes, content_type: str) -> str:
+    data, content_type, extra = await normalize_for_ingest(data, content_type)
+    image_hash = await blob_store.put(data, content_type, **extra)
+    await ensure_image_variants(image_hash, data)
+    return image_hash
+
+async def extract_image(data: dict, field: str, hash_field: str) -> dict:
+    """Move an inline data URI in ``data[field]`` into the blob store.
+
+    Data URIs are replaced by their hash, remote URLs are kept as-is, a hash
+    from a previous upload is checked and kept, and an empty value removes
+    both keys so that updates keep the current image.
+    """
+    value = data.pop(field, None) or ""
+    image_hash = data.pop(hash_field, None)
+    if value.startswith("data:"):
+        data[hash_field] = await store_image(*decode_data_uri(value))
+        data[field] = ""
+    elif value:
+        data[field] = value
+        data[hash_field] = None
+    elif image_hash:
+        # Imagen subida antes por POST /api/images
+        if not IMAGE_HASH_RE.match(image_hash) or not await db.images.find_one({"hash": image_hash}, {"_id": 1}):
+            raise HTTPException(status_code=400, detail="Unknown image hash")
+        data[hash_field] = image_hash
+        data[field] = ""
+    return data
+
+# Campos de imagen de cada colección: (colección, campo heredado, campo hash)
+IMAGE_FIELDS = (
+    ("collections", "image_base64", "image_hash"),
+    ("jewelry_items", "image_base64", "image_hash"),
+    ("site_config", "logo_base64", "logo_hash"),
+)
+
+# Documentos cuyo data URI no se pudo decodificar: se marcan y no se reintentan
+IMAGE_MIGRATION_ERROR = "image_migration_error"
+
+def inline_image_query(field: str) -> dict:
+    return {field: {"$regex": "^data:"}, IMAGE_MIGRATION_ERROR: {"$exists": False}}
+
+async def migrate_inline_images(progress=None) -> dict:
+    """Convert data URIs still embedded in documents into blob store references.
+
+    ``progress`` is awaited after each document. Malformed data URIs are logged
+    and the document is marked with ``image_migration_error``.
+    """
+    migrated = {"skipped": 0}
+    for collection_name, field, hash_field in IMAGE_FIELDS:
+        count = 0
+        cursor = db[collection_name].find(inline_image_query(field), {"_id": 1, field: 1})
+        async for doc in cursor:
+            try:
+                update_data = await extract_image({field: doc[field]}, field, hash_field)
+            except HTTPException as e:
+                logger.warning("Skipping the inline image of %s %s: %s", collection_name, doc["_id"], e.detail)
+                update_data = {IMAGE_MIGRATION_ERROR: e.detail}
+                migrated["skipped"] += 1
+            else:
+                count += 1
+            await db[collection_name].update_one({"_id": doc["_id"]}, {"$set": update_data})
+            if progress is not None:
+                await progress()
+        migrated[collection_name] = count
+    
+    # Imágenes guardadas antes de existir las variantes responsive
+    variants = 0
+    async for meta in db.images.find({"variants": {"$exists": False}, "variant_of": None}, {"hash": 1}):
+        await ensure_stored_image_variants(meta["hash"])
+        variants += 1
+    migrated["variants"] = variants
+    migrated["referenced"] = await recount_image_refs()
+    return migrated
+
+# Image references
+# images.refs cuenta los documentos (colecciones, joyas, configuración) que apuntan a
+# cada hash. Cuando baja a 0 el blob se borra en segundo plano junto con sus
+# variantes y las transformaciones derivadas que nadie usa.
+IMAGE_REFERENCES = tuple((collection_name, hash_field) for collection_name, _, hash_field in IMAGE_FIELDS)
+
+async def adjust_image_refs(added=(), removed=(), session=None) -> List[str]:
+    """Apply reference count changes; returns the hashes that lost a reference."""
+    deltas = Counter(h for h in added if h)
+    deltas.subtract(h for h in removed if h)
+    requests = [UpdateOne({"hash": h}, {"$inc": {"refs": delta}}) for h, delta in deltas.items() if delta]
+    if requests:
+        await db.images.bulk_write(requests, ordered=False, session=session)
+    return [h for h, delta in deltas.items() if delta < 0]
+
+async def update_image_document(collection, query: dict, update_data: dict, hash_field: str = "image_hash",
+                                inc: Optional[dict] = None) -> tuple:
+    """``$set`` ``update_data`` (and ``$inc`` ``inc``) on one document keeping image reference counts in sync.
+
+    Returns ``(before, released_hashes)``; ``before`` is ``None`` when nothing matched.
+    """
+    update = {"$set": update_data}
+    projection = {hash_field: 1}
+    if inc:
+        update["$inc"] = inc
+        projection.update(dict.fromkeys(inc, 1))
+    before = await collection.find_one_and_update(
+        query, update, projection=projection, return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return None, []
+    if hash_field not in update_data:
+        return before, []
+    return before, await adjust_image_refs(added=[update_data[hash_field]], removed=[before.get(hash_field)])
+
+async def count_image_references(image_hash: str, session=None) -> int:
+    total = 0
+    for collection_name, field in IMAGE_REFERENCES:
+        total += await db[collection_name].count_documents({field: image_hash}, session=session)
+    return total
+
+async def recount_hashes(hashes, session=None) -> List[str]:
+    """Reset ``refs`` of ``hashes`` from the documents; returns the ones left unreferenced."""
+    released = []
+    for image_hash in sorted({h for h in hashes if h}):
+        references = await count_image_references(image_hash, session=session)
+        await db.images.update_one({"hash": image_hash}, {"$set": {"refs": references}}, session=session)
+        if not references:
+            released.append(image_hash)
+    return released
+
+async def recount_image_refs() -> int:
+    """Rebuild every ``refs`` counter from the documents; returns how many images are referenced."""
+    counts = Counter()
+    for collection_name, field in IMAGE_REFERENCES:
+        async for doc in db[collection_name].find({field: {"$type": "string"}}, {field: 1}):
+            counts[doc[field]] += 1
+    await db.images.update_many({"hash": {"$nin": list(counts)}}, {"$set": {"refs": 0}})
+    if counts:
+        await db.images.bulk_write(
+            [UpdateOne({"hash": h}, {"$set": {"refs": count}}) for h, count in counts.items()], ordered=False
+        )
+    return len(counts)
+
+async def delete_unreferenced_image(image_hash: str) -> bool:
+    meta = await db.images.find_one({"hash": image_hash}, {"refs": 1, "variants": 1})
+    if not meta or meta.get("refs", 0) > 0:
+        return False
+    # El contador puede haberse desviado (escrituras concurrentes, datos antiguos):
+    # antes de borrar se comprueba contra los documentos
+    references = await count_image_references(image_hash)
+    if references:
+        await db.images.update_one({"hash": image_hash}, {"$set": {"refs": references}})
+        return False
+    # Las variantes también se guardan por contenido: dos originales con los mismos
+    # píxeles comparten variantes, que sólo se borran con el último de ellos
+    if await db.images.find_one({"variants.hash": image_hash}, {"_id": 1}):
+        return False
+    
+    derived = await db.image_transforms.distinct("result", {"source": image_hash})
+    result = await db.images.delete_one({"hash": image_hash, "refs": {"$not": {"$gt": 0}}})
+    if result.deleted_count == 0:
+        return False
+    await db.image_transforms.delete_many({"$or": [{"source": image_hash}, {"result": image_hash}]})
+    await blob_store._delete(image_hash)
+    for variant in meta.get("variants") or []:
+        await delete_unreferenced_image(variant["hash"])
+    for derived_hash in derived:
+        if derived_hash != image_hash:
+            await delete_unreferenced_image(derived_hash)
+    return True
+
+async def collect_unreferenced_images(hashes: List[str]):
+    """Background task run after deletes and image replacements."""
+    for image_hash in hashes:
+        try:
+            if await delete_unreferenced_image(image_hash):
+                logger.info("Deleted unreferenced image %s", image_hash)
+        except Exception as e:
+            logger.warning("Could not collect image %s: %s", image_hash, e)
+
+# Remote image ingestion
+# Las URLs externas (Pexels, Unsplash...) se descargan una sola vez al blob store y
+# los documentos pasan a apuntar al hash local. remote_images recuerda URL -> hash.
+REMOTE_URL_RE = re.compile(r"^https?://", re.IGNORECASE)
+REMOTE_FETCH_CONCURRENCY = int(os.environ.get('REMOTE_FETCH_CONCURRENCY', '4'))
+REMOTE_FETCH_RETRIES = int(os.environ.get('REMOTE_FETCH_RETRIES', '3'))
+REMOTE_FETCH_TIMEOUT = float(os.environ.get('REMOTE_FETCH_TIMEOUT', '15'))
+REMOTE_FETCH_BACKOFF = float(os.environ.get('REMOTE_FETCH_BACKOFF', '0.5'))
+REMOTE_FETCH_MAX_DELAY = 30.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+_http_client = None
+
+def get_http_client() -> "httpx.AsyncClient":
+    """Shared client so connections to the same host are pooled and reused."""
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.AsyncClient(
+            timeout=REMOTE_FETCH_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=REMOTE_FETCH_CONCURRENCY * 2,
+                max_keepalive_connections=REMOTE_FETCH_CONCURRENCY
+            ),
+            headers={"User-Agent": "AOJewellery-image-fetcher/1.0"}
+        )
+    return _http_client
+
+class RemoteFetchError(Exception):
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None  # Formato fecha HTTP: se usa el backoff normal
+
+async def download_image(client: "httpx.AsyncClient", url: str) -> bytes:
+    async with client.stream("GET", url) as response:
+        if response.status_code in RETRYABLE_STATUS:
+            raise RemoteFetchError(
+                f"HTTP {response.status_code}",
+                retryable=True,
+                retry_after=parse_retry_after(response.headers.get("retry-after"))
+            )
+        if response.status_code != 200:
+            raise RemoteFetchError(f"HTTP {response.status_code}")
+        if int(response.headers.get("content-length") or 0) > MAX_UPLOAD_BYTES:
+            raise RemoteFetchError("Image too large")
+        
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise RemoteFetchError("Image too large")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+async def fetch_remote_image(url: str, client: Optional["httpx.AsyncClient"] = None) -> tuple:
+    """Download ``url`` with exponential backoff; returns ``(data, content_type)``."""
+    import httpx
+    client = client or get_http_client()
+    for attempt in range(REMOTE_FETCH_RETRIES + 1):
+        try:
+            data = await download_image(client, url)
+            break
+        except (httpx.TransportError, RemoteFetchError) as e:
+            retryable = isinstance(e, httpx.TransportError) or e.retryable
+            if not retryable or attempt == REMOTE_FETCH_RETRIES:
+                raise RemoteFetchError(str(e) or type(e).__name__) from e
+            delay = REMOTE_FETCH_BACKOFF * 2 ** attempt
+            delay += random.uniform(0, delay)
+            if getattr(e, "retry_after", None):
+                delay = max(delay, e.retry_after)
+            await asyncio.sleep(min(delay, REMOTE_FETCH_MAX_DELAY))
+    
+    # El Content-Type remoto no es fiable: se comprueba la cabecera de la imagen
+    content_type, _ = probe_image(data)
+    if content_type is None:
+        raise RemoteFetchError("Unsupported image format")
+    return data, content_type
+
+async def ingest_remote_url(url: str, semaphore: asyncio.Semaphore, client: Optional["httpx.AsyncClient"] = None) -> Optional[str]:
+    cached = await db.remote_images.find_one({"url": url, "hash": {"$type": "string"}}, {"hash": 1})
+    if cached and await db.images.find_one({"hash": cached["hash"]}, {"_id": 1}):
+        return cached["hash"]
+    
+    async with semaphore:
+        try:
+            data, content_type = await fetch_remote_image(url, client)
+        except RemoteFetchError as e:
+            logger.warning("Could not fetch remote image %s: %s", url, e)
+            await db.remote_images.update_one(
+                {"url": url},
+                {"$set": {"error": str(e), "failed_at": datetime.utcnow()}, "$inc": {"failures": 1}},
+                upsert=True
+            )
+            return None
+    
+    image_hash = await store_image(data, content_type)
+    await db.remote_images.update_one(
+        {"url": url},
+        {"$set": {"hash": image_hash, "fetched_at": datetime.utcnow(), "error": None}},
+        upsert=True
+    )
+    return image_hash
+
+async def ingest_remote_images(client: Optional["httpx.AsyncClient"] = None) -> dict:
+    """Fetch every remote image URL still stored in documents and point them at the blob store."""
+    urls = set()
+    for collection_name, field, _ in IMAGE_FIELDS:
+        urls.update(await db[collection_name].distinct(field, {field: {"$regex": REMOTE_URL_RE.pattern, "$options": "i"}}))
+    urls = sorted(urls)
+    
+    semaphore = asyncio.Semaphore(REMOTE_FETCH_CONCURRENCY)
+    hashes = await asyncio.gather(*(ingest_remote_url(url, semaphore, client) for url in urls))
+    
+    summary = {"urls": len(urls), "fetched": 0, "failed": 0, "updated": 0}
+    for url, image_hash in zip(urls, hashes):
+        if image_hash is None:
+            summary["failed"] += 1
+            continue
+        summary["fetched"] += 1
+        for collection_name, field, hash_field in IMAGE_FIELDS:
+            result = await db[collection_name].update_many({field: url}, {"$set": {field: "", hash_field: image_hash}})
+            if result.modified_count:
+                await adjust_image_refs(added=[image_hash] * result.modified_count)
+                summary["updated"] += result.modified_count
+                if collection_name == "site_config":
+                    config_cache.invalidate()
+    return summary
+
+# Server-side transforms
+# Recorte y ajustes de color del editor aplicados en el servidor. El resultado se
+# guarda en el blob store y se recuerda en image_transforms por (origen, parámetros).
+CROP_ASPECT_RATIOS = {"square": 1.0, "vertical": 3 / 4, "horizontal": 4 / 3}
+LUMA_WEIGHTS = (0.213, 0.715, 0.072)
+
+def center_crop_box(width: int, height: int, aspect_ratio: float) -> tuple:
+    """Largest centred box with ``aspect_ratio`` (width / height) that fits the image."""
+    if width / height > aspect_ratio:
+        crop_width, crop_height = round(height * aspect_ratio), height
+    else:
+        crop_width, crop_height = width, round(width / aspect_ratio)
+    left = (width - crop_width) // 2
+    top = (height - crop_height) // 2
+    return left, top, left + crop_width, top + crop_height
+
+def adjust_colors(rgb: "np.ndarray", brightness: float, contrast: float, saturation: float) -> "np.ndarray":
+    """Apply CSS ``brightness() contrast() saturate()`` to a float32 RGB array in [0, 255].
+
+    Follows the Filter Effects spec so the result matches the canvas preview,
+    clamping after each filter as browsers do.
+    """
+    import numpy as np
+    if brightness != 1:
+        rgb *= brightness
+        np.clip(rgb, 0, 255, out=rgb)
+    if contrast != 1:
+        rgb -= 127.5
+        rgb *= contrast
+        rgb += 127.5
+        np.clip(rgb, 0, 255, out=rgb)
+    if saturation != 1:
+        matrix = (1 - saturation) * np.tile(np.array(LUMA_WEIGHTS, dtype=np.float32), (3, 1)) + saturation * np.eye(3, dtype=np.float32)
+        rgb = rgb @ matrix.T
+        np.clip(rgb, 0, 255, out=rgb)
+    return rgb
+
+def transform_image(data: bytes, params: dict, max_side: int, fmt: str, quality: int) -> tuple:
+    """Crop, colour-adjust and re-encode ``data``. Runs inside the process pool."""
+    import numpy as np
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(data)) as source:
+        img = ImageOps.exif_transpose(source)
+        img.load()
+    
+    img = img.crop(center_crop_box(img.width, img.height, CROP_ASPECT_RATIOS[params["crop_type"]]))
+    target_width = min(params["width"] or img.width, img.width)
+    scale = min(target_width / img.width, max_side / max(img.size), 1)
+    if scale < 1:
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+    
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+    alpha = img.convert("RGBA").getchannel("A") if has_alpha else None
+    rgb = np.asarray(img.convert("RGB"), dtype=np.float32)
+    rgb = adjust_colors(rgb, params["brightness"] / 100, params["contrast"] / 100, params["saturation"] / 100)
+    img = Image.fromarray(np.rint(rgb).astype(np.uint8), "RGB")
+    
+    buf = io.BytesIO()
+    if fmt == "webp" or alpha is not None:
+        if alpha is not None:
+            img.putalpha(alpha)
+        img.save(buf, "WEBP", quality=quality, method=6)
+        content_type = "image/webp"
+    else:
+        img.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+        content_type = "image/jpeg"
+    return buf.getvalue(), content_type, img.size
+
+def transform_cache_key(source_hash: str, params: dict, settings: dict) -> str:
+    key = {
+        "source": source_hash,
+        **params,
+        # La salida depende también de la configuración de ingesta
+        "max_side": settings["image_max_side"],
+        "format": settings["image_format"],
+        "quality": settings["image_quality"],
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+async def get_transformed_image(source_hash: str, params: dict) -> dict:
+    """Return the stored result for ``params``, rendering it on a cache miss."""
+    settings = await get_ingest_settings()
+    key = transform_cache_key(source_hash, params, settings)
+    cached = await db.image_transforms.find_one({"key": key}, {"_id": 0, "result": 1})
+    if cached:
+        meta = await db.images.find_one({"hash": cached["result"]}, {"_id": 0, "hash": 1, "content_type": 1, "size": 1, "width": 1, "height": 1})
+        if meta:
+            return {**meta, "cached": True}
+    
+    blob = await blob_store.get(source_hash)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    loop = asyncio.get_running_loop()
+    try:
+        data, content_type, (width, height) = await loop.run_in_executor(
+            get_image_pool(), transform_image, blob[0], params,
+            settings["image_max_side"], settings["image_format"], settings["image_quality"]
+        )
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not transform image: {e}")
+    
+    extra = {"width": width, "height": height, "transform_of": source_hash}
+    if params["width"]:
+        # Las vistas previas no necesitan variantes responsive
+        extra["variants"] = []
+    image_hash = await blob_store.put(data, content_type, **extra)
+    await db.image_transforms.update_one(
+        {"key": key},
+        {"$set": {"source": source_hash, "result": image_hash, "params": params, "created_at": datetime.utcnow()}},
+        upsert=True
+    )
+    return {"hash": image_hash, "content_type": content_type, "size": len(data), "width": width, "height": height, "cached": False}
+
+# Listing projections
+# El formato "summary" (por defecto) omite los data URI heredados y devuelve sólo
+# el hash de la imagen; URLs remotas se mantienen porque ocupan unos pocos bytes.
+# Los data URI pendientes se migran al blob store en el arranque (migrate_images).
+FIELD_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+SUMMARY_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "name": 1,
+    "description": 1,
+    "collection_id": 1,
+    "position": 1,
+    "image_hash": 1,
+    "created_at": 1,
+    "image_base64": {"$cond": [
+        # $substrCP y no $substrBytes: cortar dentro de un carácter UTF-8 es un error del servidor
+        {"$eq": [{"$substrCP": [{"$ifNull": ["$image_base64", ""]}, 0, 5]}, "data:"]},
+        "",
+        "$image_base64"
+    ]},
+}
+
+def parse_field_list(value: Optional[str]) -> List[str]:
+    names = [name.strip() for name in (value or "").split(",") if name.strip()]
+    for name in names:
+        if not FIELD_NAME_RE.match(name):
+            raise HTTPException(status_code=400, detail=f"Invalid field name: {name}")
+    return names
+
+def listing_projection(fields: Optional[str] = None, exclude: Optional[str] = None, shape: str = "summary") -> dict:
+    """Build the Mongo projection for listing endpoints from the query parameters."""
+    include = parse_field_list(fields)
+    omit = parse_field_list(exclude)
+    if include and omit:
+        raise HTTPException(status_code=400, detail="Use either fields or exclude, not both")
+    if include:
+        return {"_id": 0, **{name: 1 for name in include}}
+    if omit:
+        return {"_id": 0, **{name: 0 for name in omit if name != "_id"}}
+    if shape == "full":
+        return {"_id": 0}
+    if shape == "summary":
+        return SUMMARY_PROJECTION
+    raise HTTPException(status_code=400, detail="shape must be 'summary' or 'full'")
+
+# Keyset pagination
+# El cursor codifica (position, id) del último elemento devuelto; la siguiente página
+# empieza estrictamente después de él, así que no hay saltos ni duplicados.
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+UNPAGINATED_LIMIT = 1000
+
+def encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc.get("position", 0), doc["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(position, (int, float)) or not isinstance(item_id, str):
+            raise ValueError
+        return position, item_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def paginate(collection, query: dict, projection: dict, limit: Optional[int], cursor: Optional[str]) -> dict:
+    """Return one page of ``collection`` ordered by (position, id) plus the next cursor."""
+    limit = limit or DEFAULT_PAGE_SIZE
+    if cursor:
+        position, item_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {"position": {"$gt": position}},
+            {"position": position, "id": {"$gt": item_id}}
+        ]}]}
+    
+    # El cursor necesita position e id aunque el cliente no los haya pedido
+    projection = dict(projection)
+    if any(v == 1 for k, v in projection.items() if k != "_id"):
+        projection.update({"position": 1, "id": 1})
+    else:
+        projection.pop("position", None)
+        projection.pop("id", None)
+    
+    docs = await collection.find(query, projection).sort([("position", 1), ("id", 1)]).limit(limit + 1).to_list(limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return {"items": docs[:limit], "next_cursor": next_cursor, "limit": limit}
+
+async def unpaginated_response(request: Request, collection, query: dict, projection: dict, route: str) -> Response:
+    """Plain list for clients that send neither ``limit`` nor ``cursor``.
+
+    Still capped at UNPAGINATED_LIMIT, but a cut-off list says so with
+    ``X-Truncated`` and an ``X-Next-Cursor`` to continue with ``?cursor=``.
+    """
+    page = await paginate(collection, query, projection, UNPAGINATED_LIMIT, None)
+    headers = None
+    if page["next_cursor"]:
+        headers = {"X-Truncated": "true", "X-Next-Cursor": page["next_cursor"]}
+    return conditional_response(request, page["items"], route, headers)
+
+# Search
+# Búsqueda por nombre y descripción con el índice de texto de Mongo (stemming en
+# español, sin acentos, ordenado por textScore). Si el servidor no soporta $text se
+# usa un índice invertido en memoria con la misma normalización aproximada.
+SEARCH_WEIGHTS = {"name": 5, "description": 1}
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')  # auto | text | memory
+SEARCH_TOKEN_RE = re.compile(r"[a-z0-9]+")
+SPANISH_STOPWORDS = frozenset("""
+    a al algo como con de del desde el ella ellas ellos en entre es esta este esto la las
+    le les lo los mas mi muy no nos o para pero por que se sin sobre su sus te tu un una
+    uno unos unas y ya
+""".split())
+SPANISH_SUFFIXES = ("mente", "es", "os", "as", "s", "a", "o", "e")
+
+def fold_text(text: str) -> str:
+    """Lowercase and strip diacritics ("Pendientes ÉTNICOS" -> "pendientes etnicos")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def stem_spanish(word: str) -> str:
+    # Stemming ligero: sólo quita plurales y género, suficiente para anillo/anillos
+    for suffix in SPANISH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+def search_terms(text: str) -> List[str]:
+    return [
+        stem_spanish(token) for token in SEARCH_TOKEN_RE.findall(fold_text(text))
+        if token not in SPANISH_STOPWORDS
+    ]
+
+class SearchIndex:
+    """In-process inverted index over jewelry_items, rebuilt lazily after writes."""
+
+    def __init__(self, ttl: float):
+        # El TTL cubre escrituras hechas por otros workers
+        self.ttl = ttl
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.docs: Dict[str, tuple] = {}
+        self.expires_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.expires_at = 0.0
+
+    @staticmethod
+    def build(items: List[dict]) -> tuple:
+        postings: Dict[str, Dict[str, float]] = {}
+        docs = {}
+        for item in items:
+            docs[item["id"]] = (item.get("collection_id"), item.get("position", 0))
+            for field, weight in SEARCH_WEIGHTS.items():
+                for term in search_terms(item.get(field) or ""):
+                    entry = postings.setdefault(term, {})
+                    entry[item["id"]] = entry.get(item["id"], 0.0) + weight
+        return postings, docs
+
+    async def refresh(self):
+        if time.monotonic() < self.expires_at:
+            return
+        async with self.lock:
+            if time.monotonic() < self.expires_at:
+                return
+            items = await db.jewelry_items.find(
+                {}, {"_id": 0, "id": 1, "collection_id": 1, "position": 1, **{field: 1 for field in SEARCH_WEIGHTS}}
+            ).to_list(None)
+            self.postings, self.docs = await asyncio.to_thread(self.build, items)
+            self.expires_at = time.monotonic() + self.ttl
+
+    def search(self, query: str) -> List[tuple]:
+        """Return (item_id, score) for every match, best first.
+
+        Same semantics as $text: any term matches, "-term" excludes.
+        """
+        include, exclude = [], set()
+        for word in query.split():
+            terms = search_terms(word.lstrip("-"))
+            if word.startswith("-"):
+                exclude.update(terms)
+            else:
+                include.extend(terms)
+        
+        scores: Dict[str, float] = {}
+        total = len(self.docs) or 1
+        for term in set(include):
+            matches = self.postings.get(term, {})
+            idf = math.log(1 + total / (len(matches) or 1))
+            for item_id, frequency in matches.items():
+                scores[item_id] = scores.get(item_id, 0.0) + idf * frequency / (frequency + 1.2)
+        for term in exclude:
+            for item_id in self.postings.get(term, {}):
+                scores.pop(item_id, None)
+        
+        return sorted(scores.items(), key=lambda match: (-match[1], self.docs[match[0]][1], match[0]))
+
+search_index = SearchIndex(float(os.environ.get('SEARCH_INDEX_TTL', '60')))
+# Sin índice de texto (IndexNotFound) se deja de intentar $text durante un rato:
+# el índice puede crearse más tarde (create_indexes, otro worker) y se vuelve a probar
+TEXT_INDEX_NOT_FOUND = 27
+TEXT_SEARCH_RETRY_SECONDS = float(os.environ.get('TEXT_SEARCH_RETRY_SECONDS', '300'))
+text_search_retry_at = math.inf if SEARCH_BACKEND == "memory" else 0.0
+
+def encode_offset_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([offset]).encode()).decode().rstrip("=")
+
+def decode_offset_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        (offset,) = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError
+        return offset
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def text_search(query: str, collection_id: Optional[str], offset: int, limit: int) -> tuple:
+    """Search with the Mongo text index: (items, facet counts by collection_id)."""
+    match = {"$text": {"$search": query}}
+    filtered = {**match, "collection_id": collection_id} if collection_id else match
+    projection = {**SUMMARY_PROJECTION, "score": {"$meta": "textScore"}}
+    sort = [("score", {"$meta": "textScore"}), ("position", 1), ("id", 1)]
+    
+    items = await db.jewelry_items.find(filtered, projection).sort(sort).skip(offset).limit(limit).to_list(limit)
+    facets = await db.jewelry_items.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$collection_id", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    return items, {facet["_id"]: facet["count"] for facet in facets}
+
+async def memory_search(query: str, collection_id: Optional[str], offset: int, limit: int) -> tuple:
+    await search_index.refresh()
+    matches = search_index.search(query)
+    facets = Counter(search_index.docs[item_id][0] for item_id, _ in matches)
+    if collection_id:
+        matches = [match for match in matches if search_index.docs[match[0]][0] == collection_id]
+    
+    page = matches[offset:offset + limit]
+    docs = await db.jewelry_items.find({"id": {"$in": [item_id for item_id, _ in page]}}, SUMMARY_PROJECTION).to_list(None)
+    by_id = {doc["id"]: doc for doc in docs}
+    # Un documento borrado desde la última reconstrucción simplemente no aparece
+    items = [{**by_id[item_id], "score": round(score, 4)} for item_id, score in page if item_id in by_id]
+    return items, dict(facets)
+
+async def search_items(query: str, collection_id: Optional[str], offset: int, limit: int) -> tuple:
+    global text_search_retry_at
+    if time.monotonic() >= text_search_retry_at:
+        try:
+            return await text_search(query, collection_id, offset, limit)
+        except OperationFailure as e:
+            if SEARCH_BACKEND == "text":
+                raise
+            # Cualquier otro fallo sólo afecta a esta petición: se responde con el índice en memoria
+            logger.warning("Text search failed, using in-process index: %s", e)
+            if e.code == TEXT_INDEX_NOT_FOUND:
+                text_search_retry_at = time.monotonic() + TEXT_SEARCH_RETRY_SECONDS
+    return await memory_search(query, collection_id, offset, limit)
+
+# Background jobs
+# Trabajos largos (borrado en cascada de colecciones) que se ejecutan fuera de la
+# petición. El estado vive en db.jobs para consultarlo desde cualquier worker; si un
+# worker muere, otro retoma el trabajo al caducar su lease.
+JOB_BATCH_SIZE = int(os.environ.get('JOB_BATCH_SIZE', '500'))
+JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', '60'))
+JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', '7'))
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+_transactions_supported = None
+_job_tasks = {}  # id -> tarea que lo ejecuta en este proceso
+JOB_PROJECTION = {"_id": 0, "active_key": 0}
+
+async def transactions_supported() -> bool:
+    """Transactions need a replica set or a sharded cluster."""
+    global _transactions_supported
+    if _transactions_supported is None:
+        try:
+            hello = await get_client().admin.command("hello")
+            _transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+        except PyMongoError:
+            _transactions_supported = False
+    return _transactions_supported
+
+async def run_transaction(callback):
+    """Run ``callback(session)`` in a transaction, or with no session on a standalone server.
+
+    ``callback`` may be retried on transient errors, so it must re-read what it changes.
+    """
+    if not await transactions_supported():
+        return await callback(None)
+    async with await get_client().start_session() as session:
+        # MONGO_READ_PREFERENCE puede apuntar a secundarios; una transacción sólo lee del primario
+        return await session.with_transaction(callback, read_preference=ReadPreference.PRIMARY)
+
+async def create_job(job_type: str, target: str, **fields) -> dict:
+    """Insert a pending job, or return the one already active for ``target``."""
+    now = datetime.utcnow()
+    job = {
+        "id": str(uuid.uuid4()),
+        "type": job_type,
+        "status": "pending",
+        "active_key": f"{job_type}:{target}",
+        "processed": 0,
+        "error": None,
+        "worker": None,
+        "lease_until": None,
+        "created_at": now,
+        "updated_at": now,
+        "finished_at": None,
+        **fields,
+    }
+    try:
+        await db.jobs.insert_one(job)
+    except DuplicateKeyError:
+        existing = await db.jobs.find_one({"active_key": job["active_key"]}, JOB_PROJECTION)
+        if existing is not None:
+            return existing
+        raise
+    job.pop("_id", None)
+    return job
+
+async def claim_job(job_id: str) -> Optional[dict]:
+    """Take the job's lease; returns the job as it was before the claim, or None."""
+    now = datetime.utcnow()
+    return await db.jobs.find_one_and_update(
+        {"id": job_id, "status": {"$in": ["pending", "running"]}, "$or": [
+            {"lease_until": None}, {"lease_until": {"$lt": now}}
+        ]},
+        {"$set": {
+            "status": "running",
+            "worker": WORKER_ID,
+            "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            "updated_at": now,
+        }},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+
+def job_progress(processed: int = 0) -> dict:
+    now = datetime.utcnow()
+    update = {"$set": {"updated_at": now, "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS)}}
+    if processed:
+        update["$inc"] = {"processed": processed}
+    return update
+
+def job_finished(status: str, error: Optional[str] = None) -> dict:
+    now = datetime.utcnow()
+    return {
+        "$set": {"status": status, "error": error, "updated_at": now, "finished_at": now, "lease_until": None},
+        "$unset": {"active_key": ""},
+    }
+
+class JobLost(Exception):
+    """The job's lease expired and another runner claimed it."""
+
+async def update_job(job_id: str, update: dict, session=None):
+    """Write job state only while this worker still holds the lease."""
+    result = await db.jobs.update_one({"id": job_id, "worker": WORKER_ID}, update, session=session)
+    if result.matched_count == 0:
+        raise JobLost(job_id)
+
+async def renew_lease(job_id: str):
+    """Keep the lease alive while the runner works; phases without progress updates
+    (image collection, variant rendering) can take longer than JOB_LEASE_SECONDS."""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        try:
+            result = await db.jobs.update_one(
+                {"id": job_id, "worker": WORKER_ID, "status": "running"},
+                {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)}}
+            )
+        except PyMongoError as e:
+            logger.warning("Could not renew the lease of job %s: %s", job_id, e)
+            continue
+        if result.matched_count == 0:
+            # Perdido: la siguiente escritura del runner lanza JobLost
+            return
+
+async def delete_collection_job(job: dict):
+    """Delete the collection's items in batches, then the collection itself.
+
+    Each batch removes the items, their image references and updates the job
+    progress in one transaction, so an interrupted job never double-counts.
+    The collection goes last: until then no item is left without its collection.
+    """
+    job_id, collection_id = job["id"], job["collection_id"]
+    
+    async def delete_batch(session):
+        # Sin transacción es la única valla: no se borra nada si otro worker tiene el trabajo
+        await update_job(job_id, job_progress(), session=session)
+        items = await db.jewelry_items.find(
+            {"collection_id": collection_id}, {"_id": 0, "id": 1, "image_hash": 1}, session=session
+        ).limit(JOB_BATCH_SIZE).to_list(JOB_BATCH_SIZE)
+        if not items:
+            return 0, []
+        result = await db.jewelry_items.delete_many({"id": {"$in": [item["id"] for item in items]}}, session=session)
+        hashes = [item.get("image_hash") for item in items]
+        if result.deleted_count == len(items):
+            released = await adjust_image_refs(removed=hashes, session=session)
+        else:
+            # Otra escritura borró parte del lote entre la lectura y el borrado: no se
+            # sabe qué piezas, así que los contadores afectados se recalculan
+            released = await recount_hashes(hashes, session=session)
+        await update_job(job_id, job_progress(result.deleted_count), session=session)
+        return result.deleted_count, released
+    
+    while True:
+        deleted, released = await run_transaction(delete_batch)
+        await collect_unreferenced_images(released)
+        if not deleted:
+            break
+        search_index.invalidate()
+    
+    async def delete_collection_document(session):
+        collection = await db.collections.find_one_and_delete(
+            {"id": collection_id}, projection={"image_hash": 1}, session=session
+        )
+        released = await adjust_image_refs(removed=[collection and collection.get("image_hash")], session=session)
+        await update_job(job_id, job_finished("completed"), session=session)
+        return released
+    
+    await collect_unreferenced_images(await run_transaction(delete_collection_document))
+
+# Marca permanente (sin finished_at, así que no caduca) de que ya no quedan data URI:
+# los arranques siguientes no vuelven a buscarlos
+IMAGE_MIGRATION_MARKER = {"id": "marker:migrate_images", "type": "marker", "status": "completed"}
+
+async def mark_images_migrated():
+    await db.jobs.update_one(
+        {"id": IMAGE_MIGRATION_MARKER["id"]},
+        {"$setOnInsert": {**IMAGE_MIGRATION_MARKER, "created_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+async def migrate_images_job(job: dict):
+    """Move the inline images of documents saved by older versions into the blob store."""
+    async def progress():
+        await update_job(job["id"], job_progress(1))
+    
+    migrated = await migrate_inline_images(progress=progress)
+    finished = job_finished("completed")
+    finished["$set"]["migrated"] = migrated
+    await update_job(job["id"], finished)
+    await mark_images_migrated()
+    search_index.invalidate()
+    config_cache.invalidate()
+
+JOB_RUNNERS = {
+    "delete_collection": delete_collection_job,
+    "migrate_images": migrate_images_job,
+}
+
+async def run_job(job_id: str):
+    job = await claim_job(job_id)
+    if job is None:
+        # Ya terminado o en manos de otro worker con el lease vigente
+        return
+    heartbeat = asyncio.create_task(renew_lease(job_id))
+    try:
+        await JOB_RUNNERS[job["type"]](job)
+    except JobLost:
+        logger.warning("Job %s (%s) was taken over by another worker", job_id, job["type"])
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job_id, job["type"])
+        try:
+            await update_job(job_id, job_finished("failed", str(e)))
+        except JobLost:
+            pass
+    finally:
+        heartbeat.cancel()
+
+def start_job(job_id: str):
+    if job_id in _job_tasks:
+        # Ya se ejecuta en este proceso
+        return
+    task = asyncio.create_task(run_job(job_id))
+    _job_tasks[job_id] = task
+    task.add_done_callback(lambda _: _job_tasks.pop(job_id, None))
+
+async def resume_jobs():
+    """Restart jobs left unfinished by a worker that stopped."""
+    try:
+        stale = await db.jobs.find(
+            {"status": {"$in": ["pending", "running"]}, "$or": [
+                {"lease_until": None}, {"lease_until": {"$lt": datetime.utcnow()}}
+            ]},
+            {"_id": 0, "id": 1}
+        ).to_list(None)
+    except PyMongoError as e:
+        logger.error("Could not resume jobs: %s", e)
+        return
+    for job in stale:
+        start_job(job["id"])
+
+async def schedule_inline_image_migration():
+    """Start the image migration if any document still embeds a data URI.
+
+    Listings omit data URIs, so unmigrated images would show up blank. Once a
+    migration finds nothing left, the marker skips these scans on later starts.
+    """
+    try:
+        if await db.jobs.find_one({"id": IMAGE_MIGRATION_MARKER["id"]}, {"_id": 1}):
+            return
+        for collection_name, field, _ in IMAGE_FIELDS:
+            if await db[collection_name].find_one(inline_image_query(field), {"_id": 1}):
+                job = await create_job("migrate_images", "inline")
+                start_job(job["id"])
+                return
+        await mark_images_migrated()
+    except PyMongoError as e:
+        logger.error("Could not schedule the image migration: %s", e)
+
+# Indexes
+# Claves usadas por filtros, ordenaciones y paginación (position, id)
+INDEXES = {
+    "collections": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("position", ASCENDING), ("id", ASCENDING)], name="position_id"),
+        # Conteo de referencias de imágenes (recolección y recuento)
+        IndexModel([("image_hash", ASCENDING)], name="image_hash"),
+    ],
+    "jewelry_items": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("collection_id", ASCENDING), ("position", ASCENDING), ("id", ASCENDING)], name="collection_position_id"),
+        IndexModel([("position", ASCENDING), ("id", ASCENDING)], name="position_id"),
+        IndexModel([("image_hash", ASCENDING)], name="image_hash"),
+        IndexModel(
+            [(field, TEXT) for field in SEARCH_WEIGHTS],
+            name="text_search",
+            weights=SEARCH_WEIGHTS,
+            default_language="spanish"
+        ),
+    ],
+    "site_config": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "images": [
+        IndexModel([("hash", ASCENDING)], name="hash_unique", unique=True),
+        IndexModel([("variant_of", ASCENDING)], name="variant_of"),
+        IndexModel([("variants.hash", ASCENDING)], name="variants_hash"),
+    ],
+    "image_transforms": [
+        IndexModel([("key", ASCENDING)], name="key_unique", unique=True),
+        IndexModel([("source", ASCENDING)], name="source"),
+    ],
+    "remote_images": [
+        IndexModel([("url", ASCENDING)], name="url_unique", unique=True),
+    ],
+    "jobs": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Un solo trabajo activo por objetivo; active_key se borra al terminar
+        IndexModel([("active_key", ASCENDING)], name="active_key_unique", unique=True, sparse=True),
+        IndexModel([("finished_at", ASCENDING)], name="finished_ttl", expireAfterSeconds=JOB_RETENTION_DAYS * 86400),
+    ],
+}
+
+async def ensure_indexes():
+    async def create(collection_name: str, indexes: list):
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except PyMongoError as e:
+            # Un índice único puede fallar si ya hay duplicados; no impedimos el arranque
+            logger.error("Could not create indexes on %s: %s", collection_name, e)
+    
+    # Una petición por colección, en paralelo: con índices ya creados son casi gratis
+    await asyncio.gather(*(create(name, indexes) for name, indexes in INDEXES.items()))
+
+# Site config cache
+# GET /api/config se pide en cada visita y la configuración sólo cambia cuando el
+# admin la guarda: se cachea en memoria con TTL y se invalida al escribir.
+class ConfigCache:
+    """TTL cache of one document.
+
+    ``generation`` is bumped by ``invalidate()``: a loader reads it before going to
+    Mongo and passes it to ``set()``, which drops the value if a write happened in
+    between, so a slow read can never cache the document from before the write.
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.value = None
+        self.expires_at = 0.0
+        self.generation = 0
+        self.lock = asyncio.Lock()
+
+    def get(self) -> Optional[dict]:
+        if self.value is not None and time.monotonic() < self.expires_at:
+            return self.value
+        return None
+
+    def set(self, value: dict, generation: int):
+        if generation != self.generation:
+            return
+        self.value = value
+        self.expires_at = time.monotonic() + self.ttl
+
+    def invalidate(self):
+        self.generation += 1
+        self.value = None
+        self.expires_at = 0.0
+
+config_cache = ConfigCache(float(os.environ.get('CONFIG_CACHE_TTL', '60')))
+_config_watch_task = None
+
+async def watch_site_config():
+    """Invalidate the config cache when another worker changes site_config.
+
+    Change streams need a replica set; without one we fall back to the TTL.
+    """
+    while True:
+        try:
+            async with db.site_config.watch() as stream:
+                async for _ in stream:
+                    config_cache.invalidate()
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as e:
+            logger.warning("site_config change stream stopped, relying on TTL: %s", e)
+            return
+
+# Conditional requests
+# ETag fuerte calculado sobre el cuerpo JSON: si el cliente ya lo tiene respondemos 304.
+# Cache-Control se puede ajustar por ruta con CACHE_CONTROL_<RUTA>.
+CACHE_CONTROL = {
+    route: os.environ.get(f'CACHE_CONTROL_{route.upper()}', default)
+    for route, default in {
+        "config": "public, max-age=0, must-revalidate",
+        "collections": "public, max-age=0, must-revalidate",
+        "collection_items": "public, max-age=0, must-revalidate",
+        "jewelry_items": "public, max-age=0, must-revalidate",
+        "storefront": "public, max-age=0, must-revalidate",
+        "search": "public, max-age=0, must-revalidate",
+    }.items()
+}
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+def conditional_response(request: Request, content: Any, route: str, headers: Optional[dict] = None) -> Response:
+    body = dump_json(content)
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": CACHE_CONTROL[route]}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Response compression
+# Brotli/gzip negociado con Accept-Encoding. Las respuestas GET con ETag se guardan ya
+# comprimidas (clave: ETag + encoding) para no recomprimir el mismo listado.
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[coding] = q
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    wildcard = qualities.get("*", 0.0)
+    best = max(supported, key=lambda c: (qualities.get(c, wildcard), c == "br"))
+    return best if qualities.get(best, wildcard) > 0 else None
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class CompressedBodyCache:
+    """LRU of compressed bodies bounded by total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        body = self.entries.get(key)
+        if body is not None:
+            self.entries.move_to_end(key)
+        return body
+
+    def put(self, key: tuple, body: bytes):
+        if len(body) > self.max_bytes or key in self.entries:
+            return
+        self.entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, cache_bytes: int = 32 * 1024 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = CompressedBodyCache(cache_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        
+        cacheable = scope["method"] == "GET"
+        start_message = None
+        passthrough = False
+        body_parts = []
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if (headers.get("content-encoding")
+                        or message["status"] in (204, 304)
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            
+            body = b"".join(body_parts)
+            headers = MutableHeaders(raw=start_message["headers"])
+            if len(body) < self.minimum_size:
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
+            
+            etag = headers.get("etag")
+            cache_key = (etag, encoding) if cacheable and etag and start_message["status"] == 200 else None
+            compressed = self.cache.get(cache_key) if cache_key else None
+            if compressed is None:
+                if len(body) > 64 * 1024:
+                    compressed = await asyncio.to_thread(compress_body, body, encoding)
+                else:
+                    compressed = compress_body(body, encoding)
+                if cache_key:
+                    self.cache.put(cache_key, compressed)
+            
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            if etag and not etag.startswith("W/"):
+                # La representación comprimida no es idéntica byte a byte: ETag débil
+                headers["ETag"] = f"W/{etag}"
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+# Request metrics
+# Middleware externo: mide la petición completa (incluida la compresión), cuenta las
+# peticiones en curso y añade Server-Timing para las devtools del navegador.
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes')
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.route_paths = None
+
+    def route_label(self, scope) -> str:
+        # El router deja el endpoint en el scope; se etiqueta con la plantilla de la ruta
+        # (/api/images/{image_hash}) para no crear una serie por cada URL
+        if self.route_paths is None:
+            self.route_paths = {
+                route.endpoint: route.path for route in app.routes if getattr(route, "endpoint", None)
+            }
+        return self.route_paths.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        timing = RequestTiming()
+        token = _request_timing.set(timing)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+        metrics.in_flight += 1
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - started
+                metrics.request_duration.observe(elapsed, (scope["method"], self.route_label(scope), str(status)))
+                if SERVER_TIMING:
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.append("Server-Timing", ", ".join([
+                        f'db;dur={timing.db_seconds * 1000:.2f};desc="{timing.db_commands} commands"',
+                        f"json;dur={timing.json_seconds * 1000:.2f}",
+                        f"app;dur={elapsed * 1000:.2f}",
+                    ]))
+                    headers["Timing-Allow-Origin"] = "*"
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            metrics.response_size.observe(size, (scope["method"], self.route_label(scope)))
+            _request_timing.reset(token)
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Warm-up and health checks
+# Antes de declararse listo el worker abre minPoolSize conexiones y carga la
+# configuración en caché, así que tras un reinicio las primeras peticiones no pagan
+# el handshake con Mongo. /healthz sólo comprueba Mongo; /readyz además exige que el
+# arranque haya terminado y deja de responder 200 al apagarse.
+HEALTH_CHECK_TIMEOUT = float(os.environ.get('HEALTH_CHECK_TIMEOUT', '2'))
+MONGO_WARMUP_TIMEOUT = float(os.environ.get('MONGO_WARMUP_TIMEOUT', '10'))
+_ready = False
+
+async def ping_mongo(timeout: float = HEALTH_CHECK_TIMEOUT) -> Optional[str]:
+    """Return None when Mongo answers ``ping`` within ``timeout`` seconds, else a short reason."""
+    try:
+        await asyncio.wait_for(get_client().admin.command("ping"), timeout)
+        return None
+    except asyncio.TimeoutError:
+        logger.warning("MongoDB ping timed out after %gs", timeout)
+        return "timeout"
+    except PyMongoError as e:
+        # El detalle (hosts, topología) va al log, no a un endpoint público
+        logger.warning("MongoDB ping failed: %s", e)
+        return "error"
+
+async def warm_up():
+    started = time.perf_counter()
+    target = MONGO_CLIENT_OPTIONS.get("minPoolSize", 0)
+    try:
+        # Varios ping a la vez abren conexiones en paralelo; el mantenimiento del pool
+        # de pymongo completa el resto hasta minPoolSize
+        await asyncio.wait_for(
+            asyncio.gather(*(get_client().admin.command("ping") for _ in range(max(1, target)))),
+            MONGO_WARMUP_TIMEOUT
+        )
+        deadline = started + MONGO_WARMUP_TIMEOUT
+        # Sin eventos de pool (cliente de pruebas) no hay nada que esperar
+        while 0 < mongo_pool.total_open() < target and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        await load_public_config()
+    except (PyMongoError, asyncio.TimeoutError) as e:
+        # /readyz seguirá informando del fallo mientras Mongo no responda
+        logger.error("Warm-up incomplete: %s", e)
+    logger.info(
+        "Warm-up finished in %.0f ms with %d MongoDB connections",
+        (time.perf_counter() - started) * 1000, mongo_pool.total_open()
+    )
+
+def health_response(checks: dict) -> Response:
+    healthy = all(value == "ok" for value in checks.values())
+    return FastJSONResponse({"status": "ok" if healthy else "unavailable", **checks}, status_code=200 if healthy else 503)
+
+@app.get("/healthz")
+async def healthz():
+    return health_response({"mongo": await ping_mongo() or "ok"})
+
+@app.get("/readyz")
+async def readyz():
+    return health_response({
+        "startup": "ok" if _ready else "not ready",
+        "mongo": await ping_mongo() or "ok",
+    })
+
+# Initialize default site config
+async def init_default_config():
+    existing_config = await db.site_config.find_one()
+    if not existing_config:
+        default_config = SiteConfig(
+            admin_password_hash=await asyncio.to_thread(hash_password, "admin123")
+        )
+        await db.site_config.insert_one(default_config.model_dump())
+
+async def load_public_config() -> dict:
+    config = config_cache.get()
+    if config is not None:
+        return config
+    
+    async with config_cache.lock:
+        config = config_cache.get()
+        if config is not None:
+            return config
+        
+        generation = config_cache.generation
+        config = await db.site_config.find_one()
+        if not config:
+            await init_default_config()
+            config = await db.site_config.find_one()
+        
+        # Remove sensitive data
+        config.pop('admin_password_hash', None)
+        config.pop('token_version', None)
+        config.pop('_id', None)
+        config_cache.set(config, generation)
+        return config
+
+async def load_admin_credentials() -> dict:
+    # Sin caché: una revocación o un cambio de contraseña debe verse en todos los workers
+    # al instante, y es una sola lectura del único documento de site_config
+    projection = {"_id": 0, "admin_username": 1, "admin_password_hash": 1, "token_version": 1}
+    credentials = await db.site_config.find_one({}, projection)
+    if not credentials:
+        await init_default_config()
+        credentials = await db.site_config.find_one({}, projection)
+    return credentials
+
+# Authentication endpoints
+@api_router.post("/auth/login")
+async def login(login_data: LoginRequest):
+    try:
+        admin = await load_admin_credentials()
+        
+        # La contraseña se comprueba aunque el usuario no coincida: mismo coste en ambos casos
+        valid, needs_rehash = await verify_password(login_data.password, admin["admin_password_hash"])
+        if not valid or not hmac.compare_digest(login_data.username.encode(), admin["admin_username"].encode()):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        
+        if needs_rehash:
+            new_hash = await asyncio.to_thread(hash_password, login_data.password)
+            await db.site_config.update_one(
+                {"admin_password_hash": admin["admin_password_hash"]},
+                {"$set": {"admin_password_hash": new_hash}}
+            )
+        
+        token = create_token(login_data.username, admin.get("token_version", 0))
+        return {"token": token, "message": "Login successful"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Site configuration endpoints
+@api_router.get("/config")
+async def get_site_config(request: Request):
+    try:
+        config = await load_public_config()
+        return conditional_response(request, config, "config")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.put("/config")
+async def update_site_config(config_update: SiteConfigUpdate, background_tasks: BackgroundTasks, token_data: dict = Depends(verify_token)):
+    try:
+        update_data = {k: v for k, v in config_update.model_dump().items() if v is not None}
+        
+        update_data = await extract_image(update_data, 'logo_base64', 'logo_hash')
+        
+        # Hash password if provided
+        password_changed = 'admin_password' in update_data
+        if password_changed:
+            update_data['admin_password_hash'] = await asyncio.to_thread(hash_password, update_data.pop('admin_password'))
+        
+        # El nuevo hash y la revocación de tokens se escriben en la misma actualización
+        inc = {"token_version": 1} if password_changed else None
+        before, released = await update_image_document(db.site_config, {}, update_data, "logo_hash", inc=inc)
+        config_cache.invalidate()
+        if before is None:
+            raise HTTPException(status_code=404, detail="Config not found")
+        
+        response = {"message": "Configuration updated successfully"}
+        if password_changed:
+            # Todos los tokens emitidos quedan revocados; quien hizo el cambio recibe uno nuevo
+            token_cache.clear()
+            username = update_data.get("admin_username", token_data["username"])
+            response["token"] = create_token(username, before.get("token_version", 0) + 1)
+        
+        background_tasks.add_task(collect_unreferenced_images, released)
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Storefront bootstrap
+# Todo lo necesario para el primer render en una sola petición: configuración,
+# colecciones y la primera página de joyas de cada colección.
+@api_router.get("/storefront")
+async def get_storefront(request: Request, items_limit: int = Query(24, ge=1, le=MAX_PAGE_SIZE)):
+    try:
+        async def load_collections_with_items():
+            collections = await db.collections.find({}, SUMMARY_PROJECTION).sort("position", 1).to_list(1000)
+            pages = await asyncio.gather(*(
+                paginate(db.jewelry_items, {"collection_id": collection["id"]}, SUMMARY_PROJECTION, items_limit, None)
+                for collection in collections
+            ))
+            return collections, pages
+        
+        config, (collections, pages) = await asyncio.gather(
+            load_public_config(),
+            load_collections_with_items()
+        )
+        
+        return conditional_response(request, {
+            "config": config,
+            "collections": collections,
+            "items_by_collection": {
+                collection["id"]: page for collection, page in zip(collections, pages)
+            }
+        }, "storefront")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Job status
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str, token_data: dict = Depends(verify_token)):
+    try:
+        job = await db.jobs.find_one({"id": job_id}, JOB_PROJECTION)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        lease_until = job.get("lease_until")
+        if job["status"] in ("pending", "running") and (lease_until is None or lease_until < datetime.utcnow()):
+            # Nadie lo está ejecutando (el worker se detuvo): se retoma aquí; claim_job
+            # garantiza que sólo un worker lo consiga
+            start_job(job_id)
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Collection endpoints
+@api_router.get("/collections")
+async def get_collections(request: Request, fields: Optional[str] = None, exclude: Optional[str] = None, shape: str = "summary"):
+    try:
+        projection = listing_projection(fields, exclude, shape)
+        collections = await db.collections.find({}, projection).sort("position", 1).to_list(1000)
+        return conditional_response(request, collections, "collections")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/collections")
+async def create_collection(collection_data: CollectionCreate, token_data: dict = Depends(verify_token)):
+    try:
+        collection_dict = await extract_image(collection_data.model_dump(), "image_base64", "image_hash")
+        collection = Collection(**collection_dict)
+        collection_doc = collection.model_dump()
+        await db.collections.insert_one(collection_doc)
+        await adjust_image_refs(added=[collection.image_hash])
+        collection_doc.pop("_id", None)
+        return FastJSONResponse(collection_doc)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.put("/collections/{collection_id}")
+async def update_collection(collection_id: str, collection_data: CollectionCreate, background_tasks: BackgroundTasks, token_data: dict = Depends(verify_token)):
+    try:
+        update_data = await extract_image(collection_data.model_dump(), "image_base64", "image_hash")
+        matched, released = await update_image_document(db.collections, {"id": collection_id}, update_data)
+        if not matched:
+            raise HTTPException(status_code=404, detail="Collection not found")
+        background_tasks.add_task(collect_unreferenced_images, released)
+        return {"message": "Collection updated successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.delete("/collections/{collection_id}", status_code=202)
+async def delete_collection(collection_id: str, token_data: dict = Depends(verify_token)):
+    try:
+        if not await db.collections.find_one({"id": collection_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Collection not found")
+        
+        # Las joyas se borran por lotes en segundo plano; el progreso se consulta en /jobs/{id}
+        job = await create_job(
+            "delete_collection", collection_id,
+            collection_id=collection_id,
+            total=await db.jewelry_items.count_documents({"collection_id": collection_id})
+        )
+        if job["status"] == "pending":
+            start_job(job["id"])
+        job.pop("active_key", None)
+        return FastJSONResponse({"message": "Collection deletion started", "job": job}, status_code=202)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Ordering
+# Las posiciones se reescriben con huecos (ORDER_GAP) para que mover una pieza sólo
+# tenga que actualizar ese documento: se coloca en el punto medio entre sus vecinos.
+# Cada cambio de orden es una transacción (si el servidor las admite, ver
+# run_transaction) que incrementa collections.order_version: dos reordenaciones de
+# la misma colección chocan en ese documento y la segunda se reintenta tras la primera.
+ORDER_GAP = 1024
+
+async def lock_collection_order(collection_id: str, session=None) -> bool:
+    """Serialize order changes on the collection; False if it does not exist."""
+    result = await db.collections.update_one(
+        {"id": collection_id}, {"$inc": {"order_version": 1}}, session=session
+    )
+    return result.matched_count > 0
+
+async def renumber_collection_items(collection_id: str, ordered_ids: List[str], session=None) -> int:
+    current = await db.jewelry_items.find(
+        {"collection_id": collection_id}, {"_id": 0, "id": 1}, session=session
+    ).sort([("position", 1), ("id", 1)]).to_list(None)
+    current_ids = [doc["id"] for doc in current]
+    unknown = set(ordered_ids) - set(current_ids)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Items not in collection: {', '.join(sorted(unknown))}")
+    if len(set(ordered_ids)) != len(ordered_ids):
+        raise HTTPException(status_code=400, detail="Duplicate item ids")
+    
+    # Las piezas no incluidas se mantienen, en su orden actual, al final
+    listed = set(ordered_ids)
+    final_ids = ordered_ids + [item_id for item_id in current_ids if item_id not in listed]
+    requests = [
+        UpdateOne({"id": item_id}, {"$set": {"position": index * ORDER_GAP}})
+        for index, item_id in enumerate(final_ids)
+    ]
+    if requests:
+        await db.jewelry_items.bulk_write(requests, ordered=False, session=session)
+    return len(requests)
+
+async def move_collection_item(collection_id: str, move: ItemMove, session=None) -> dict:
+    item = await db.jewelry_items.find_one(
+        {"collection_id": collection_id, "id": move.item_id}, {"_id": 0, "id": 1}, session=session
+    )
+    if not item:
+        raise HTTPException(status_code=404, detail="Jewelry item not found")
+    
+    others = {"collection_id": collection_id, "id": {"$ne": move.item_id}}
+    if move.after_id:
+        after = await db.jewelry_items.find_one(
+            {**others, "id": move.after_id}, {"_id": 0, "id": 1, "position": 1}, session=session
+        )
+        if not after:
+            raise HTTPException(status_code=404, detail="Reference item not found")
+        next_item = await db.jewelry_items.find_one(
+            {"$and": [others, {"$or": [
+                {"position": {"$gt": after["position"]}},
+                {"position": after["position"], "id": {"$gt": after["id"]}}
+            ]}]},
+            {"_id": 0, "id": 1, "position": 1},
+            sort=[("position", 1), ("id", 1)],
+            session=session
+        )
+        lower = after["position"]
+        upper = next_item["position"] if next_item else lower + 2 * ORDER_GAP
+    else:
+        first = await db.jewelry_items.find_one(
+            others, {"_id": 0, "position": 1}, sort=[("position", 1), ("id", 1)], session=session
+        )
+        upper = first["position"] if first else ORDER_GAP
+        lower = upper - 2 * ORDER_GAP
+    
+    if upper - lower >= 2:
+        await db.jewelry_items.update_one(
+            {"id": move.item_id}, {"$set": {"position": (lower + upper) // 2}}, session=session
+        )
+        return {"updated": 1, "renumbered": False}
+    
+    # Sin hueco entre los vecinos: se renumera toda la colección
+    ordered = await db.jewelry_items.find(
+        others, {"_id": 0, "id": 1}, session=session
+    ).sort([("position", 1), ("id", 1)]).to_list(None)
+    ordered_ids = [doc["id"] for doc in ordered]
+    insert_at = ordered_ids.index(move.after_id) + 1 if move.after_id else 0
+    ordered_ids.insert(insert_at, move.item_id)
+    return {"updated": await renumber_collection_items(collection_id, ordered_ids, session), "renumbered": True}
+
+@api_router.patch("/collections/{collection_id}/order")
+async def reorder_collection_items(collection_id: str, order_data: CollectionOrderRequest, token_data: dict = Depends(verify_token)):
+    try:
+        if (order_data.item_ids is None) == (order_data.move is None):
+            raise HTTPException(status_code=400, detail="Provide either item_ids or move")
+        
+        async def reorder(session):
+            if not await lock_collection_order(collection_id, session):
+                raise HTTPException(status_code=404, detail="Collection not found")
+            if order_data.move:
+                return await move_collection_item(collection_id, order_data.move, session)
+            updated = await renumber_collection_items(collection_id, order_data.item_ids, session)
+            return {"updated": updated, "renumbered": True}
+        
+        result = await run_transaction(reorder)
+        search_index.invalidate()
+        return {"message": "Collection order updated successfully", **result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Jewelry items endpoints
+@api_router.get("/collections/{collection_id}/items")
+async def get_jewelry_items(
+    collection_id: str,
+    request: Request,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None,
+    shape: str = "summary",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    try:
+        projection = listing_projection(fields, exclude, shape)
+        if limit or cursor:
+            page = await paginate(db.jewelry_items, {"collection_id": collection_id}, projection, limit, cursor)
+            return conditional_response(request, page, "collection_items")
+        return await unpaginated_response(
+            request, db.jewelry_items, {"collection_id": collection_id}, projection, "collection_items"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/jewelry-items")
+async def get_all_jewelry_items(
+    request: Request,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None,
+    shape: str = "summary",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    try:
+        projection = listing_projection(fields, exclude, shape)
+        if limit or cursor:
+            page = await paginate(db.jewelry_items, {}, projection, limit, cursor)
+            return conditional_response(request, page, "jewelry_items")
+        return await unpaginated_response(request, db.jewelry_items, {}, projection, "jewelry_items")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/jewelry-items")
+async def create_jewelry_item(item_data: JewelryItemCreate, token_data: dict = Depends(verify_token)):
+    try:
+        item_dict = await extract_image(item_data.model_dump(), "image_base64", "image_hash")
+        jewelry_item = JewelryItem(**item_dict)
+        item_doc = jewelry_item.model_dump()
+        await db.jewelry_items.insert_one(item_doc)
+        await adjust_image_refs(added=[jewelry_item.image_hash])
+        search_index.invalidate()
+        item_doc.pop("_id", None)
+        return FastJSONResponse(item_doc)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.put("/jewelry-items/{item_id}")
+async def update_jewelry_item(item_id: str, item_data: JewelryItemCreate, background_tasks: BackgroundTasks, token_data: dict = Depends(verify_token)):
+    try:
+        update_data = await extract_image(item_data.model_dump(), "image_base64", "image_hash")
+        matched, released = await update_image_document(db.jewelry_items, {"id": item_id}, update_data)
+        if not matched:
+            raise HTTPException(status_code=404, detail="Jewelry item not found")
+        search_index.invalidate()
+        background_tasks.add_task(collect_unreferenced_images, released)
+        return {"message": "Jewelry item updated successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.delete("/jewelry-items/{item_id}")
+async def delete_jewelry_item(item_id: str, background_tasks: BackgroundTasks, token_data: dict = Depends(verify_token)):
+    try:
+        item = await db.jewelry_items.find_one_and_delete({"id": item_id}, projection={"image_hash": 1})
+        if item is None:
+            raise HTTPException(status_code=404, detail="Jewelry item not found")
+        released = await adjust_image_refs(removed=[item.get("image_hash")])
+        search_index.invalidate()
+        background_tasks.add_task(collect_unreferenced_images, released)
+        return {"message": "Jewelry item deleted successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/jewelry-items/bulk")
+async def bulk_jewelry_items(bulk_data: JewelryBulkRequest, background_tasks: BackgroundTasks, token_data: dict = Depends(verify_token)):
+    try:
+        results = []
+        requests = []
+        request_indexes = []
+        # Cambios de referencias de imagen por índice de operación: (añadida, quitada)
+        image_changes = {}
+        # Imágenes inline guardadas por esta petición: se liberan si su operación falla
+        stored_images = {}
+        
+        # Las operaciones sobre ids inexistentes se marcan antes de escribir
+        target_ids = [op.id for op in bulk_data.operations if op.op != "create" and op.id]
+        # Varias operaciones sobre el mismo id se rechazan todas: sus cambios de
+        # referencias se calculan sobre el documento antes de la petición
+        id_counts = Counter(target_ids)
+        existing_hashes = {}
+        if target_ids:
+            async for doc in db.jewelry_items.find({"id": {"$in": target_ids}}, {"_id": 0, "id": 1, "image_hash": 1}):
+                existing_hashes[doc["id"]] = doc.get("image_hash")
+        
+        for index, operation in enumerate(bulk_data.operations):
+            result = {"index": index, "op": operation.op, "id": operation.id, "status": "ok"}
+            results.append(result)
+            try:
+                if operation.op == "create":
+                    item_data = JewelryItemCreate(**(operation.data or {}))
+                    item_dict = await extract_image(item_data.model_dump(), "image_base64", "image_hash")
+                    if item_data.image_base64.startswith("data:"):
+                        stored_images[index] = item_dict["image_hash"]
+                    jewelry_item = JewelryItem(**item_dict)
+                    result["id"] = jewelry_item.id
+                    requests.append(InsertOne(jewelry_item.model_dump()))
+                    image_changes[index] = (jewelry_item.image_hash, None)
+                elif not operation.id:
+                    raise ValueError("id is required")
+                elif id_counts[operation.id] > 1:
+                    raise ValueError("Duplicate id in request")
+                elif operation.id not in existing_hashes:
+                    result["status"] = "not_found"
+                    continue
+                elif operation.op == "update":
+                    item_update = JewelryItemUpdate(**(operation.data or {}))
+                    update_data = {k: v for k, v in item_update.model_dump().items() if v is not None}
+                    inline_image = (update_data.get("image_base64") or "").startswith("data:")
+                    update_data = await extract_image(update_data, "image_base64", "image_hash")
+                    if inline_image:
+                        stored_images[index] = update_data["image_hash"]
+                    if not update_data:
+                        raise ValueError("Nothing to update")
+                    requests.append(UpdateOne({"id": operation.id}, {"$set": update_data}))
+                    if "image_hash" in update_data:
+                        image_changes[index] = (update_data["image_hash"], existing_hashes[operation.id])
+                else:
+                    requests.append(DeleteOne({"id": operation.id}))
+                    image_changes[index] = (None, existing_hashes[operation.id])
+                request_indexes.append(index)
+            except ValidationError as e:
+                result["status"] = "error"
+                result["error"] = e.errors(include_url=False, include_context=False, include_input=False)
+            except (ValueError, HTTPException) as e:
+                result["status"] = "error"
+                result["error"] = e.detail if isinstance(e, HTTPException) else str(e)
+        
+        summary = {"inserted": 0, "updated": 0, "deleted": 0}
+        if requests:
+            try:
+                write_result = await db.jewelry_items.bulk_write(requests, ordered=False)
+                details = write_result.bulk_api_result
+            except BulkWriteError as e:
+                details = e.details
+                for write_error in details.get("writeErrors", []):
+                    result = results[request_indexes[write_error["index"]]]
+                    result["status"] = "error"
+                    result["error"] = write_error.get("errmsg", "Write error")
+            summary = {
+                "inserted": details.get("nInserted", 0),
+                "updated": details.get("nMatched", 0),
+                "deleted": details.get("nRemoved", 0),
+            }
+            search_index.invalidate()
+        
+        applied = [image_changes[r["index"]] for r in results if r["status"] == "ok" and r["index"] in image_changes]
+        released = await adjust_image_refs(added=[a for a, _ in applied], removed=[r for _, r in applied])
+        released += [stored_images[r["index"]] for r in results if r["status"] != "ok" and r["index"] in stored_images]
+        background_tasks.add_task(collect_unreferenced_images, released)
+        return {"results": results, **summary}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Search endpoint
+# Resultados por relevancia con paginación por desplazamiento (el textScore no sirve
+# como clave de cursor) y recuento de coincidencias por colección para los filtros.
+@api_router.get("/search")
+async def search_jewelry_items(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    collection_id: Optional[str] = None,
+    limit: int = Query(24, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    try:
+        offset = decode_offset_cursor(cursor)
+        items, facets = await search_items(q.strip(), collection_id, offset, limit)
+        total = facets.get(collection_id, 0) if collection_id else sum(facets.values())
+        
+        names = {}
+        if facets:
+            async for collection in db.collections.find({"id": {"$in": list(facets)}}, {"_id": 0, "id": 1, "name": 1}):
+                names[collection["id"]] = collection["name"]
+        
+        return conditional_response(request, {
+            "query": q,
+            "items": items,
+            "total": total,
+            "limit": limit,
+            "next_cursor": encode_offset_cursor(offset + limit) if offset + limit < total else None,
+            "facets": {"collections": [
+                {"id": facet_id, "name": names.get(facet_id), "count": count}
+                for facet_id, count in sorted(facets.items(), key=lambda facet: -facet[1])
+            ]}
+        }, "search")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Image editing endpoint
+@api_router.post("/save-edited-image")
+async def save_edited_image(
+    image_data: dict,
+    background_tasks: BackgroundTasks,
+    token_data: dict = Depends(verify_token)
+):
+    try:
+        item_id = image_data.get('item_id')
+        collection_id = image_data.get('collection_id')
+        edited_image_base64 = image_data.get('image_base64')
+        
+        if not edited_image_base64:
+            raise HTTPException(status_code=400, detail="No image data provided")
+        
+        if not item_id and not collection_id:
+            raise HTTPException(status_code=400, detail="No item_id or collection_id provided")
+        
+        image_update = await extract_image({"image_base64": edited_image_base64}, "image_base64", "image_hash")
+        return await apply_edited_image(item_id, collection_id, image_update, background_tasks)
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def apply_edited_image(item_id: Optional[str], collection_id: Optional[str], image_update: dict, background_tasks: BackgroundTasks) -> dict:
+    if item_id:
+        # Update jewelry item image
+        matched, released = await update_image_document(db.jewelry_items, {"id": item_id}, image_update)
+        if not matched:
+            raise HTTPException(status_code=404, detail="Jewelry item not found")
+        background_tasks.add_task(collect_unreferenced_images, released)
+        return {"message": "Jewelry item image updated successfully", "image_hash": image_update.get("image_hash")}
+    
+    # Update collection image
+    matched, released = await update_image_document(db.collections, {"id": collection_id}, image_update)
+    if not matched:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    background_tasks.add_task(collect_unreferenced_images, released)
+    return {"message": "Collection image updated successfully", "image_hash": image_update.get("image_hash")}
+
+@api_router.post("/save-edited-image/upload")
+async def upload_edited_image(request: Request, background_tasks: BackgroundTasks, token_data: dict = Depends(verify_token)):
+    try:
+        fields, upload = await receive_image_upload(request, "image")
+        item_id = fields.get("item_id")
+        collection_id = fields.get("collection_id")
+        if not item_id and not collection_id:
+            raise HTTPException(status_code=400, detail="No item_id or collection_id provided")
+        
+        background_tasks.add_task(ensure_stored_image_variants, upload["hash"])
+        return await apply_edited_image(item_id, collection_id, {"image_base64": "", "image_hash": upload["hash"]}, background_tasks)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Image endpoints
+@api_router.post("/images")
+async def upload_image(request: Request, background_tasks: BackgroundTasks, token_data: dict = Depends(verify_token)):
+    try:
+        _, upload = await receive_image_upload(request, "file")
+        # Las variantes se generan después de responder
+        background_tasks.add_task(ensure_stored_image_variants, upload["hash"])
+        return upload
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/images/{image_hash}/transform")
+async def transform_stored_image(
+    image_hash: str,
+    request_data: ImageTransformRequest,
+    background_tasks: BackgroundTasks,
+    token_data: dict = Depends(verify_token)
+):
+    try:
+        if not IMAGE_HASH_RE.match(image_hash):
+            raise HTTPException(status_code=404, detail="Image not found")
+        if not await db.images.find_one({"hash": image_hash}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Image not found")
+        
+        params = request_data.model_dump(include={"crop_type", "brightness", "contrast", "saturation", "width"})
+        for name in ("brightness", "contrast", "saturation"):
+            params[name] = round(params[name], 1)
+        result = await get_transformed_image(image_hash, params)
+        if params["width"]:
+            return result
+        
+        background_tasks.add_task(ensure_stored_image_variants, result["hash"])
+        if request_data.item_id or request_data.collection_id:
+            await apply_edited_image(
+                request_data.item_id, request_data.collection_id,
+                {"image_base64": "", "image_hash": result["hash"]}, background_tasks
+            )
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/images/{image_hash}")
+async def get_image(image_hash: str, request: Request, w: Optional[int] = None):
+    try:
+        if not IMAGE_HASH_RE.match(image_hash):
+            raise HTTPException(status_code=404, detail="Image not found")
+        
+        meta = await db.images.find_one({"hash": image_hash})
+        if not meta:
+            raise HTTPException(status_code=404, detail="Image not found")
+        
+        variant = select_variant(meta, w, request.headers.get("accept", ""))
+        etag = f'"{variant["hash"] if variant else image_hash}"'
+        headers = {
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "ETag": etag,
+            "Vary": "Accept"
+        }
+        # El contenido es inmutable: si el ETag coincide no hace falta leer el blob
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        
+        if variant:
+            blob = await blob_store.get(variant["hash"])
+        else:
+            blob = await blob_store.get(image_hash, meta)
+        if blob is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+        
+        data, content_type = blob
+        return Response(content=data, media_type=content_type, headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/admin/migrate-images")
+async def migrate_images(token_data: dict = Depends(verify_token)):
+    try:
+        migrated = await migrate_inline_images()
+        return {"message": "Images migrated successfully", "migrated": migrated}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/admin/ingest-remote-images")
+async def ingest_remote_images_endpoint(token_data: dict = Depends(verify_token)):
+    try:
+        summary = await ingest_remote_images()
+        return {"message": "Remote images ingested", **summary}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/admin/index-stats")
+async def get_index_stats(token_data: dict = Depends(verify_token)):
+    try:
+        stats = {}
+        for collection_name in INDEXES:
+            entries = await db[collection_name].aggregate([{"$indexStats": {}}]).to_list(None)
+            stats[collection_name] = [
+                {
+                    "name": entry["name"],
+                    "key": dict(entry["key"]),
+                    "ops": entry["accesses"]["ops"],
+                    "since": entry["accesses"]["since"],
+                }
+                for entry in sorted(entries, key=lambda e: e["name"])
+            ]
+        return stats
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Catalog seeding
+# Los documentos sembrados tienen ids deterministas (uuid5), así que el índice único
+# de id descarta los que ya existen: repetir la siembra, o lanzarla dos veces a la
+# vez, no duplica nada. El catálogo sintético reproduce volúmenes de producción.
+SEED_NAMESPACE = uuid.UUID("6f1c2a52-8d7e-4b8e-9a4c-3b2d1e0f5a61")
+SEED_BATCH_SIZE = 1000
+SEED_MAX_ITEMS = int(os.environ.get('SEED_MAX_ITEMS', '1000000'))
+
+# Demo: la portada de cada colección es la foto de su primera pieza
+DEMO_COLLECTIONS = [
+    {"key": "anillos-elegantes", "name": "Anillos Elegantes", "description": "Colección exclusiva de anillos artesanales con diseños únicos y materiales de la más alta calidad."},
+    {"key": "collares-exclusivos", "name": "Collares Exclusivos", "description": "Piezas únicas de collares con gemas seleccionadas y diseños contemporáneos que resaltan la elegancia natural."},
+    {"key": "pulseras-artesanales", "name": "Pulseras Artesanales", "description": "Creaciones únicas de pulseras hechas a mano con técnicas tradicionales y materiales nobles."},
+]
+
+DEMO_ITEMS = {
+    "anillos-elegantes": [
+        ("Anillo de Compromiso Vintage", "Elegante anillo de oro blanco con diamante central", "https://images.pexels.com/photos/32799156/pexels-photo-32799156.jpeg"),
+        ("Alianza Clásica", "Alianza tradicional de oro amarillo pulido", "https://images.pexels.com/photos/32778172/pexels-photo-32778172.jpeg"),
+        ("Anillo de Eternidad", "Diseño contemporáneo con múltiples diamantes", "https://images.unsplash.com/photo-1743594789385-323b38491cdc"),
+        ("Sortija de Cocktail", "Anillo llamativo con gema central de color", "https://images.unsplash.com/photo-1643236095049-a120dc5e8384"),
+        ("Anillo Minimalista", "Diseño sencillo y elegante para uso diario", "https://images.pexels.com/photos/32805134/pexels-photo-32805134.jpeg"),
+    ],
+    "collares-exclusivos": [
+        ("Collar de Diamantes", "Collar de lujo con diamantes engarzados", "https://images.unsplash.com/photo-1630534591724-dba93846b629"),
+        ("Gargantilla de Perlas", "Collar corto con perlas naturales cultivadas", "https://images.unsplash.com/photo-1561060511-78b14b799fe1"),
+        ("Collar de Cadena Vintage", "Cadena clásica de oro con colgante único", "https://images.pexels.com/photos/11185100/pexels-photo-11185100.jpeg"),
+        ("Collar Statement", "Pieza llamativa para ocasiones especiales", "https://images.pexels.com/photos/9649263/pexels-photo-9649263.jpeg"),
+        ("Collar de Gemas", "Diseño colorido con piedras preciosas múltiples", "https://images.unsplash.com/photo-1634295889011-439a70d7799b"),
+    ],
+    "pulseras-artesanales": [
+        ("Pulsera de Cuentas Artesanales", "Pulsera hecha a mano con cuentas únicas", "https://images.pexels.com/photos/32799171/pexels-photo-32799171.jpeg"),
+        ("Brazalete de Plata", "Brazalete sólido con grabados tradicionales", "https://images.pexels.com/photos/20535490/pexels-photo-20535490.jpeg"),
+        ("Pulsera de Cadena Delicada", "Cadena fina con charms personalizados", "https://images.pexels.com/photos/7679447/pexels-photo-7679447.jpeg"),
+        ("Pulsera de Cuero y Metal", "Diseño moderno combinando materiales", "https://images.unsplash.com/photo-1721103418981-0ee59b80592e"),
+        ("Pulsera de Eslabones", "Eslabones entrelazados en oro rosa", "https://images.unsplash.com/photo-1721103427881-efdc0c7d011f"),
+    ],
+}
+
+SYNTHETIC_KINDS = ("Anillo", "Collar", "Pulsera", "Pendientes", "Broche", "Gargantilla", "Colgante", "Tobillera")
+SYNTHETIC_MATERIALS = ("oro amarillo", "oro blanco", "oro rosa", "plata", "platino", "titanio")
+SYNTHETIC_STONES = ("diamantes", "perlas", "zafiros", "esmeraldas", "rubíes", "amatistas", "turquesas", "ópalos")
+SYNTHETIC_STYLES = ("vintage", "minimalista", "artesanal", "elegante", "de autor", "de inspiración étnica")
+
+def seed_id(*parts) -> str:
+    return str(uuid.uuid5(SEED_NAMESPACE, ":".join(str(part) for part in parts)))
+
+async def insert_missing(collection, docs: List[dict]) -> List[dict]:
+    """``insert_many`` in unordered batches skipping duplicate ids; returns the docs inserted."""
+    inserted = []
+    for start in range(0, len(docs), SEED_BATCH_SIZE):
+        batch = docs[start:start + SEED_BATCH_SIZE]
+        # Filtro previo barato con el índice de id; el índice único cubre las carreras
+        existing = set(await collection.distinct("id", {"id": {"$in": [doc["id"] for doc in batch]}}))
+        batch = [doc for doc in batch if doc["id"] not in existing]
+        if not batch:
+            continue
+        try:
+            await collection.insert_many(batch, ordered=False)
+            inserted.extend(batch)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in errors):
+                raise
+            skipped = {error["index"] for error in errors}
+            inserted.extend(doc for index, doc in enumerate(batch) if index not in skipped)
+    return inserted
+
+async def seed_documents(collections: List[dict], items: List[dict]) -> dict:
+    inserted_collections = await insert_missing(db.collections, collections)
+    inserted_items = await insert_missing(db.jewelry_items, items)
+    await adjust_image_refs(added=[doc.get("image_hash") for doc in inserted_collections + inserted_items])
+    if inserted_items:
+        search_index.invalidate()
+    return {"collections": len(inserted_collections), "items": len(inserted_items)}
+
+async def seed_demo_catalog() -> dict:
+    """Insert the demo collections and items that are not already present.
+
+    Does nothing when the catalog holds any other collection.
+    """
+    # Una tienda real, o una demo sembrada por versiones anteriores con ids aleatorios
+    demo_ids = [seed_id("demo", demo["key"]) for demo in DEMO_COLLECTIONS]
+    if await db.collections.find_one({"id": {"$nin": demo_ids}}, {"_id": 1}):
+        return {"collections": 0, "items": 0}
+    
+    collections, items = [], []
+    for index, demo in enumerate(DEMO_COLLECTIONS):
+        collection_id = seed_id("demo", demo["key"])
+        pieces = DEMO_ITEMS[demo["key"]]
+        collections.append(Collection(
+            id=collection_id, name=demo["name"], description=demo["description"],
+            image_base64=pieces[0][2], position=index
+        ).model_dump())
+        items.extend(
+            JewelryItem(
+                id=seed_id("demo", demo["key"], position), name=name, description=description,
+                image_base64=url, collection_id=collection_id, position=position * ORDER_GAP
+            ).model_dump()
+            for position, (name, description, url) in enumerate(pieces)
+        )
+    return await seed_documents(collections, items)
+
+def make_synthetic_image(target_kb: int, seed: str) -> bytes:
+    """Tinted noise JPEG of roughly ``target_kb`` (runs in the image pool)."""
+    from PIL import Image, ImageOps
+    rng = random.Random(seed)
+    tint = tuple(rng.randint(80, 255) for _ in range(3))
+    sigma = rng.uniform(20, 60)
+    
+    def render(side: int) -> bytes:
+        noise = Image.effect_noise((side, side), sigma)
+        buf = io.BytesIO()
+        ImageOps.colorize(noise, black=(20, 20, 20), white=tint).save(buf, "JPEG", quality=85)
+        return buf.getvalue()
+    
+    # El tamaño del JPEG crece con el área: se calibra con una muestra de 256 px
+    sample = render(256)
+    side = round(256 * math.sqrt(target_kb * 1024 / len(sample)))
+    return render(max(16, min(side, 8192)))
+
+async def seed_synthetic_catalog(
+    collections: int, items_per_collection: int, image_kb: int, distinct_images: int, seed: int = 0, progress=None
+) -> dict:
+    """Generate ``collections`` x ``items_per_collection`` items sharing ``distinct_images`` blobs.
+
+    The same ``seed`` always produces the same ids, names and images.
+    ``progress(count)`` is awaited after each batch of items.
+    """
+    loop = asyncio.get_running_loop()
+    images = await asyncio.gather(*(
+        loop.run_in_executor(get_image_pool(), make_synthetic_image, image_kb, f"{seed}:{index}")
+        for index in range(distinct_images)
+    ))
+    hashes = []
+    for data in images:
+        image_hash = await blob_store.put(data, "image/jpeg")
+        await ensure_image_variants(image_hash, data)
+        hashes.append(image_hash)
+    
+    rng = random.Random(seed)
+    totals = {"collections": 0, "items": 0}
+    for c in range(collections):
+        kind = SYNTHETIC_KINDS[c % len(SYNTHETIC_KINDS)]
+        collection_id = seed_id("synthetic", seed, c)
+        collection = Collection(
+            id=collection_id,
+            name=f"{kind} {rng.choice(SYNTHETIC_STYLES)} {c + 1}",
+            description=f"Piezas de {rng.choice(SYNTHETIC_MATERIALS)} con {rng.choice(SYNTHETIC_STONES)}.",
+            image_hash=hashes[c % len(hashes)],
+            position=c
+        ).model_dump()
+        totals["collections"] += (await seed_documents([collection], []))["collections"]
+        # Lotes de SEED_BATCH_SIZE: ni el catálogo entero en memoria ni el event loop
+        # ocupado construyendo modelos entre dos awaits
+        for start in range(0, items_per_collection, SEED_BATCH_SIZE):
+            items = [
+                JewelryItem(
+                    id=seed_id("synthetic", seed, c, i),
+                    name=f"{rng.choice(SYNTHETIC_KINDS)} {rng.choice(SYNTHETIC_STYLES)} de {rng.choice(SYNTHETIC_MATERIALS)}",
+                    description=f"Pieza de {rng.choice(SYNTHETIC_MATERIALS)} con {rng.choice(SYNTHETIC_STONES)}, hecha a mano en nuestro taller.",
+                    image_hash=rng.choice(hashes),
+                    collection_id=collection_id,
+                    position=i * ORDER_GAP
+                ).model_dump()
+                for i in range(start, min(start + SEED_BATCH_SIZE, items_per_collection))
+            ]
+            totals["items"] += (await seed_documents([], items))["items"]
+            if progress is not None:
+                await progress(len(items))
+    return {**totals, "images": hashes}
+
+async def seed_catalog_job(job: dict):
+    async def progress(count: int):
+        await update_job(job["id"], job_progress(count))
+    
+    # Un trabajo retomado vuelve a recorrer el catálogo desde el principio
+    await update_job(job["id"], {"$set": {"processed": 0}})
+    inserted = await seed_synthetic_catalog(**job["params"], progress=progress)
+    inserted["images"] = len(inserted["images"])
+    finished = job_finished("completed")
+    finished["$set"]["inserted"] = inserted
+    await update_job(job["id"], finished)
+
+JOB_RUNNERS["seed_catalog"] = seed_catalog_job
+
+@api_router.post("/admin/seed-catalog")
+async def seed_catalog(seed_data: SeedCatalogRequest, token_data: dict = Depends(verify_token)):
+    try:
+        total = seed_data.collections * seed_data.items_per_collection
+        if total > SEED_MAX_ITEMS:
+            raise HTTPException(status_code=400, detail=f"At most {SEED_MAX_ITEMS} items per request")
+        
+        # La siembra va en segundo plano como el borrado de colecciones; el progreso en /jobs/{id}
+        job = await create_job("seed_catalog", str(seed_data.seed), params=seed_data.model_dump(), total=total)
+        if job["status"] == "pending":
+            start_job(job["id"])
+        job.pop("active_key", None)
+        return FastJSONResponse({"message": "Catalog seeding started", "job": job}, status_code=202)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Initialize demo data
+@api_router.post("/init-demo-data")
+async def init_demo_data(background_tasks: BackgroundTasks, token_data: dict = Depends(verify_token)):
+    try:
+        inserted = await seed_demo_catalog()
+        if not inserted["collections"] and not inserted["items"]:
+            return {"message": "Demo data already exists", **inserted}
+        
+        # Las fotos de ejemplo son URLs externas: se descargan al blob store
+        background_tasks.add_task(ingest_remote_images)
+        return {"message": "Demo data initialized successfully", **inserted}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Include the router in the main app
+app.include_router(api_router)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get('COMPRESSION_MIN_SIZE', '1024')),
+    cache_bytes=int(os.environ.get('COMPRESSION_CACHE_MB', '32')) * 1024 * 1024
+)
+
+app.add_middleware(
+    CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Truncated", "X-Next-Cursor"],
 )
 
-# Initialize default config on startup
-@app.on_event("startup")
+app.add_middleware(MetricsMiddleware)
+
+# Ensure indexes and default config on startup
 async def startup_event():
-    await init_default_config()
+    global _config_watch_task, _ready
+    await asyncio.gather(ensure_indexes(), init_default_config())
+    await resume_jobs()
+    await schedule_inline_image_migration()
+    if os.environ.get('CONFIG_CHANGE_STREAM', '').lower() in ('1', 'true', 'yes'):
+        _config_watch_task = asyncio.create_task(watch_site_config())
+    await warm_up()
+    _ready = True
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+async def shutdown_event():
+    global _ready
+    _ready = False
+    if _config_watch_task is not None:
+        _config_watch_task.cancel()
+    # Los trabajos cancelados se retoman cuando caduca su lease
+    for task in list(_job_tasks.values()):
+        task.cancel()
+    if _client is not None:
+        _client.close()
+    if _http_client is not None:
+        await _http_client.aclose()
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False)
\ No newline at end of file
@@ -4,6 +4,19 @@ import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const JEWELRY_PAGE_SIZE = 48;
+const STOREFRONT_ITEMS_PER_COLLECTION = 24;
+const JOB_POLL_INTERVAL_MS = 1000;
+// Más que el lease de los trabajos (60 s): para entonces otro worker lo habrá retomado
+const JOB_STALL_TIMEOUT_MS = 120000;
+
+// Resuelve el src de una imagen: data URI/URL heredada o imagen del blob store por hash.
+// Con `width` se pide la variante responsive más pequeña que cubra ese ancho.
+const imageSrc = (base64, hash, width) => {
+  if (base64) return base64;
+  if (!hash) return '';
+  return width ? `${API}/images/${hash}?w=${width}` : `${API}/images/${hash}`;
+};
 
 // Auth Context
 const AuthContext = createContext();
@@ -34,6 +47,13 @@ const AuthProvider = ({ children }) => {
     }
   };
 
+  // Sustituye el token de la sesión actual (p. ej. tras cambiar la contraseña)
+  const updateToken = (newToken) => {
+    localStorage.setItem('token', newToken);
+    setToken(newToken);
+    axios.defaults.headers.common['Authorization'] = `Bearer ${newToken}`;
+  };
+
   const logout = () => {
     localStorage.removeItem('token');
     setToken(null);
@@ -42,7 +62,7 @@ const AuthProvider = ({ children }) => {
   };
 
   return (
-    <AuthContext.Provider value={{ isAuthenticated, login, logout }}>
+    <AuthContext.Provider value={{ isAuthenticated, login, logout, updateToken }}>
       {children}
     </AuthContext.Provider>
   );
@@ -136,7 +156,7 @@ const LoginModal = ({ isOpen, onClose }) => {
 };
 
 // Componente Editor de Imágenes FUNCIONAL
-const ImageEditor = ({ imageBase64, onSave, onClose, itemId, collectionId }) => {
+const ImageEditor = ({ imageBase64, imageHash, onSave, onClose, itemId, collectionId }) => {
   const [editedImage, setEditedImage] = useState(imageBase64);
   const [brightness, setBrightness] = useState(100);
   const [contrast, setContrast] = useState(100);
@@ -190,42 +210,86 @@ const ImageEditor = ({ imageBase64, onSave, onClose, itemId, collectionId }) =>
     ctx.filter = `brightness(${brightness}%) contrast(${contrast}%) saturate(${saturation}%)`;
     ctx.drawImage(img, cropX, cropY, cropWidth, cropHeight, 0, 0, cropWidth, cropHeight);
     
-    return canvas.toDataURL('image/jpeg', 0.9);
+    // Blob binario: se sube como multipart, sin inflar un 33% en base64
+    return new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', 0.9));
+  };
+
+  // Si la imagen ya está en el servidor se edita allí: no hay que subir la imagen entera
+  const saveOnServer = async () => {
+    const token = localStorage.getItem('token');
+    const headers = token ? { 'Authorization': `Bearer ${token}` } : {};
+    const params = {
+      crop_type: cropType,
+      brightness: Number(brightness),
+      contrast: Number(contrast),
+      saturation: Number(saturation)
+    };
+    
+    if (itemId === 'logo') {
+      const result = await axios.post(`${API}/images/${imageHash}/transform`, params, { headers });
+      await axios.put(`${API}/config`, { logo_hash: result.data.hash }, { headers });
+      return result.data.hash;
+    }
+    const result = await axios.post(`${API}/images/${imageHash}/transform`, {
+      ...params,
+      item_id: itemId || undefined,
+      collection_id: collectionId || undefined
+    }, { headers });
+    return result.data.hash;
   };
 
   const handleSave = async () => {
     setIsSaving(true);
+    if (imageHash) {
+      try {
+        const hash = await saveOnServer();
+        onSave(imageSrc('', hash), { brightness, contrast, saturation, cropType });
+        alert('Imagen guardada exitosamente');
+        onClose();
+      } catch (error) {
+        console.error('Error saving image:', error);
+        alert(`Error al guardar la imagen: ${error.response?.data?.detail || error.message}`);
+      } finally {
+        setIsSaving(false);
+      }
+      return;
+    }
     try {
       const img = new Image();
       
       img.onload = async () => {
-        const croppedAndFilteredImage = applyCropAndFilters(img, cropType);
+        const croppedAndFilteredImage = await applyCropAndFilters(img, cropType);
         
         // Obtener el token del localStorage
         const token = localStorage.getItem('token');
         const headers = token ? { 'Authorization': `Bearer ${token}` } : {};
         
         if (itemId === 'logo') {
-          // Guardar logo en la configuración del sitio
+          // Subir el logo y guardarlo en la configuración del sitio
+          const formData = new FormData();
+          formData.append('file', croppedAndFilteredImage, 'logo.jpg');
+          const upload = await axios.post(`${API}/images`, formData, { headers });
           await axios.put(`${API}/config`, { 
-            logo_base64: croppedAndFilteredImage 
+            logo_hash: upload.data.hash 
           }, { headers });
         } else {
           // Guardar imagen de joya/colección
-          await axios.post(`${API}/save-edited-image`, {
-            item_id: itemId,
-            collection_id: collectionId,
-            image_base64: croppedAndFilteredImage
-          }, { headers });
+          const formData = new FormData();
+          if (itemId) formData.append('item_id', itemId);
+          if (collectionId) formData.append('collection_id', collectionId);
+          formData.append('image', croppedAndFilteredImage, 'edited.jpg');
+          await axios.post(`${API}/save-edited-image/upload`, formData, { headers });
         }
         
         // Callback para actualizar la UI
-        onSave(croppedAndFilteredImage, { brightness, contrast, saturation, cropType });
+        onSave(URL.createObjectURL(croppedAndFilteredImage), { brightness, contrast, saturation, cropType });
         
         alert('Imagen guardada exitosamente');
         onClose();
       };
       
+      // Las imágenes del blob store se sirven desde el backend; sin esto el canvas queda "tainted"
+      img.crossOrigin = 'anonymous';
       img.src = editedImage;
     } catch (error) {
       console.error('Error saving image:', error);
@@ -357,7 +421,7 @@ const ImageEditor = ({ imageBase64, onSave, onClose, itemId, collectionId }) =>
 };
 
 // Panel de Administración Completo y Expandido
-const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections, onCollectionsUpdate, jewelryItems, onJewelryUpdate }) => {
+const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections, onCollectionsUpdate, jewelryItems, onJewelryUpdate, hasMoreJewelry, onLoadMoreJewelry }) => {
   const [activeTab, setActiveTab] = useState('general');
   const [editConfig, setEditConfig] = useState({});
   const [editingCollection, setEditingCollection] = useState(null);
@@ -365,6 +429,7 @@ const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections,
   const [newCollection, setNewCollection] = useState({ name: '', description: '', image_base64: '', position: 0 });
   const [newJewelry, setNewJewelry] = useState({ name: '', description: '', image_base64: '', collection_id: '', position: 0 });
   const [isSaving, setIsSaving] = useState(false);
+  const { updateToken } = useAuth();
 
   // Inicializar editConfig cuando se abre el panel o cambia siteConfig
   useEffect(() => {
@@ -415,14 +480,19 @@ const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections,
     console.log('Claves en editConfig:', Object.keys(editConfig));
   }, [editConfig]);
 
-  const handleImageUpload = (e, callback) => {
+  // Sube el fichero tal cual (multipart) y devuelve el hash de la imagen en el blob store
+  const handleImageUpload = async (e, callback) => {
     const file = e.target.files[0];
     if (file) {
-      const reader = new FileReader();
-      reader.onload = (event) => {
-        callback(event.target.result);
-      };
-      reader.readAsDataURL(file);
+      try {
+        const formData = new FormData();
+        formData.append('file', file);
+        const response = await axios.post(`${API}/images`, formData);
+        callback(response.data.hash);
+      } catch (error) {
+        console.error('Error al subir imagen:', error);
+        alert(`Error al subir la imagen: ${error.response?.data?.detail || error.message}`);
+      }
     }
   };
 
@@ -438,6 +508,10 @@ const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections,
       
       const response = await axios.put(`${API}/config`, editConfig, { headers });
       console.log('Respuesta del servidor:', response.data);
+      // Un cambio de contraseña revoca el token anterior: guardar el nuevo
+      if (response.data.token) {
+        updateToken(response.data.token);
+      }
       
       // Recargar la configuración desde el servidor
       await onConfigUpdate();
@@ -482,9 +556,30 @@ const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections,
     if (window.confirm('¿Estás seguro de eliminar esta colección y todas sus joyas?')) {
       try {
         console.log('Eliminando colección:', id);
-        await axios.delete(`${API}/collections/${id}`);
+        const response = await axios.delete(`${API}/collections/${id}`);
+        // El borrado se hace en segundo plano: se consulta el trabajo hasta que termine
+        // o deje de avanzar durante JOB_STALL_TIMEOUT_MS
+        let job = response.data.job;
+        let lastUpdate = job.updated_at;
+        let lastProgressAt = Date.now();
+        while (job.status === 'pending' || job.status === 'running') {
+          if (Date.now() - lastProgressAt > JOB_STALL_TIMEOUT_MS) {
+            await onCollectionsUpdate();
+            await onJewelryUpdate();
+            throw new Error('El borrado no avanza; se retomará en el servidor. Vuelve a comprobarlo más tarde');
+          }
+          await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+          job = (await axios.get(`${API}/jobs/${job.id}`)).data;
+          if (job.updated_at !== lastUpdate) {
+            lastUpdate = job.updated_at;
+            lastProgressAt = Date.now();
+          }
+        }
         await onCollectionsUpdate();
         await onJewelryUpdate();
+        if (job.status === 'failed') {
+          throw new Error(job.error || 'El borrado no se completó');
+        }
         alert('Colección eliminada exitosamente');
       } catch (error) {
         console.error('Error al eliminar colección:', error);
@@ -493,6 +588,18 @@ const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections,
     }
   };
 
+  const loadDemoData = async () => {
+    try {
+      const response = await axios.post(`${API}/init-demo-data`);
+      await onCollectionsUpdate();
+      await onJewelryUpdate();
+      alert(`Datos de demostración: ${response.data.collections} colecciones y ${response.data.items} joyas añadidas`);
+    } catch (error) {
+      console.error('Error al cargar datos de demostración:', error);
+      alert(`Error al cargar datos de demostración: ${error.response?.data?.detail || error.message}`);
+    }
+  };
+
   const saveJewelry = async (jewelry) => {
     if (isSaving) return;
     setIsSaving(true);
@@ -664,15 +771,68 @@ const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections,
                   <input
                     type="file"
                     accept="image/*"
-                    onChange={(e) => handleImageUpload(e, (base64) => setEditConfig({...editConfig, logo_base64: base64}))}
+                    onChange={(e) => handleImageUpload(e, (hash) => setEditConfig({...editConfig, logo_base64: '', logo_hash: hash}))}
                     className="form-input"
                   />
-                  {editConfig.logo_base64 && (
+                  {imageSrc(editConfig.logo_base64, editConfig.logo_hash) && (
                     <div className="image-preview">
-                      <img src={editConfig.logo_base64} alt="Logo preview" className="preview-img" />
+                      <img src={imageSrc(editConfig.logo_base64, editConfig.logo_hash)} alt="Logo preview" className="preview-img" />
                     </div>
                   )}
                 </div>
+
+                <div className="form-group full-width">
+                  <label className="form-label">Procesado de imágenes</label>
+                  <div className="form-check">
+                    <input
+                      type="checkbox"
+                      id="image_normalize"
+                      checked={editConfig.image_normalize ?? true}
+                      onChange={(e) => setEditConfig({...editConfig, image_normalize: e.target.checked})}
+                      className="form-check-input"
+                    />
+                    <label htmlFor="image_normalize" className="form-check-label">Optimizar imágenes al subirlas (quita EXIF, reduce y recomprime)</label>
+                  </div>
+                </div>
+
+                <div className="form-group">
+                  <label className="form-label">Formato</label>
+                  <select
+                    value={editConfig.image_format || 'jpeg'}
+                    onChange={(e) => setEditConfig({...editConfig, image_format: e.target.value})}
+                    className="form-select"
+                    disabled={!(editConfig.image_normalize ?? true)}
+                  >
+                    <option value="jpeg">JPEG progresivo</option>
+                    <option value="webp">WebP</option>
+                  </select>
+                </div>
+
+                <div className="form-group">
+                  <label className="form-label">Lado máximo (px)</label>
+                  <input
+                    type="number"
+                    min="256"
+                    max="8192"
+                    value={editConfig.image_max_side ?? 2400}
+                    onChange={(e) => setEditConfig({...editConfig, image_max_side: parseInt(e.target.value, 10) || 2400})}
+                    className="form-input"
+                    disabled={!(editConfig.image_normalize ?? true)}
+                  />
+                </div>
+
+                <div className="form-group">
+                  <label className="form-label">Calidad (40-95)</label>
+                  <input
+                    type="number"
+                    min="40"
+                    max="95"
+                    value={editConfig.image_quality ?? 85}
+                    onChange={(e) => setEditConfig({...editConfig, image_quality: parseInt(e.target.value, 10) || 85})}
+                    className="form-input"
+                    disabled={!(editConfig.image_normalize ?? true)}
+                  />
+                </div>
               </div>
             </div>
           )}
@@ -858,6 +1018,9 @@ const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections,
                   <button onClick={() => setEditingCollection({ name: '', description: '', image_base64: '', position: collections.length })} className="btn-primary">
                     ➕ Nueva Colección
                   </button>
+                  <button onClick={loadDemoData} className="btn-secondary">
+                    ✨ Datos de Demostración
+                  </button>
                 </div>
               </div>
 
@@ -865,8 +1028,8 @@ const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections,
                 {collections.map(collection => (
                   <div key={collection.id} className="item-card">
                     <div className="item-image">
-                      {collection.image_base64 ? (
-                        <img src={collection.image_base64} alt={collection.name} />
+                      {imageSrc(collection.image_base64, collection.image_hash) ? (
+                        <img src={imageSrc(collection.image_base64, collection.image_hash, 200)} alt={collection.name} />
                       ) : (
                         <div className="placeholder-image">📷</div>
                       )}
@@ -919,12 +1082,12 @@ const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections,
                         <input
                           type="file"
                           accept="image/*"
-                          onChange={(e) => handleImageUpload(e, (base64) => setEditingCollection({...editingCollection, image_base64: base64}))}
+                          onChange={(e) => handleImageUpload(e, (hash) => setEditingCollection({...editingCollection, image_base64: '', image_hash: hash}))}
                           className="form-input"
                         />
-                        {editingCollection.image_base64 && (
+                        {imageSrc(editingCollection.image_base64, editingCollection.image_hash) && (
                           <div className="image-preview">
-                            <img src={editingCollection.image_base64} alt="Preview" className="preview-img" />
+                            <img src={imageSrc(editingCollection.image_base64, editingCollection.image_hash)} alt="Preview" className="preview-img" />
                           </div>
                         )}
                       </div>
@@ -959,8 +1122,8 @@ const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections,
                 {jewelryItems.map(jewelry => (
                   <div key={jewelry.id} className="item-card">
                     <div className="item-image">
-                      {jewelry.image_base64 ? (
-                        <img src={jewelry.image_base64} alt={jewelry.name} />
+                      {imageSrc(jewelry.image_base64, jewelry.image_hash) ? (
+                        <img src={imageSrc(jewelry.image_base64, jewelry.image_hash, 200)} alt={jewelry.name} />
                       ) : (
                         <div className="placeholder-image">💍</div>
                       )}
@@ -984,6 +1147,7 @@ const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections,
                     </div>
                   </div>
                 ))}
+                {hasMoreJewelry && <LoadMoreSentinel onVisible={onLoadMoreJewelry} />}
               </div>
 
               {/* Modal de edición de joya */}
@@ -1035,12 +1199,12 @@ const AdminPanel = ({ isOpen, onClose, siteConfig, onConfigUpdate, collections,
                         <input
                           type="file"
                           accept="image/*"
-                          onChange={(e) => handleImageUpload(e, (base64) => setEditingJewelry({...editingJewelry, image_base64: base64}))}
+                          onChange={(e) => handleImageUpload(e, (hash) => setEditingJewelry({...editingJewelry, image_base64: '', image_hash: hash}))}
                           className="form-input"
                         />
-                        {editingJewelry.image_base64 && (
+                        {imageSrc(editingJewelry.image_base64, editingJewelry.image_hash) && (
                           <div className="image-preview">
-                            <img src={editingJewelry.image_base64} alt="Preview" className="preview-img" />
+                            <img src={imageSrc(editingJewelry.image_base64, editingJewelry.image_hash)} alt="Preview" className="preview-img" />
                           </div>
                         )}
                       </div>
@@ -1097,6 +1261,30 @@ const ScrollReveal = ({ children, direction = 'up', delay = 0 }) => {
   );
 };
 
+// Sentinel para scroll infinito: avisa cuando entra en pantalla
+const LoadMoreSentinel = ({ onVisible }) => {
+  const sentinelRef = useRef();
+
+  useEffect(() => {
+    const observer = new IntersectionObserver(
+      ([entry]) => {
+        if (entry.isIntersecting) {
+          onVisible();
+        }
+      },
+      { rootMargin: '400px' }
+    );
+
+    if (sentinelRef.current) {
+      observer.observe(sentinelRef.current);
+    }
+
+    return () => observer.disconnect();
+  }, [onVisible]);
+
+  return <div ref={sentinelRef} className="load-more-sentinel" aria-hidden="true"></div>;
+};
+
 // Parallax Component
 const ParallaxSection = ({ children, speed = 0.5, className = '' }) => {
   const [offsetY, setOffsetY] = useState(0);
@@ -1211,6 +1399,10 @@ const JewelryApp = () => {
   const [siteConfig, setSiteConfig] = useState(null);
   const [collections, setCollections] = useState([]);
   const [jewelryItems, setJewelryItems] = useState([]);
+  const [jewelryCursor, setJewelryCursor] = useState(null);
+  const isLoadingMoreJewelry = useRef(false);
+  const [itemsByCollection, setItemsByCollection] = useState({}); // { [collectionId]: { items, next_cursor } }
+  const loadingCollectionItems = useRef(new Set());
   const [selectedCollection, setSelectedCollection] = useState(null);
   const [showLoginModal, setShowLoginModal] = useState(false);
   const [showAdminPanel, setShowAdminPanel] = useState(false);
@@ -1223,6 +1415,10 @@ const JewelryApp = () => {
   const [scrollY, setScrollY] = useState(0);
   const [randomButtonPosition, setRandomButtonPosition] = useState('right'); // 'left' or 'right'
   const [selectedJewelryImage, setSelectedJewelryImage] = useState(null); // Para modal de imagen ampliada
+  const [searchQuery, setSearchQuery] = useState('');
+  const [searchCollection, setSearchCollection] = useState(null); // Filtro por colección dentro de la búsqueda
+  const [searchResults, setSearchResults] = useState(null); // { items, total, next_cursor, facets }
+  const isLoadingMoreSearch = useRef(false);
   const { isAuthenticated, logout } = useAuth();
 
   // Color schemes
@@ -1288,14 +1484,55 @@ const JewelryApp = () => {
     return () => clearTimeout(resetTimer);
   }, [showHiddenZone]);
 
-  // Load initial data
+  // Load initial data: una sola petición para el primer render
   useEffect(() => {
-    loadSiteConfig();
-    loadCollections();
-    loadJewelryItems();
-    initDemoData();
+    loadStorefront();
   }, []);
 
+  // Búsqueda en el catálogo con un pequeño retardo mientras se escribe
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`${API}/search`, {
+          params: { q: query, collection_id: searchCollection || undefined, limit: STOREFRONT_ITEMS_PER_COLLECTION }
+        });
+        if (!cancelled) setSearchResults(response.data);
+      } catch (error) {
+        console.error('Error searching jewelry:', error);
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery, searchCollection]);
+
+  // El listado plano de joyas sólo lo necesita el panel de administración
+  useEffect(() => {
+    if (showAdminPanel) {
+      loadJewelryItems();
+    }
+  }, [showAdminPanel]);
+
+  const loadStorefront = async () => {
+    try {
+      const response = await axios.get(`${API}/storefront`, {
+        params: { items_limit: STOREFRONT_ITEMS_PER_COLLECTION }
+      });
+      setSiteConfig(response.data.config);
+      setCollections(response.data.collections);
+      setItemsByCollection(response.data.items_by_collection);
+    } catch (error) {
+      console.error('Error loading storefront:', error);
+    }
+  };
+
   const loadSiteConfig = async () => {
     try {
       console.log('Cargando configuración del sitio...');
@@ -1307,34 +1544,84 @@ const JewelryApp = () => {
     }
   };
 
-  const loadCollections = async () => {
+  const loadJewelryItems = async () => {
     try {
-      const response = await axios.get(`${API}/collections`);
-      setCollections(response.data);
+      // Primera página rápida; el resto se carga al hacer scroll
+      const response = await axios.get(`${API}/jewelry-items`, { params: { limit: JEWELRY_PAGE_SIZE } });
+      setJewelryItems(response.data.items);
+      setJewelryCursor(response.data.next_cursor);
     } catch (error) {
-      console.error('Error loading collections:', error);
+      console.error('Error loading jewelry items:', error);
     }
   };
 
-  const loadJewelryItems = async () => {
+  const loadMoreJewelryItems = async () => {
+    if (!jewelryCursor || isLoadingMoreJewelry.current) return;
+    isLoadingMoreJewelry.current = true;
     try {
-      const response = await axios.get(`${API}/jewelry-items`);
-      setJewelryItems(response.data);
+      const response = await axios.get(`${API}/jewelry-items`, {
+        params: { limit: JEWELRY_PAGE_SIZE, cursor: jewelryCursor }
+      });
+      setJewelryItems(prev => [...prev, ...response.data.items]);
+      setJewelryCursor(response.data.next_cursor);
     } catch (error) {
-      console.error('Error loading jewelry items:', error);
+      console.error('Error loading more jewelry items:', error);
+    } finally {
+      isLoadingMoreJewelry.current = false;
     }
   };
 
-  const initDemoData = async () => {
+  const reloadJewelry = async () => {
+    await Promise.all([loadJewelryItems(), loadStorefront()]);
+  };
+
+  const loadMoreCollectionItems = async (collectionId) => {
+    const page = itemsByCollection[collectionId];
+    if (!page?.next_cursor || loadingCollectionItems.current.has(collectionId)) return;
+    loadingCollectionItems.current.add(collectionId);
     try {
-      await axios.post(`${API}/init-demo-data`);
+      const response = await axios.get(`${API}/collections/${collectionId}/items`, {
+        params: { limit: STOREFRONT_ITEMS_PER_COLLECTION, cursor: page.next_cursor }
+      });
+      setItemsByCollection(prev => ({
+        ...prev,
+        [collectionId]: {
+          items: [...(prev[collectionId]?.items || []), ...response.data.items],
+          next_cursor: response.data.next_cursor
+        }
+      }));
     } catch (error) {
-      console.error('Error initializing demo data:', error);
+      console.error('Error loading collection items:', error);
+    } finally {
+      loadingCollectionItems.current.delete(collectionId);
+    }
+  };
+
+  const loadMoreSearchResults = async () => {
+    if (!searchResults?.next_cursor || isLoadingMoreSearch.current) return;
+    isLoadingMoreSearch.current = true;
+    try {
+      const response = await axios.get(`${API}/search`, {
+        params: {
+          q: searchResults.query,
+          collection_id: searchCollection || undefined,
+          limit: STOREFRONT_ITEMS_PER_COLLECTION,
+          cursor: searchResults.next_cursor
+        }
+      });
+      setSearchResults(prev => ({
+        ...response.data,
+        items: [...(prev?.items || []), ...response.data.items]
+      }));
+    } catch (error) {
+      console.error('Error loading more search results:', error);
+    } finally {
+      isLoadingMoreSearch.current = false;
     }
   };
 
   const getItemsByCollection = (collectionId) => {
-    return jewelryItems.filter(item => item.collection_id === collectionId);
+    return itemsByCollection[collectionId]?.items || [];
   };
 
   // Hidden zone handler mejorado - requiere 5 clics
@@ -1480,8 +1767,8 @@ const JewelryApp = () => {
     );
   };
 
-  const openImageEditor = (imageBase64, itemId = null, collectionId = null) => {
-    setEditingImage({ base64: imageBase64, itemId, collectionId });
+  const openImageEditor = (imageBase64, itemId = null, collectionId = null, imageHash = null) => {
+    setEditingImage({ base64: imageBase64, imageHash, itemId, collectionId });
     setShowImageEditor(true);
   };
 
@@ -1492,10 +1779,8 @@ const JewelryApp = () => {
       // Actualizar logo en la configuración
       setSiteConfig(prev => ({ ...prev, logo_base64: imageBase64 }));
       loadSiteConfig(); // Recargar configuración desde el backend
-    } else if (editingImage?.itemId) {
-      loadJewelryItems();
-    } else if (editingImage?.collectionId) {
-      loadCollections();
+    } else if (editingImage?.itemId || editingImage?.collectionId) {
+      loadStorefront();
     }
     
     setShowImageEditor(false);
@@ -1518,18 +1803,18 @@ const JewelryApp = () => {
       {/* Header con logo adaptable y efectos parallax */}
       <header className={`main-header ${isScrolled ? 'scrolled' : ''}`}>
         <div className="header-content">
-          {siteConfig.logo_base64 && (
+          {imageSrc(siteConfig.logo_base64, siteConfig.logo_hash) && (
             <div className="logo-container">
               <img
-                src={siteConfig.logo_base64}
+                src={imageSrc(siteConfig.logo_base64, siteConfig.logo_hash, 480)}
                 alt={siteConfig.site_name}
                 className="logo"
-                onClick={() => isAuthenticated && openImageEditor(siteConfig.logo_base64, 'logo')}
+                onClick={() => isAuthenticated && openImageEditor(imageSrc(siteConfig.logo_base64, siteConfig.logo_hash), 'logo', null, siteConfig.logo_hash)}
                 style={{ cursor: isAuthenticated ? 'pointer' : 'default' }}
               />
               {isAuthenticated && (
                 <button
-                  onClick={() => openImageEditor(siteConfig.logo_base64, 'logo')}
+                  onClick={() => openImageEditor(imageSrc(siteConfig.logo_base64, siteConfig.logo_hash), 'logo', null, siteConfig.logo_hash)}
                   className="edit-logo-btn"
                   title="Editar logo"
                 >
@@ -1590,6 +1875,70 @@ const JewelryApp = () => {
             </div>
           </ScrollReveal>
           
+          <div className="storefront-search">
+            <input
+              type="search"
+              value={searchQuery}
+              onChange={(e) => setSearchQuery(e.target.value)}
+              placeholder="Buscar joyas por nombre o descripción..."
+              className="storefront-search-input"
+              maxLength={200}
+            />
+          </div>
+          
+          {searchResults ? (
+            <div className="search-results">
+              <div className="search-facets">
+                <button
+                  onClick={() => setSearchCollection(null)}
+                  className={`search-facet ${!searchCollection ? 'active' : ''}`}
+                >
+                  Todas ({searchResults.facets.collections.reduce((sum, facet) => sum + facet.count, 0)})
+                </button>
+                {searchResults.facets.collections.map(facet => (
+                  <button
+                    key={facet.id}
+                    onClick={() => setSearchCollection(facet.id)}
+                    className={`search-facet ${searchCollection === facet.id ? 'active' : ''}`}
+                  >
+                    {facet.name || 'Sin colección'} ({facet.count})
+                  </button>
+                ))}
+              </div>
+              
+              {searchResults.items.length === 0 ? (
+                <p className="search-empty">No hay joyas que coincidan con "{searchResults.query}"</p>
+              ) : (
+                <div className="jewelry-showcase">
+                  {searchResults.items.map(item => (
+                    <div key={item.id} className="jewelry-card-elegant">
+                      <div className="jewelry-image-container">
+                        <img
+                          src={imageSrc(item.image_base64, item.image_hash, 480)}
+                          alt={item.name}
+                          className="jewelry-image"
+                          onClick={() => setSelectedJewelryImage({
+                            src: imageSrc(item.image_base64, item.image_hash, 1200),
+                            name: item.name,
+                            description: item.description
+                          })}
+                          style={{ cursor: 'pointer' }}
+                        />
+                        <div className="jewelry-shine-effect"></div>
+                      </div>
+                      <div className="jewelry-content">
+                        <h4 className="jewelry-name">{item.name}</h4>
+                        <p className="jewelry-description">{item.description}</p>
+                      </div>
+                    </div>
+                  ))}
+                  {searchResults.next_cursor && (
+                    <LoadMoreSentinel onVisible={loadMoreSearchResults} />
+                  )}
+                </div>
+              )}
+            </div>
+          ) : (
           <div className="collections-showcase">
             {collections.map((collection, index) => (
               <ScrollReveal key={collection.id} direction="up" delay={200 * (index + 1)}>
@@ -1599,7 +1948,7 @@ const JewelryApp = () => {
                 >
                   <div className="collection-image-container">
                     <img
-                      src={collection.image_base64}
+                      src={imageSrc(collection.image_base64, collection.image_hash, 480)}
                       alt={collection.name}
                       className="collection-image"
                     />
@@ -1610,7 +1959,7 @@ const JewelryApp = () => {
                           <button
                             onClick={(e) => {
                               e.stopPropagation();
-                              openImageEditor(collection.image_base64, null, collection.id);
+                              openImageEditor(imageSrc(collection.image_base64, collection.image_hash), null, collection.id, collection.image_hash);
                             }}
                             className="edit-image-btn"
                           >
@@ -1632,6 +1981,7 @@ const JewelryApp = () => {
               </ScrollReveal>
             ))}
           </div>
+          )}
         </div>
       </section>
 
@@ -1657,11 +2007,11 @@ const JewelryApp = () => {
                 <div key={item.id} className="jewelry-card-elegant">
                   <div className="jewelry-image-container">
                     <img
-                      src={item.image_base64}
+                      src={imageSrc(item.image_base64, item.image_hash, 480)}
                       alt={item.name}
                       className="jewelry-image"
                       onClick={() => setSelectedJewelryImage({
-                        src: item.image_base64,
+                        src: imageSrc(item.image_base64, item.image_hash, 1200),
                         name: item.name,
                         description: item.description
                       })}
@@ -1672,7 +2022,7 @@ const JewelryApp = () => {
                       <button
                         onClick={(e) => {
                           e.stopPropagation();
-                          openImageEditor(item.image_base64, item.id);
+                          openImageEditor(imageSrc(item.image_base64, item.image_hash), item.id, null, item.image_hash);
                         }}
                         className="edit-image-btn-small"
                       >
@@ -1686,6 +2036,9 @@ const JewelryApp = () => {
                   </div>
                 </div>
               ))}
+              {itemsByCollection[selectedCollection.id]?.next_cursor && (
+                <LoadMoreSentinel onVisible={() => loadMoreCollectionItems(selectedCollection.id)} />
+              )}
             </div>
           </div>
         </div>
@@ -1743,14 +2096,17 @@ const JewelryApp = () => {
         siteConfig={siteConfig}
         onConfigUpdate={loadSiteConfig}
         collections={collections}
-        onCollectionsUpdate={loadCollections}
+        onCollectionsUpdate={loadStorefront}
         jewelryItems={jewelryItems}
-        onJewelryUpdate={loadJewelryItems}
+        onJewelryUpdate={reloadJewelry}
+        hasMoreJewelry={Boolean(jewelryCursor)}
+        onLoadMoreJewelry={loadMoreJewelryItems}
       />
 
       {showImageEditor && (
         <ImageEditor
           imageBase64={editingImage?.base64}
+          imageHash={editingImage?.imageHash}
           itemId={editingImage?.itemId}
           collectionId={editingImage?.collectionId}
           onSave={saveEditedImage}
@@ -0,0 +1,36 @@
+"""Shared fixtures: the backend app on mongomock-motor with a filesystem blob store."""
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# server.py lee estas variables al importarse
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "aoj_tests")
+os.environ["IMAGE_STORE"] = "filesystem"
+# mongomock no implementa $text ni transacciones
+os.environ["SEARCH_BACKEND"] = "memory"
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """The ``server`` module with a fresh database and blob store per test."""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server as backend
+
+    monkeypatch.setenv("DB_NAME", f"test_{uuid.uuid4().hex[:8]}")
+    monkeypatch.setattr(backend, "AsyncIOMotorClient", mongomock_motor.AsyncMongoMockClient)
+    monkeypatch.setattr(backend, "_client", None)
+    monkeypatch.setattr(backend, "_image_pool", None)
+    monkeypatch.setattr(backend, "_transactions_supported", False)
+    monkeypatch.setattr(backend.blob_store, "root", tmp_path / "images")
+    monkeypatch.setattr(backend, "config_cache", backend.ConfigCache(backend.config_cache.ttl))
+    backend.search_index.invalidate()
+    yield backend
+    if backend._image_pool is not None:
+        backend._image_pool.shutdown()
@@ -0,0 +1,65 @@
+"""Token revocation when the admin password changes."""
+import asyncio
+
+import httpx
+
+
+def client_for(server) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=server.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+async def login(client, password: str) -> httpx.Response:
+    return await client.post("/api/auth/login", json={"username": "admin", "password": password})
+
+
+def auth(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_password_change_revokes_old_tokens(server):
+    async def scenario():
+        async with client_for(server) as client:
+            old_token = (await login(client, "admin123")).json()["token"]
+
+            response = await client.put("/api/config", json={"admin_password": "nueva"}, headers=auth(old_token))
+            assert response.status_code == 200
+            new_token = response.json()["token"]
+
+            revoked = await client.put("/api/config", json={"site_name": "x"}, headers=auth(old_token))
+            assert revoked.status_code == 401
+            assert revoked.json()["detail"] == "Token revoked"
+            assert (await client.put("/api/config", json={"site_name": "x"}, headers=auth(new_token))).status_code == 200
+
+            assert (await login(client, "admin123")).status_code == 401
+            assert (await login(client, "nueva")).status_code == 200
+
+        config = await server.db.site_config.find_one()
+        assert config["token_version"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_other_updates_keep_tokens_valid(server):
+    async def scenario():
+        async with client_for(server) as client:
+            token = (await login(client, "admin123")).json()["token"]
+            response = await client.put("/api/config", json={"site_name": "Joyas"}, headers=auth(token))
+            assert "token" not in response.json()
+            assert (await client.put("/api/config", json={"site_name": "Otra"}, headers=auth(token))).status_code == 200
+
+    asyncio.run(scenario())
+
+
+def test_revocation_by_another_worker_applies_immediately(server):
+    async def scenario():
+        async with client_for(server) as client:
+            token = (await login(client, "admin123")).json()["token"]
+            assert (await client.put("/api/config", json={"site_name": "x"}, headers=auth(token))).status_code == 200
+
+            # Otro worker cambia la contraseña: este proceso no recibe ningún aviso
+            await server.db.site_config.update_one({}, {"$inc": {"token_version": 1}})
+            revoked = await client.put("/api/config", json={"site_name": "y"}, headers=auth(token))
+            assert revoked.status_code == 401
+
+    asyncio.run(scenario())
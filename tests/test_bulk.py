@@ -0,0 +1,86 @@
+"""Per-operation statuses and image references of POST /api/jewelry-items/bulk."""
+import asyncio
+import base64
+import io
+
+import httpx
+from PIL import Image
+
+
+def data_uri(color) -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def item(name: str, **data) -> dict:
+    return {"name": name, "description": "", "collection_id": "c", **data}
+
+
+async def bulk(server, operations: list) -> dict:
+    token = server.create_token("admin", 0)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await server.init_default_config()
+        response = await client.post(
+            "/api/jewelry-items/bulk", json={"operations": operations},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+    assert response.status_code == 200
+    return response.json()
+
+
+async def refs(server, image_hash: str):
+    meta = await server.db.images.find_one({"hash": image_hash})
+    return None if meta is None else meta.get("refs", 0)
+
+
+def test_partial_failure_statuses(server):
+    async def scenario():
+        await server.db.jewelry_items.insert_many([
+            {"id": "a", **item("A")},
+            {"id": "b", **item("B")},
+        ])
+        body = await bulk(server, [
+            {"op": "create", "data": item("Nueva")},
+            {"op": "create", "data": {"name": "Sin colección"}},
+            {"op": "update", "id": "a", "data": {"name": "A2"}},
+            {"op": "update", "id": "b", "data": {"name": "B2"}},
+            {"op": "delete", "id": "b"},
+            {"op": "delete", "id": "missing"},
+            {"op": "update"},
+        ])
+        statuses = [result["status"] for result in body["results"]]
+        assert statuses == ["ok", "error", "ok", "error", "error", "not_found", "error"]
+        assert body["results"][3]["error"] == "Duplicate id in request"
+        assert (body["inserted"], body["updated"], body["deleted"]) == (1, 1, 0)
+        assert (await server.db.jewelry_items.find_one({"id": "b"}))["name"] == "B"
+
+    asyncio.run(scenario())
+
+
+def test_unchanged_update_counts_as_updated(server):
+    async def scenario():
+        await server.db.jewelry_items.insert_one({"id": "a", **item("A")})
+        body = await bulk(server, [{"op": "update", "id": "a", "data": {"name": "A"}}])
+        assert body["results"][0]["status"] == "ok"
+        assert body["updated"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_insert_releases_its_image(server):
+    async def scenario():
+        await server.db.jewelry_items.create_index("name", unique=True)
+        body = await bulk(server, [
+            {"op": "create", "data": item("Repetida", image_base64=data_uri((200, 10, 10)))},
+            {"op": "create", "data": item("Repetida", image_base64=data_uri((10, 200, 10)))},
+        ])
+        assert [result["status"] for result in body["results"]] == ["ok", "error"]
+
+        kept = (await server.db.jewelry_items.find_one({"name": "Repetida"}))["image_hash"]
+        hashes = await server.db.images.distinct("hash", {"variants": {"$exists": True}})
+        assert await refs(server, kept) == 1
+        assert hashes == [kept]
+
+    asyncio.run(scenario())
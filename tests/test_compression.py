@@ -0,0 +1,83 @@
+"""Content negotiation and the compressed body cache of CompressionMiddleware."""
+import asyncio
+import gzip
+
+import httpx
+import pytest
+
+
+def json_app(body: bytes, etag: str = '"v1"', status: int = 200):
+    async def app(scope, receive, send):
+        headers = [(b"content-type", b"application/json"), (b"etag", etag.encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body if status == 200 else b""})
+
+    return app
+
+
+async def get(app, accept_encoding: str, path: str = "/") -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("*", "br"),
+    ("identity", None),
+    ("gzip;q=0", None),
+    ("", None),
+])
+def test_choose_encoding(server, accept_encoding, expected):
+    assert server.choose_encoding(accept_encoding) == expected
+
+
+def test_large_bodies_are_compressed_and_cached_by_etag(server):
+    body = b'{"items": [' + b",".join(b'{"name": "anillo"}' for _ in range(200)) + b"]}"
+    app = json_app(body)
+    middleware = server.CompressionMiddleware(app)
+
+    async def scenario():
+        first = await get(middleware, "gzip")
+        assert first.headers["content-encoding"] == "gzip"
+        assert first.headers["etag"] == 'W/"v1"'
+        assert "Accept-Encoding" in first.headers["vary"]
+        assert first.content == body
+        assert ('"v1"', "gzip") in middleware.cache.entries
+
+        # La siguiente respuesta con el mismo ETag sale de la caché, no se recomprime
+        middleware.cache.entries[('"v1"', "gzip")] = gzip.compress(b'{"cached": true}')
+        assert (await get(middleware, "gzip")).json() == {"cached": True}
+
+    asyncio.run(scenario())
+
+
+def test_small_and_not_modified_responses_pass_through(server):
+    async def scenario():
+        app = json_app(b'{"ok": true}')
+        small = await get(server.CompressionMiddleware(app), "gzip")
+        assert "content-encoding" not in small.headers
+        assert small.headers["etag"] == '"v1"'
+
+        app = json_app(b"", status=304)
+        not_modified = await get(server.CompressionMiddleware(app), "gzip")
+        assert not_modified.status_code == 304
+        assert "content-encoding" not in not_modified.headers
+
+    asyncio.run(scenario())
+
+
+def test_api_listing_is_compressed(server):
+    async def scenario():
+        await server.db.jewelry_items.insert_many([
+            {"id": f"item-{n:03d}", "name": f"Anillo {n}", "collection_id": "c", "position": n} for n in range(100)
+        ])
+        # mongomock no evalúa la proyección "summary"
+        response = await get(server.app, "br", "/api/jewelry-items?shape=full")
+        assert response.headers["content-encoding"] == "br"
+        assert response.headers["etag"].startswith('W/"')
+        assert len(response.json()) == 100
+
+    asyncio.run(scenario())
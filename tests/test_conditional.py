@@ -0,0 +1,51 @@
+"""ETag / If-None-Match on the catalog and config endpoints."""
+import asyncio
+
+import httpx
+
+
+async def get(server, path: str, **headers) -> httpx.Response:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers={"Accept-Encoding": "identity", **headers})
+
+
+def test_etag_matches(server):
+    etag_matches = server.etag_matches
+    assert not etag_matches(None, '"a"')
+    assert etag_matches("*", '"a"')
+    assert etag_matches('"b", "a"', '"a"')
+    assert etag_matches('W/"a"', '"a"')
+    assert not etag_matches('"b"', '"a"')
+
+
+def test_unchanged_config_answers_304(server):
+    async def scenario():
+        first = await get(server, "/api/config")
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == server.CACHE_CONTROL["config"]
+
+        cached = await get(server, "/api/config", **{"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+        # Una caché intermedia puede haber guardado la versión comprimida con ETag débil
+        assert (await get(server, "/api/config", **{"If-None-Match": f"W/{etag}"})).status_code == 304
+
+    asyncio.run(scenario())
+
+
+def test_changed_collections_get_a_new_etag(server):
+    async def scenario():
+        # mongomock no evalúa la proyección "summary"
+        first = await get(server, "/api/collections?shape=full")
+        etag = first.headers["etag"]
+
+        await server.db.collections.insert_one({"id": "c", "name": "Anillos", "description": "", "position": 0})
+        changed = await get(server, "/api/collections?shape=full", **{"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert [collection["id"] for collection in changed.json()] == ["c"]
+
+    asyncio.run(scenario())
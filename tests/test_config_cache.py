@@ -0,0 +1,44 @@
+"""Site config cache: a write during a slow load must not be overwritten by the stale read."""
+import asyncio
+
+
+def test_load_started_before_invalidate_is_not_cached(server):
+    cache = server.ConfigCache(60)
+    generation = cache.generation
+    cache.invalidate()
+    cache.set({"site_name": "antes"}, generation)
+    assert cache.get() is None
+
+    cache.set({"site_name": "después"}, cache.generation)
+    assert cache.get() == {"site_name": "después"}
+
+
+def test_config_update_during_load_is_served_next(server, monkeypatch):
+    async def scenario():
+        await server.init_default_config()
+        # db.<colección> devuelve un objeto nuevo en cada acceso: se parchea la clase
+        collection_class = type(server.db.site_config)
+        find_one = collection_class.find_one
+        read_done = asyncio.Event()
+        write_done = asyncio.Event()
+
+        async def slow_find_one(self, *args, **kwargs):
+            document = await find_one(self, *args, **kwargs)
+            read_done.set()
+            await write_done.wait()
+            return document
+
+        async def write():
+            await read_done.wait()
+            await server.db.site_config.update_one({}, {"$set": {"site_name": "Nuevo"}})
+            server.config_cache.invalidate()
+            write_done.set()
+
+        monkeypatch.setattr(collection_class, "find_one", slow_find_one)
+        stale, _ = await asyncio.wait_for(asyncio.gather(server.load_public_config(), write()), 5)
+        monkeypatch.setattr(collection_class, "find_one", find_one)
+
+        assert stale["site_name"] != "Nuevo"
+        assert (await server.load_public_config())["site_name"] == "Nuevo"
+
+    asyncio.run(scenario())
@@ -0,0 +1,89 @@
+"""Reference counting and garbage collection of stored images."""
+import asyncio
+import io
+
+from PIL import Image
+
+
+def make_jpeg(comment: bytes = b"", color=(180, 120, 60)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (900, 600), color).save(buffer, "JPEG", quality=90, comment=comment)
+    return buffer.getvalue()
+
+
+async def store_original(server, data: bytes) -> str:
+    # Sin normalizar, como con image_normalize desactivado
+    image_hash = await server.blob_store.put(data, "image/jpeg")
+    await server.ensure_image_variants(image_hash, data)
+    return image_hash
+
+
+async def variant_hashes(server, image_hash: str) -> list:
+    meta = await server.db.images.find_one({"hash": image_hash})
+    return [variant["hash"] for variant in meta["variants"]]
+
+
+def test_shared_variants_survive_until_last_original(server):
+    async def scenario():
+        first = await store_original(server, make_jpeg(b"first"))
+        second = await store_original(server, make_jpeg(b"second"))
+        assert first != second
+        second_variants = await variant_hashes(server, second)
+        shared = set(await variant_hashes(server, first)) & set(second_variants)
+        assert shared
+
+        assert await server.delete_unreferenced_image(first)
+        assert await server.db.images.find_one({"hash": first}) is None
+        for variant_hash in second_variants:
+            assert await server.blob_store.get(variant_hash) is not None
+
+        assert await server.delete_unreferenced_image(second)
+        for variant_hash in second_variants:
+            assert await server.blob_store.get(variant_hash) is None
+            assert await server.db.images.find_one({"hash": variant_hash}) is None
+
+    asyncio.run(scenario())
+
+
+def test_referenced_image_is_kept_and_counter_repaired(server):
+    async def scenario():
+        image_hash = await store_original(server, make_jpeg())
+        await server.db.jewelry_items.insert_many([
+            {"id": "a", "collection_id": "c", "image_hash": image_hash},
+            {"id": "b", "collection_id": "c", "image_hash": image_hash},
+        ])
+        # Contador desviado: ninguna referencia registrada
+        assert not await server.delete_unreferenced_image(image_hash)
+        meta = await server.db.images.find_one({"hash": image_hash})
+        assert meta["refs"] == 2
+
+        released = await server.adjust_image_refs(removed=[image_hash, image_hash])
+        assert released == [image_hash]
+        await server.db.jewelry_items.delete_many({})
+        await server.collect_unreferenced_images(released)
+        assert await server.db.images.find_one({"hash": image_hash}) is None
+        assert await server.blob_store.get(image_hash) is None
+
+    asyncio.run(scenario())
+
+
+def test_replacing_an_image_releases_the_previous_one(server):
+    async def scenario():
+        old, new = await asyncio.gather(
+            store_original(server, make_jpeg(color=(10, 20, 30))),
+            store_original(server, make_jpeg(color=(200, 20, 30))),
+        )
+        await server.db.collections.insert_one({"id": "c", "image_hash": old})
+        await server.adjust_image_refs(added=[old])
+
+        matched, released = await server.update_image_document(
+            server.db.collections, {"id": "c"}, {"image_hash": new}
+        )
+        assert matched and released == [old]
+        assert (await server.db.images.find_one({"hash": new}))["refs"] == 1
+
+        await server.collect_unreferenced_images(released)
+        assert await server.db.images.find_one({"hash": old}) is None
+        assert await server.db.images.find_one({"hash": new}) is not None
+
+    asyncio.run(scenario())
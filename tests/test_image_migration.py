@@ -0,0 +1,52 @@
+"""Startup migration of inline (data URI) images into the blob store."""
+import asyncio
+import base64
+import io
+
+from PIL import Image
+
+
+def make_data_uri() -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (120, 30, 200)).save(buffer, "JPEG")
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+async def run_startup_migration(server):
+    await server.schedule_inline_image_migration()
+    while server._job_tasks:
+        await asyncio.gather(*server._job_tasks.values())
+
+
+def test_migration_skips_malformed_uris_and_records_a_marker(server):
+    async def scenario():
+        await server.db.jewelry_items.insert_many([
+            {"id": "good", "collection_id": "c", "image_base64": make_data_uri()},
+            {"id": "broken", "collection_id": "c", "image_base64": "data:image/jpeg;base64,@@not-base64@@"},
+        ])
+        await run_startup_migration(server)
+
+        good = await server.db.jewelry_items.find_one({"id": "good"})
+        assert good["image_base64"] == "" and good["image_hash"]
+        broken = await server.db.jewelry_items.find_one({"id": "broken"})
+        assert broken["image_migration_error"] == "Invalid image data URI"
+        job = await server.db.jobs.find_one({"type": "migrate_images"})
+        assert job["status"] == "completed" and job["migrated"]["skipped"] == 1
+        assert await server.db.jobs.find_one({"id": server.IMAGE_MIGRATION_MARKER["id"]})
+
+        # Con la marca, el arranque ya no busca data URI
+        await server.db.collections.insert_one({"id": "late", "image_base64": make_data_uri()})
+        await run_startup_migration(server)
+        assert await server.db.jobs.count_documents({"type": "migrate_images"}) == 1
+
+    asyncio.run(scenario())
+
+
+def test_clean_catalog_only_records_the_marker(server):
+    async def scenario():
+        await server.db.collections.insert_one({"id": "c", "image_base64": "", "image_hash": None})
+        await run_startup_migration(server)
+        assert await server.db.jobs.count_documents({"type": "migrate_images"}) == 0
+        assert await server.db.jobs.find_one({"id": server.IMAGE_MIGRATION_MARKER["id"]})
+
+    asyncio.run(scenario())
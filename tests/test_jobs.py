@@ -0,0 +1,129 @@
+"""Background jobs: collection deletes and recovery of abandoned jobs."""
+import asyncio
+from datetime import datetime, timedelta
+
+
+async def seed_collection(server, items: int):
+    await server.db.collections.insert_one({"id": "c", "name": "c"})
+    await server.db.jewelry_items.insert_many(
+        [{"id": str(n), "collection_id": "c", "position": n} for n in range(items)]
+    )
+
+
+async def wait_for_jobs(server):
+    while server._job_tasks:
+        await asyncio.gather(*server._job_tasks.values())
+
+
+def test_delete_collection_job_runs_in_batches(server, monkeypatch):
+    monkeypatch.setattr(server, "JOB_BATCH_SIZE", 7)
+
+    async def scenario():
+        await seed_collection(server, 20)
+        job = await server.create_job("delete_collection", "c", collection_id="c", total=20)
+        server.start_job(job["id"])
+        await wait_for_jobs(server)
+
+        job = await server.db.jobs.find_one({"id": job["id"]})
+        assert job["status"] == "completed" and job["processed"] == 20
+        assert await server.db.jewelry_items.count_documents({}) == 0
+        assert await server.db.collections.count_documents({}) == 0
+
+    asyncio.run(scenario())
+
+
+def test_status_poll_resumes_job_with_expired_lease(server):
+    async def scenario():
+        await seed_collection(server, 5)
+        job = await server.create_job("delete_collection", "c", collection_id="c", total=5)
+        # El worker que lo tenía se detuvo a mitad
+        await server.db.jobs.update_one({"id": job["id"]}, {"$set": {
+            "status": "running", "worker": "gone", "lease_until": datetime.utcnow() - timedelta(seconds=1)
+        }})
+
+        status = await server.get_job(job["id"], token_data={})
+        assert status["status"] == "running"
+        await wait_for_jobs(server)
+        assert (await server.get_job(job["id"], token_data={}))["status"] == "completed"
+        assert await server.db.collections.count_documents({}) == 0
+
+    asyncio.run(scenario())
+
+
+def test_status_poll_leaves_leased_job_alone(server):
+    async def scenario():
+        await seed_collection(server, 5)
+        job = await server.create_job("delete_collection", "c", collection_id="c", total=5)
+        await server.db.jobs.update_one({"id": job["id"]}, {"$set": {
+            "status": "running", "worker": "other", "lease_until": datetime.utcnow() + timedelta(seconds=60)
+        }})
+
+        await server.get_job(job["id"], token_data={})
+        await wait_for_jobs(server)
+        assert (await server.db.jobs.find_one({"id": job["id"]}))["worker"] == "other"
+        assert await server.db.jewelry_items.count_documents({}) == 5
+
+    asyncio.run(scenario())
+
+
+def test_heartbeat_keeps_long_phases_from_being_taken_over(server, monkeypatch):
+    monkeypatch.setattr(server, "JOB_LEASE_SECONDS", 0.3)
+    runs = []
+
+    async def slow_job(job):
+        runs.append(job["id"])
+        # Una fase larga sin actualizar el progreso
+        await asyncio.sleep(1)
+        await server.update_job(job["id"], server.job_finished("completed"))
+
+    monkeypatch.setitem(server.JOB_RUNNERS, "slow", slow_job)
+
+    async def scenario():
+        job = await server.create_job("slow", "x")
+        server.start_job(job["id"])
+        server.start_job(job["id"])
+        for _ in range(8):
+            await asyncio.sleep(0.15)
+            await server.get_job(job["id"], token_data={})
+        await wait_for_jobs(server)
+        assert runs == [job["id"]]
+        assert (await server.db.jobs.find_one({"id": job["id"]}))["status"] == "completed"
+
+    asyncio.run(scenario())
+
+
+def test_runner_stops_writing_once_the_job_is_taken_over(server, monkeypatch):
+    monkeypatch.setattr(server, "JOB_BATCH_SIZE", 2)
+    collect = server.collect_unreferenced_images
+
+    async def taken_over(hashes):
+        # Otro worker reclama el trabajo tras el primer lote
+        await server.db.jobs.update_many({}, {"$set": {"worker": "other"}})
+        await collect(hashes)
+
+    monkeypatch.setattr(server, "collect_unreferenced_images", taken_over)
+
+    async def scenario():
+        await seed_collection(server, 6)
+        job = await server.create_job("delete_collection", "c", collection_id="c", total=6)
+        server.start_job(job["id"])
+        await wait_for_jobs(server)
+
+        job = await server.db.jobs.find_one({"id": job["id"]})
+        assert job["status"] == "running" and job["worker"] == "other"
+        assert job["processed"] == 2
+        assert await server.db.jewelry_items.count_documents({}) == 4
+
+    asyncio.run(scenario())
+
+
+def test_partial_batch_delete_recounts_instead_of_decrementing(server):
+    async def scenario():
+        image_hash = "a" * 64
+        await server.db.images.insert_one({"hash": image_hash, "refs": 3})
+        await server.db.jewelry_items.insert_one({"id": "kept", "collection_id": "x", "image_hash": image_hash})
+        released = await server.recount_hashes([image_hash, image_hash, None])
+        assert released == []
+        assert (await server.db.images.find_one({"hash": image_hash}))["refs"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,80 @@
+"""Renumbering and midpoint moves of PATCH /api/collections/{id}/order."""
+import asyncio
+
+import httpx
+
+
+async def reorder(server, payload: dict, collection_id: str = "c") -> httpx.Response:
+    token = server.create_token("admin", 0)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.patch(
+            f"/api/collections/{collection_id}/order", json=payload,
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+
+async def seed(server, positions: dict):
+    await server.init_default_config()
+    await server.db.collections.insert_one({"id": "c", "name": "Anillos", "description": "", "position": 0})
+    await server.db.jewelry_items.insert_many(
+        [{"id": item_id, "collection_id": "c", "position": position} for item_id, position in positions.items()]
+    )
+
+
+async def positions(server) -> dict:
+    items = await server.db.jewelry_items.find({"collection_id": "c"}).sort([("position", 1), ("id", 1)]).to_list(None)
+    return {item["id"]: item["position"] for item in items}
+
+
+def test_renumber_keeps_unlisted_items_at_the_end(server):
+    async def scenario():
+        await seed(server, {"a": 0, "b": 1, "c": 2, "d": 3})
+        response = await reorder(server, {"item_ids": ["c", "a"]})
+        assert response.json()["updated"] == 4
+        gap = server.ORDER_GAP
+        assert await positions(server) == {"c": 0, "a": gap, "b": 2 * gap, "d": 3 * gap}
+
+        assert (await reorder(server, {"item_ids": ["a", "x"]})).status_code == 400
+        assert (await reorder(server, {"item_ids": ["a", "a"]})).status_code == 400
+
+    asyncio.run(scenario())
+
+
+def test_move_takes_the_midpoint_between_neighbours(server):
+    async def scenario():
+        await seed(server, {"a": 0, "b": 1024, "c": 2048})
+        response = await reorder(server, {"move": {"item_id": "c", "after_id": "a"}})
+        assert response.json()["renumbered"] is False
+        assert await positions(server) == {"a": 0, "c": 512, "b": 1024}
+
+        await reorder(server, {"move": {"item_id": "b", "after_id": None}})
+        assert await positions(server) == {"b": -1024, "a": 0, "c": 512}
+
+        await reorder(server, {"move": {"item_id": "b", "after_id": "c"}})
+        assert await positions(server) == {"a": 0, "c": 512, "b": 512 + 1024}
+
+    asyncio.run(scenario())
+
+
+def test_move_without_gap_renumbers_the_collection(server):
+    async def scenario():
+        await seed(server, {"a": 0, "b": 1, "c": 2})
+        response = await reorder(server, {"move": {"item_id": "c", "after_id": "a"}})
+        assert response.json()["renumbered"] is True
+        gap = server.ORDER_GAP
+        assert await positions(server) == {"a": 0, "c": gap, "b": 2 * gap}
+
+    asyncio.run(scenario())
+
+
+def test_invalid_reorders_are_rejected(server):
+    async def scenario():
+        await seed(server, {"a": 0, "b": 1024})
+        assert (await reorder(server, {})).status_code == 400
+        assert (await reorder(server, {"item_ids": ["a"], "move": {"item_id": "a"}})).status_code == 400
+        assert (await reorder(server, {"item_ids": []}, collection_id="missing")).status_code == 404
+        assert (await reorder(server, {"move": {"item_id": "a", "after_id": "x"}})).status_code == 404
+        assert await positions(server) == {"a": 0, "b": 1024}
+
+    asyncio.run(scenario())
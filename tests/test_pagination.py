@@ -0,0 +1,53 @@
+"""Keyset pagination of the jewelry item listings."""
+import asyncio
+
+import httpx
+
+
+async def get(server, path: str, **params) -> httpx.Response:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        # mongomock no evalúa la proyección "summary"
+        return await client.get(path, params={"shape": "full", **params})
+
+
+async def seed_items(server, count: int):
+    # Posiciones repetidas: el desempate por id tiene que mantener el orden estable
+    await server.db.jewelry_items.insert_many(
+        [{"id": f"item-{n:02d}", "collection_id": "c", "position": n // 3} for n in range(count)]
+    )
+
+
+def test_pages_cover_every_item_once(server):
+    async def scenario():
+        await seed_items(server, 11)
+        seen, cursor = [], None
+        while True:
+            page = (await get(server, "/api/jewelry-items", limit=4, **({"cursor": cursor} if cursor else {}))).json()
+            seen.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == [f"item-{n:02d}" for n in range(11)]
+
+    asyncio.run(scenario())
+
+
+def test_unpaginated_listing_flags_truncation(server, monkeypatch):
+    monkeypatch.setattr(server, "UNPAGINATED_LIMIT", 5)
+
+    async def scenario():
+        await seed_items(server, 7)
+        response = await get(server, "/api/collections/c/items")
+        assert [item["id"] for item in response.json()] == [f"item-{n:02d}" for n in range(5)]
+        assert response.headers["x-truncated"] == "true"
+
+        rest = (await get(server, "/api/collections/c/items", cursor=response.headers["x-next-cursor"])).json()
+        assert [item["id"] for item in rest["items"]] == ["item-05", "item-06"]
+        assert rest["next_cursor"] is None
+
+        await server.db.jewelry_items.delete_many({"id": {"$in": ["item-05", "item-06"]}})
+        response = await get(server, "/api/jewelry-items")
+        assert len(response.json()) == 5 and "x-truncated" not in response.headers
+
+    asyncio.run(scenario())
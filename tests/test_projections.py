@@ -0,0 +1,71 @@
+"""The default ``summary`` listing projection.
+
+mongomock cannot evaluate aggregation expressions in a find() projection, so the
+expression is evaluated here with MongoDB's semantics for the operators it uses.
+"""
+import pytest
+
+
+class ExpressionError(Exception):
+    """What mongod reports as a server error (e.g. code 28657 for $substrBytes)."""
+
+
+def evaluate(expression, doc):
+    if isinstance(expression, str) and expression.startswith("$"):
+        return doc.get(expression[1:])
+    if not isinstance(expression, dict):
+        return expression
+    (operator, args), = expression.items()
+    if operator == "$cond":
+        condition, then, otherwise = args
+        return evaluate(then if evaluate(condition, doc) else otherwise, doc)
+    if operator == "$eq":
+        left, right = (evaluate(arg, doc) for arg in args)
+        return left == right
+    if operator == "$ifNull":
+        value, default = args
+        value = evaluate(value, doc)
+        return evaluate(default, doc) if value is None else value
+    if operator == "$substrCP":
+        value, start, length = (evaluate(arg, doc) for arg in args)
+        return value[start:start + length]
+    if operator == "$substrBytes":
+        value, start, length = (evaluate(arg, doc) for arg in args)
+        try:
+            return value.encode()[start:start + length].decode()
+        except UnicodeDecodeError:
+            raise ExpressionError("Invalid range, ending index is in the middle of a UTF-8 character.")
+    raise NotImplementedError(operator)
+
+
+def project(projection, doc):
+    result = {}
+    for field, spec in projection.items():
+        if spec == 0:
+            continue
+        if spec == 1:
+            if field in doc:
+                result[field] = doc[field]
+        else:
+            result[field] = evaluate(spec, doc)
+    return result
+
+
+@pytest.mark.parametrize("stored, listed", [
+    ("data:image/jpeg;base64,/9j/4AAQ", ""),
+    ("https://images.example.com/anillo.jpg", "https://images.example.com/anillo.jpg"),
+    # El quinto byte cae dentro de la "é"
+    ("joyaé.jpg", "joyaé.jpg"),
+    ("", ""),
+    (None, None),
+])
+def test_summary_projection_blanks_only_data_uris(server, stored, listed):
+    doc = {"_id": 1, "id": "a", "name": "Anillo", "image_hash": None, "image_base64": stored}
+    summary = project(server.SUMMARY_PROJECTION, doc)
+    assert summary["image_base64"] == listed
+    assert "_id" not in summary and summary["id"] == "a"
+
+
+def test_listing_projection_defaults_to_summary(server):
+    assert server.listing_projection() is server.SUMMARY_PROJECTION
+    assert server.listing_projection(shape="full") == {"_id": 0}
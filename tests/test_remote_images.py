@@ -0,0 +1,139 @@
+"""Remote image ingestion against a local HTTP server."""
+import asyncio
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from PIL import Image
+
+
+def make_jpeg(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (320, 240), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class ImageServer:
+    """Serves ``/image/<n>``, ``/flaky`` (503 twice, then an image), ``/gone`` and ``/html``."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.hits = {}
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def handle(self, handler: BaseHTTPRequestHandler):
+        with self.lock:
+            hits = self.hits[handler.path] = self.hits.get(handler.path, 0) + 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if handler.path == "/flaky" and hits <= 2:
+                return self.reply(handler, 503, b"", retry_after="0")
+            if handler.path == "/gone":
+                return self.reply(handler, 404, b"")
+            if handler.path == "/html":
+                return self.reply(handler, 200, b"<html></html>")
+            shade = sum(handler.path.encode()) % 256
+            self.reply(handler, 200, make_jpeg((shade, 80, 160)))
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    @staticmethod
+    def reply(handler, status: int, body: bytes, retry_after=None):
+        handler.send_response(status)
+        handler.send_header("Content-Length", str(len(body)))
+        if retry_after is not None:
+            handler.send_header("Retry-After", retry_after)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+@pytest.fixture
+def image_server():
+    state = ImageServer()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state.handle(self)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    state.base_url = f"http://127.0.0.1:{httpd.server_port}"
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def fast_retries(server, monkeypatch):
+    monkeypatch.setattr(server, "REMOTE_FETCH_BACKOFF", 0.01)
+    monkeypatch.setattr(server, "REMOTE_FETCH_RETRIES", 3)
+    return server
+
+
+async def ingest(server) -> dict:
+    async with httpx.AsyncClient(timeout=5) as client:
+        return await server.ingest_remote_images(client=client)
+
+
+def test_ingest_retries_and_rewrites_documents(fast_retries, image_server):
+    server = fast_retries
+    base = image_server.base_url
+
+    async def scenario():
+        await server.db.collections.insert_one({"id": "c", "image_base64": f"{base}/flaky"})
+        await server.db.jewelry_items.insert_many([
+            {"id": "a", "collection_id": "c", "image_base64": f"{base}/image/1"},
+            {"id": "b", "collection_id": "c", "image_base64": f"{base}/image/1"},
+            {"id": "d", "collection_id": "c", "image_base64": f"{base}/gone"},
+            {"id": "e", "collection_id": "c", "image_base64": f"{base}/html"},
+        ])
+        summary = await ingest(server)
+        assert summary == {"urls": 4, "fetched": 2, "failed": 2, "updated": 3}
+        # 503 dos veces y luego la imagen; los errores definitivos no se reintentan
+        assert image_server.hits == {"/flaky": 3, "/image/1": 1, "/gone": 1, "/html": 1}
+
+        collection = await server.db.collections.find_one({"id": "c"})
+        assert collection["image_base64"] == "" and collection["image_hash"]
+        items = {item["id"]: item async for item in server.db.jewelry_items.find()}
+        assert items["a"]["image_hash"] == items["b"]["image_hash"]
+        assert (await server.db.images.find_one({"hash": items["a"]["image_hash"]}))["refs"] == 2
+        assert items["d"]["image_base64"] == f"{base}/gone" and not items["d"].get("image_hash")
+        failure = await server.db.remote_images.find_one({"url": f"{base}/html"})
+        assert failure["error"] == "Unsupported image format"
+
+        # Lo ya descargado no se vuelve a pedir
+        fetched = dict(image_server.hits)
+        await ingest(server)
+        assert image_server.hits["/flaky"] == fetched["/flaky"]
+        assert image_server.hits["/image/1"] == fetched["/image/1"]
+
+    asyncio.run(scenario())
+
+
+def test_ingest_respects_concurrency_limit(fast_retries, image_server, monkeypatch):
+    server = fast_retries
+    monkeypatch.setattr(server, "REMOTE_FETCH_CONCURRENCY", 2)
+    image_server.delay = 0.1
+
+    async def scenario():
+        await server.db.jewelry_items.insert_many([
+            {"id": str(n), "collection_id": "c", "image_base64": f"{image_server.base_url}/image/{n}"}
+            for n in range(6)
+        ])
+        summary = await ingest(server)
+        assert summary["fetched"] == 6
+        assert image_server.peak == 2
+
+    asyncio.run(scenario())
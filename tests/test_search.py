@@ -0,0 +1,72 @@
+"""Fallback from the Mongo $text search to the in-process index."""
+import asyncio
+
+import pytest
+from pymongo.errors import OperationFailure
+
+
+@pytest.fixture(autouse=True)
+def plain_projection(server, monkeypatch):
+    # mongomock no evalúa la proyección "summary"
+    monkeypatch.setattr(server, "SUMMARY_PROJECTION", {"_id": 0})
+
+
+async def seed(server):
+    await server.db.jewelry_items.insert_many([
+        {"id": "a", "name": "Anillo de oro", "description": "", "collection_id": "c", "position": 0},
+        {"id": "b", "name": "Collar", "description": "Con anillos de plata", "collection_id": "d", "position": 1},
+    ])
+
+
+def failing_text_search(calls: list, code: int):
+    async def text_search(query, collection_id, offset, limit):
+        calls.append(query)
+        raise OperationFailure("text search failed", code=code)
+    return text_search
+
+
+def test_missing_text_index_disables_text_search_for_a_while(server, monkeypatch):
+    calls = []
+    monkeypatch.setattr(server, "text_search_retry_at", 0.0)
+    monkeypatch.setattr(server, "text_search", failing_text_search(calls, server.TEXT_INDEX_NOT_FOUND))
+
+    async def scenario():
+        await seed(server)
+        items, facets = await server.search_items("anillos", None, 0, 10)
+        assert [item["id"] for item in items] == ["a", "b"]
+        assert facets == {"c": 1, "d": 1}
+
+        await server.search_items("anillos", None, 0, 10)
+        assert calls == ["anillos"]
+
+        # Pasado el plazo se vuelve a probar $text por si ya existe el índice
+        monkeypatch.setattr(server, "text_search_retry_at", 0.0)
+        await server.search_items("collar", None, 0, 10)
+        assert calls == ["anillos", "collar"]
+
+    asyncio.run(scenario())
+
+
+def test_other_failures_only_fall_back_for_that_request(server, monkeypatch):
+    calls = []
+    monkeypatch.setattr(server, "text_search_retry_at", 0.0)
+    monkeypatch.setattr(server, "text_search", failing_text_search(calls, 50))
+
+    async def scenario():
+        await seed(server)
+        items, _ = await server.search_items("collar", None, 0, 10)
+        assert [item["id"] for item in items] == ["b"]
+        await server.search_items("collar", None, 0, 10)
+        assert calls == ["collar", "collar"]
+        assert server.text_search_retry_at == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_forced_text_backend_raises(server, monkeypatch):
+    monkeypatch.setattr(server, "SEARCH_BACKEND", "text")
+    monkeypatch.setattr(server, "text_search_retry_at", 0.0)
+    monkeypatch.setattr(server, "text_search", failing_text_search([], server.TEXT_INDEX_NOT_FOUND))
+
+    with pytest.raises(OperationFailure):
+        asyncio.run(server.search_items("anillo", None, 0, 10))
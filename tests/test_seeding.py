@@ -0,0 +1,54 @@
+"""Synthetic catalog seeding as a background job."""
+import asyncio
+
+PARAMS = {"collections": 2, "items_per_collection": 25, "image_kb": 20, "distinct_images": 2, "seed": 7}
+
+
+async def run_seed_job(server, processed: int = 0) -> dict:
+    job = await server.create_job("seed_catalog", str(PARAMS["seed"]), params=PARAMS, total=50)
+    # processed > 0: trabajo interrumpido que se retoma
+    await server.db.jobs.update_one({"id": job["id"]}, {"$set": {"processed": processed}})
+    await server.run_job(job["id"])
+    return await server.db.jobs.find_one({"id": job["id"]})
+
+
+def test_seed_job_inserts_in_batches_and_is_idempotent(server, monkeypatch):
+    monkeypatch.setattr(server, "SEED_BATCH_SIZE", 10)
+    batches = []
+    seed_documents = server.seed_documents
+
+    async def record_batches(collections, items):
+        batches.append(len(items))
+        return await seed_documents(collections, items)
+
+    monkeypatch.setattr(server, "seed_documents", record_batches)
+
+    async def scenario():
+        job = await run_seed_job(server)
+        assert job["status"] == "completed" and job["processed"] == 50
+        assert job["inserted"] == {"collections": 2, "items": 50, "images": 2}
+        assert max(batches) == 10
+        assert await server.db.jewelry_items.count_documents({}) == 50
+
+        job = await run_seed_job(server, processed=30)
+        assert job["processed"] == 50
+        assert job["inserted"] == {"collections": 0, "items": 0, "images": 2}
+        assert await server.db.jewelry_items.count_documents({}) == 50
+
+    asyncio.run(scenario())
+
+
+def test_demo_catalog_is_seeded_once_and_only_into_an_empty_catalog(server):
+    async def scenario():
+        inserted = await server.seed_demo_catalog()
+        assert inserted["collections"] == len(server.DEMO_COLLECTIONS) and inserted["items"] > 0
+        assert await server.seed_demo_catalog() == {"collections": 0, "items": 0}
+
+        # Catálogo existente (p. ej. demo antigua con ids aleatorios)
+        await server.db.collections.delete_many({})
+        await server.db.jewelry_items.delete_many({})
+        await server.db.collections.insert_one({"id": "shop", "name": "Anillos Elegantes"})
+        assert await server.seed_demo_catalog() == {"collections": 0, "items": 0}
+        assert await server.db.jewelry_items.count_documents({}) == 0
+
+    asyncio.run(scenario())
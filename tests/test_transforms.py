@@ -0,0 +1,79 @@
+"""Server-side crop and colour adjustments of POST /api/images/{hash}/transform."""
+import asyncio
+import io
+
+import httpx
+import numpy as np
+import pytest
+from PIL import Image
+
+
+def make_jpeg(size=(400, 300), color=(200, 100, 50)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG", quality=95)
+    return buffer.getvalue()
+
+
+async def transform(server, image_hash: str, **params) -> httpx.Response:
+    await server.init_default_config()
+    token = server.create_token("admin", 0)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(
+            f"/api/images/{image_hash}/transform", json=params,
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+
+@pytest.mark.parametrize("crop_type, box", [
+    ("square", (50, 0, 350, 300)),
+    ("vertical", (87, 0, 312, 300)),
+    ("horizontal", (0, 0, 400, 300)),
+])
+def test_center_crop_box(server, crop_type, box):
+    assert server.center_crop_box(400, 300, server.CROP_ASPECT_RATIOS[crop_type]) == box
+
+
+def test_adjust_colors_follows_css_filters(server):
+    rgb = np.array([[[200, 100, 50]]], dtype=np.float32)
+    assert server.adjust_colors(rgb.copy(), 2, 1, 1).tolist() == [[[255, 200, 100]]]
+    assert server.adjust_colors(rgb.copy(), 1, 0, 1).tolist() == [[[127.5, 127.5, 127.5]]]
+    grey = server.adjust_colors(rgb.copy(), 1, 1, 0)[0, 0]
+    assert np.allclose(grey, np.dot(server.LUMA_WEIGHTS, [200, 100, 50]), atol=0.01)
+
+
+def test_preview_is_cached_and_not_applied(server):
+    async def scenario():
+        source = await server.blob_store.put(make_jpeg(), "image/jpeg")
+        await server.db.jewelry_items.insert_one({"id": "a", "collection_id": "c", "image_hash": source})
+
+        first = await transform(server, source, crop_type="vertical", brightness=120, width=120, item_id="a")
+        assert first.status_code == 200
+        preview = first.json()
+        assert (preview["width"], preview["height"], preview["cached"]) == (120, 160, False)
+        assert (await server.db.images.find_one({"hash": preview["hash"]}))["variants"] == []
+
+        again = (await transform(server, source, crop_type="vertical", brightness=120, width=120, item_id="a")).json()
+        assert again["cached"] is True
+        assert again["hash"] == preview["hash"]
+        # Una vista previa nunca cambia la imagen de la pieza
+        assert (await server.db.jewelry_items.find_one({"id": "a"}))["image_hash"] == source
+
+    asyncio.run(scenario())
+
+
+def test_full_transform_replaces_the_item_image(server):
+    async def scenario():
+        source = await server.blob_store.put(make_jpeg(), "image/jpeg")
+        await server.db.images.update_one({"hash": source}, {"$set": {"refs": 1}})
+        await server.db.jewelry_items.insert_one({"id": "a", "collection_id": "c", "image_hash": source})
+
+        result = (await transform(server, source, crop_type="square", saturation=0, item_id="a")).json()
+        assert (result["width"], result["height"]) == (300, 300)
+        assert (await server.db.jewelry_items.find_one({"id": "a"}))["image_hash"] == result["hash"]
+        assert (await server.db.images.find_one({"hash": result["hash"]}))["refs"] == 1
+
+        assert (await transform(server, "0" * 64)).status_code == 404
+        assert (await transform(server, "no-es-un-hash")).status_code == 404
+
+    asyncio.run(scenario())
@@ -0,0 +1,98 @@
+"""Streamed multipart uploads to POST /api/images: size limits and rejected bodies."""
+import asyncio
+import io
+
+import httpx
+from PIL import Image
+
+
+def make_png(size=(120, 80)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (30, 90, 160)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def multipart_body(parts: list, boundary: str = "limite") -> bytes:
+    body = b""
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        body += f"--{boundary}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + content + b"\r\n"
+    return body + f"--{boundary}--\r\n".encode()
+
+
+async def upload(server, content, content_type: str = "multipart/form-data; boundary=limite") -> httpx.Response:
+    await server.init_default_config()
+    headers = {"Authorization": f"Bearer {server.create_token('admin', 0)}", "Content-Type": content_type}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/api/images", content=content, headers=headers)
+
+
+def stored_files(server) -> list:
+    root = server.blob_store.root
+    return [path for path in root.rglob("*") if path.is_file()] if root.exists() else []
+
+
+def test_upload_streamed_in_small_chunks(server):
+    png = make_png()
+    body = multipart_body([("alt", None, b"anillo"), ("file", "anillo.png", png)])
+
+    async def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    async def scenario():
+        # Sin normalizar: se guardan los bytes enviados
+        await server.init_default_config()
+        await server.db.site_config.update_one({}, {"$set": {"image_normalize": False}})
+        response = await upload(server, chunks())
+        assert response.status_code == 200
+        uploaded = response.json()
+        assert (uploaded["content_type"], uploaded["width"], uploaded["height"]) == ("image/png", 120, 80)
+        assert uploaded["size"] == len(png)
+        assert (await server.blob_store.get(uploaded["hash"]))[0] == png
+        assert not list((server.blob_store.root / ".uploads").glob("*"))
+
+    asyncio.run(scenario())
+
+
+def test_oversized_upload_is_rejected_without_leftovers(server, monkeypatch):
+    monkeypatch.setattr(server, "MAX_UPLOAD_BYTES", 1024)
+
+    async def scenario():
+        response = await upload(server, multipart_body([("file", "grande.png", make_png((600, 600)) + b"\0" * 4096)]))
+        assert response.status_code == 413
+        assert await server.db.images.count_documents({}) == 0
+        assert stored_files(server) == []
+
+    asyncio.run(scenario())
+
+
+def test_oversized_form_field_is_rejected(server, monkeypatch):
+    monkeypatch.setattr(server, "MAX_FORM_FIELD_BYTES", 16)
+
+    async def scenario():
+        response = await upload(server, multipart_body([("alt", None, b"x" * 64), ("file", "a.png", make_png())]))
+        assert response.status_code == 413
+
+    asyncio.run(scenario())
+
+
+def test_invalid_uploads_are_rejected(server):
+    async def scenario():
+        not_image = await upload(server, multipart_body([("file", "notas.txt", b"no es una imagen")]))
+        assert not_image.status_code == 400
+        assert not_image.json()["detail"] == "Unsupported image format"
+
+        missing = await upload(server, multipart_body([("alt", None, b"sin fichero")]))
+        assert missing.status_code == 400
+        assert missing.json()["detail"] == "Missing file field 'file'"
+
+        two_files = await upload(server, multipart_body([("file", "a.png", make_png()), ("file", "b.png", make_png())]))
+        assert two_files.status_code == 400
+
+        assert (await upload(server, b"{}", content_type="application/json")).status_code == 400
+        assert await server.db.images.count_documents({}) == 0
+        assert stored_files(server) == []
+
+    asyncio.run(scenario())